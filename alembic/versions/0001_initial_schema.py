@@ -0,0 +1,121 @@
+"""Initial schema, as created by init_db before migrations existed
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-01-20 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# SQLAlchemy stores enum member names, not values
+USER_ROLE = sa.Enum("SUPER_ADMIN", "ADMIN", "SCRUM_MASTER", "DEVELOPER", "TESTER", "PROJECT_MANAGER", name="userrole")
+ISSUE_TYPE = sa.Enum("STORY", "TASK", "BUG", "EPIC", name="issuetype")
+ISSUE_STATUS = sa.Enum("TODO", "IN_PROGRESS", "REVIEW", "DONE", name="issuestatus")
+PRIORITY = sa.Enum("LOWEST", "LOW", "MEDIUM", "HIGH", "HIGHEST", name="priority")
+
+
+def upgrade():
+    op.create_table(
+        "organizations",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("domain", sa.String(255)),
+        sa.Column("settings", sa.JSON()),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_table(
+        "users",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("email", sa.String(255), nullable=False),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("role", USER_ROLE, nullable=False),
+        sa.Column("organization_id", sa.String(36), sa.ForeignKey("organizations.id"), nullable=False),
+        sa.Column("avatar", sa.String(10)),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("password_hash", sa.String(255), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("profile_picture", sa.Text().with_variant(mysql.LONGTEXT(), "mysql")),
+    )
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    op.create_table(
+        "issues",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("key", sa.String(50), nullable=False),
+        sa.Column("title", sa.String(500), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("issue_type", ISSUE_TYPE, nullable=False),
+        sa.Column("status", ISSUE_STATUS, nullable=False),
+        sa.Column("priority", PRIORITY, nullable=False),
+        sa.Column("story_points", sa.Integer()),
+        sa.Column("assignee_id", sa.String(36), sa.ForeignKey("users.id")),
+        sa.Column("reporter_id", sa.String(36), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("organization_id", sa.String(36), sa.ForeignKey("organizations.id"), nullable=False),
+        sa.Column("labels", sa.JSON()),
+        sa.Column("visibility", sa.String(50)),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+        sa.Column("due_date", sa.DateTime()),
+        sa.Column("epic_id", sa.String(36)),
+        sa.Column("sprint_id", sa.String(36)),
+    )
+    op.create_index("ix_issues_key", "issues", ["key"], unique=True)
+    op.create_table(
+        "channels",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("organization_id", sa.String(36), sa.ForeignKey("organizations.id"), nullable=False),
+        sa.Column("is_private", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("created_by", sa.String(36)),
+    )
+    op.create_table(
+        "channel_memberships",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("channel_id", sa.String(36), sa.ForeignKey("channels.id"), nullable=False),
+        sa.Column("user_id", sa.String(36), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("joined_at", sa.DateTime()),
+        sa.Column("role", sa.String(50)),
+    )
+    op.create_table(
+        "conversations",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("channel_id", sa.String(36), sa.ForeignKey("channels.id"), nullable=False),
+        sa.Column("organization_id", sa.String(36), sa.ForeignKey("organizations.id"), nullable=False),
+        sa.Column("title", sa.String(500)),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+        sa.Column("is_active", sa.Boolean()),
+    )
+    op.create_table(
+        "conversation_messages",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("conversation_id", sa.String(36), sa.ForeignKey("conversations.id"), nullable=False),
+        sa.Column("sender_id", sa.String(36), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("message_type", sa.String(50)),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("edited_at", sa.DateTime()),
+        sa.Column("is_edited", sa.Boolean()),
+        sa.Column("message_metadata", sa.JSON()),
+    )
+
+
+def downgrade():
+    op.drop_table("conversation_messages")
+    op.drop_table("conversations")
+    op.drop_table("channel_memberships")
+    op.drop_table("channels")
+    op.drop_index("ix_issues_key", table_name="issues")
+    op.drop_table("issues")
+    op.drop_index("ix_users_email", table_name="users")
+    op.drop_table("users")
+    op.drop_table("organizations")
+    for enum in (PRIORITY, ISSUE_STATUS, ISSUE_TYPE, USER_ROLE):
+        enum.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,50 @@
+"""Indexes for the org-scoped issue, chat and membership queries
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-01-20 00:00:01
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# (name, table, columns), matching __table_args__ in api/models.py
+INDEXES = [
+    # GET /api/issues: WHERE organization_id = ? ORDER BY created_at DESC, id DESC
+    ("ix_issues_org_created", "issues", ["organization_id", "created_at", "id"]),
+    # Board columns: the same list filtered by status
+    ("ix_issues_org_status_created", "issues", ["organization_id", "status", "created_at"]),
+    ("ix_issues_org_sprint", "issues", ["organization_id", "sprint_id"]),
+    ("ix_issues_org_epic", "issues", ["organization_id", "epic_id"]),
+    ("ix_issues_assignee_id", "issues", ["assignee_id"]),
+    ("ix_issues_reporter_id", "issues", ["reporter_id"]),
+    # Organization member lists
+    ("ix_users_organization_id", "users", ["organization_id"]),
+    ("ix_channels_organization_id", "channels", ["organization_id"]),
+    ("ix_channel_memberships_channel_user", "channel_memberships", ["channel_id", "user_id"]),
+    ("ix_channel_memberships_user_id", "channel_memberships", ["user_id"]),
+    # Conversation lists ordered by recent activity
+    ("ix_conversations_org_updated", "conversations", ["organization_id", "updated_at"]),
+    ("ix_conversations_channel_id", "conversations", ["channel_id"]),
+    # Message history: WHERE conversation_id = ? ORDER BY created_at
+    ("ix_conversation_messages_conversation_created", "conversation_messages", ["conversation_id", "created_at"]),
+    ("ix_conversation_messages_sender_id", "conversation_messages", ["sender_id"]),
+]
+
+
+def upgrade():
+    # Skip indexes that already exist (e.g. tables created by a newer create_all);
+    # MySQL has no CREATE INDEX IF NOT EXISTS, so ask the inspector instead
+    inspector = sa.inspect(op.get_bind())
+    for name, table, columns in INDEXES:
+        if name not in {index["name"] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
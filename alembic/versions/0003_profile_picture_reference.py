@@ -0,0 +1,44 @@
+"""Store profile pictures in the blob store and keep only their URL
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-01-27 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+from api.blob_store import BlobStore, default_root
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+INLINE_TYPE = sa.Text().with_variant(mysql.LONGTEXT(), "mysql")
+
+
+def upgrade():
+    bind = op.get_bind()
+    store = BlobStore(default_root())
+    users = sa.table("users", sa.column("id", sa.String), sa.column("profile_picture", INLINE_TYPE))
+    rows = bind.execute(
+        sa.select(users.c.id, users.c.profile_picture).where(users.c.profile_picture.isnot(None))
+    ).all()
+    for user_id, picture in rows:
+        if store.is_blob_url(picture):
+            continue
+        try:
+            url = store.url_for(store.put_encoded_image(picture))
+        except ValueError:
+            url = None
+        bind.execute(users.update().where(users.c.id == user_id).values(profile_picture=url))
+
+    with op.batch_alter_table("users") as batch:
+        batch.alter_column("profile_picture", existing_type=INLINE_TYPE, type_=sa.String(255))
+
+
+def downgrade():
+    # The images stay in the blob store; the column keeps their URLs
+    with op.batch_alter_table("users") as batch:
+        batch.alter_column("profile_picture", existing_type=sa.String(255), type_=INLINE_TYPE)
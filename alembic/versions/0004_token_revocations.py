@@ -0,0 +1,38 @@
+"""Refresh-token revocations shared by every worker
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-02-03 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # A legacy database is brought up by create_all first and already has them
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+    if "revoked_tokens" not in tables:
+        op.create_table(
+            "revoked_tokens",
+            sa.Column("jti", sa.String(64), primary_key=True),
+            sa.Column("user_id", sa.String(36), nullable=False),
+            sa.Column("expires_at", sa.Float(), nullable=False),
+        )
+        op.create_index("ix_revoked_tokens_expires_at", "revoked_tokens", ["expires_at"])
+    if "token_cutoffs" not in tables:
+        op.create_table(
+            "token_cutoffs",
+            sa.Column("user_id", sa.String(36), primary_key=True),
+            sa.Column("revoked_at", sa.Float(), nullable=False),
+        )
+
+
+def downgrade():
+    op.drop_table("token_cutoffs")
+    op.drop_index("ix_revoked_tokens_expires_at", table_name="revoked_tokens")
+    op.drop_table("revoked_tokens")
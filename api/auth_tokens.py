@@ -0,0 +1,80 @@
+"""
+Signed access and refresh tokens.
+
+With AUTH_TOKEN_MODE=jwt the API issues short-lived HS256 access tokens
+plus longer-lived refresh tokens instead of opaque session tokens. Checking
+an access token is one HMAC over the token plus a lookup of the user in
+memory. No session table is consulted, so any worker process can
+authenticate any request. Refresh tokens carry a jti so each one can be
+exchanged once; see api/token_revocations.py.
+"""
+import time
+import uuid
+from typing import Callable, Dict, Optional
+
+import jwt
+
+ACCESS = "access"
+REFRESH = "refresh"
+
+
+def looks_like_jwt(token: str) -> bool:
+    """Opaque session tokens are urlsafe base64 and never contain dots."""
+    return token.count(".") == 2
+
+
+class TokenSigner:
+    def __init__(
+        self,
+        secret: str,
+        access_ttl: int = 15 * 60,
+        refresh_ttl: int = 30 * 24 * 3600,
+        algorithm: str = "HS256",
+        issuer: str = "scope-api",
+        clock: Callable[[], float] = time.time,
+    ):
+        self.secret = secret
+        self.access_ttl = access_ttl
+        self.refresh_ttl = refresh_ttl
+        self.algorithm = algorithm
+        self.issuer = issuer
+        self._clock = clock
+
+    def issue(self, user_id: str, organization_id: Optional[str]) -> Dict[str, object]:
+        """A fresh access/refresh pair for a user."""
+        # Sub-second iat, so a logout and a login in the same second stay ordered
+        now = self._clock()
+        return {
+            "access_token": self._encode(user_id, organization_id, ACCESS, now, self.access_ttl),
+            "refresh_token": self._encode(user_id, organization_id, REFRESH, now, self.refresh_ttl),
+            "expires_in": self.access_ttl,
+        }
+
+    def decode(self, token: str, token_type: str = ACCESS) -> Optional[dict]:
+        """Verified claims of a token of the given type, or None."""
+        try:
+            claims = jwt.decode(
+                token,
+                self.secret,
+                algorithms=[self.algorithm],
+                issuer=self.issuer,
+                options={"require": ["exp", "iat", "sub", "typ"], "verify_exp": False, "verify_iat": False},
+            )
+        except jwt.PyJWTError:
+            return None
+        # Expiry is checked here so it follows the injectable clock
+        if claims.get("typ") != token_type or claims["exp"] <= self._clock():
+            return None
+        return claims
+
+    def _encode(self, user_id: str, organization_id: Optional[str], token_type: str, now: float, ttl: int) -> str:
+        claims = {
+            "sub": user_id,
+            "org": organization_id,
+            "typ": token_type,
+            "iss": self.issuer,
+            "iat": now,
+            "exp": now + ttl,
+            "jti": uuid.uuid4().hex,
+        }
+        return jwt.encode(claims, self.secret, algorithm=self.algorithm)
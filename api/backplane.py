@@ -0,0 +1,335 @@
+"""
+Cross-process pub/sub backplane for realtime events.
+
+Every worker delivers a broadcast to its own sockets and then publishes an
+envelope on the backplane; the other workers deliver it to theirs. The
+in-process backplane (default) has no peers, so a single worker behaves
+exactly as before. Two multi-worker transports are provided:
+
+* "unix": datagrams between Unix sockets in a shared directory. Works for
+  several uvicorn workers on one machine with no extra infrastructure.
+* "postgres": LISTEN/NOTIFY on the application database (psycopg 3).
+
+ClusterPresence aggregates which users are connected to other workers.
+
+Only realtime fan-out is shared. Users, issues, chat history, sessions and
+the JSON data files still live in each worker's own memory, so a request
+served by one worker does not see writes made through another. Session
+tokens in particular are only valid on the worker that issued them, which
+is why startup refuses WEB_CONCURRENCY > 1 unless AUTH_TOKEN_MODE=jwt (see
+"Running Several Workers" in DEPLOYMENT.md).
+"""
+import asyncio
+import base64
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+EventHandler = Callable[[dict], Awaitable[None]]
+
+
+class InProcessBackplane:
+    """Single-worker backplane: there are no peers to notify."""
+
+    kind = "inprocess"
+
+    def __init__(self):
+        self.worker_id = uuid.uuid4().hex[:12]
+        self.published = 0
+        self.received = 0
+        self._handler: Optional[EventHandler] = None
+
+    async def start(self, handler: EventHandler):
+        self._handler = handler
+
+    async def stop(self):
+        self._handler = None
+
+    def publish(self, envelope: dict):
+        """Send an envelope to every other worker without waiting."""
+        self.published += 1
+        self._send({**envelope, "origin": self.worker_id})
+
+    def _send(self, envelope: dict):
+        pass
+
+    async def _dispatch(self, raw: Any):
+        try:
+            envelope = json.loads(raw) if isinstance(raw, (str, bytes)) else raw
+        except (TypeError, ValueError):
+            logger.warning("Discarding unreadable backplane envelope")
+            return
+        if envelope.get("origin") == self.worker_id or self._handler is None:
+            return
+        self.received += 1
+        try:
+            await self._handler(envelope)
+        except Exception as e:
+            logger.error(f"Backplane handler failed for {envelope.get('kind')}: {e}")
+
+
+class UnixSocketBackplane(InProcessBackplane):
+    """Datagram fan-out between workers sharing a socket directory."""
+
+    kind = "unix"
+
+    def __init__(self, directory: str, max_datagram: int = 1024 * 1024, peer_refresh: float = 5.0):
+        super().__init__()
+        self.directory = directory
+        self.max_datagram = max_datagram
+        self.peer_refresh = peer_refresh
+        self.path = os.path.join(directory, f"{self.worker_id}.sock")
+        self._sock: Optional[socket.socket] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Peer socket paths, re-listed every peer_refresh seconds or after a
+        # send fails, instead of on every publish
+        self._peers: List[str] = []
+        self._peers_listed = 0.0
+
+    async def start(self, handler: EventHandler):
+        await super().start(handler)
+        os.makedirs(self.directory, exist_ok=True)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.max_datagram)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.max_datagram * 4)
+        sock.bind(self.path)
+        sock.setblocking(False)
+        self._sock = sock
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(sock.fileno(), self._on_readable)
+        logger.info(f"Unix socket backplane listening on {self.path}")
+
+    async def stop(self):
+        if self._sock is not None:
+            self._loop.remove_reader(self._sock.fileno())
+            self._sock.close()
+            self._sock = None
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+        await super().stop()
+
+    def _on_readable(self):
+        while self._sock is not None:
+            try:
+                data = self._sock.recv(self.max_datagram)
+            except (BlockingIOError, InterruptedError):
+                return
+            self._loop.create_task(self._dispatch(data))
+
+    def _send(self, envelope: dict):
+        if self._sock is None:
+            return
+        data = json.dumps(envelope).encode()
+        if len(data) > self.max_datagram:
+            logger.error(f"Backplane envelope too large ({len(data)} bytes); delivered locally only")
+            return
+        for peer in self._peer_paths():
+            try:
+                self._sock.sendto(data, peer)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Socket file left behind by a worker that is gone
+                try:
+                    os.remove(peer)
+                except OSError:
+                    pass
+                self._peers_listed = 0.0
+            except BlockingIOError:
+                logger.warning(f"Backplane peer {os.path.basename(peer)} is not draining; dropped one envelope")
+            except OSError as e:
+                logger.warning(f"Backplane send to {os.path.basename(peer)} failed: {e}")
+                self._peers_listed = 0.0
+
+    def _peer_paths(self) -> List[str]:
+        now = time.monotonic()
+        if not self._peers_listed or now - self._peers_listed >= self.peer_refresh:
+            self._peers = [
+                os.path.join(self.directory, name)
+                for name in os.listdir(self.directory)
+                if name.endswith(".sock") and os.path.join(self.directory, name) != self.path
+            ]
+            self._peers_listed = now
+        return self._peers
+
+
+class PostgresBackplane(InProcessBackplane):
+    """LISTEN/NOTIFY fan-out through PostgreSQL."""
+
+    kind = "postgres"
+    # NOTIFY payloads are limited to just under 8000 bytes
+    MAX_PAYLOAD = 7900
+    # Base64 bytes carried by one chunk, leaving room for its JSON wrapper
+    CHUNK_DATA = 7600
+    # Incomplete chunked envelopes are dropped after this many seconds
+    CHUNK_TIMEOUT = 30.0
+
+    def __init__(self, dsn: str, channel: str = "scope_realtime"):
+        super().__init__()
+        self.dsn = dsn
+        self.channel = channel
+        # (origin, chunk id) -> (first seen, parts received so far)
+        self._chunks: Dict[Tuple[str, str], Tuple[float, Dict[int, str]]] = {}
+        self._outbox: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self._listen_conn = None
+        self._publish_conn = None
+
+    async def start(self, handler: EventHandler):
+        import psycopg
+
+        await super().start(handler)
+        self._listen_conn = await psycopg.AsyncConnection.connect(self.dsn, autocommit=True)
+        self._publish_conn = await psycopg.AsyncConnection.connect(self.dsn, autocommit=True)
+        await self._listen_conn.execute(f'LISTEN "{self.channel}"')
+        self._outbox = asyncio.Queue()
+        self._tasks = [
+            asyncio.create_task(self._listen()),
+            asyncio.create_task(self._publisher()),
+        ]
+        logger.info(f"Postgres backplane listening on channel {self.channel}")
+
+    async def stop(self):
+        if self._outbox is not None:
+            await self._outbox.join()
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        for conn in (self._listen_conn, self._publish_conn):
+            if conn is not None:
+                await conn.close()
+        self._listen_conn = self._publish_conn = None
+        await super().stop()
+
+    async def _listen(self):
+        async for notify in self._listen_conn.notifies():
+            await self._receive(notify.payload)
+
+    async def _receive(self, payload: str):
+        """Dispatch a NOTIFY payload, reassembling chunked envelopes first."""
+        if not payload.startswith('{"chunk"'):
+            await self._dispatch(payload)
+            return
+        try:
+            part = json.loads(payload)
+        except ValueError:
+            logger.warning("Discarding unreadable backplane chunk")
+            return
+        if part.get("origin") == self.worker_id:
+            return
+        now = time.monotonic()
+        for key, (first_seen, _) in list(self._chunks.items()):
+            if now - first_seen > self.CHUNK_TIMEOUT:
+                logger.warning(f"Dropping incomplete backplane envelope {key[1]} from {key[0]}")
+                del self._chunks[key]
+        key = (part["origin"], part["chunk"])
+        parts = self._chunks.setdefault(key, (now, {}))[1]
+        parts[part["part"]] = part["data"]
+        if len(parts) < part["parts"]:
+            return
+        del self._chunks[key]
+        data = "".join(parts[i] for i in range(part["parts"]))
+        await self._dispatch(base64.b64decode(data))
+
+    async def _publisher(self):
+        while True:
+            payload = await self._outbox.get()
+            try:
+                await self._publish_conn.execute("SELECT pg_notify(%s, %s)", (self.channel, payload))
+            except Exception as e:
+                logger.error(f"Backplane NOTIFY failed: {e}")
+            finally:
+                self._outbox.task_done()
+
+    def _send(self, envelope: dict):
+        if self._outbox is None:
+            return
+        for payload in self._payloads(envelope):
+            self._outbox.put_nowait(payload)
+
+    def _payloads(self, envelope: dict) -> List[str]:
+        """NOTIFY payloads for an envelope, split into chunks when it is too large."""
+        payload = json.dumps(envelope)
+        if len(payload.encode()) <= self.MAX_PAYLOAD:
+            return [payload]
+        # One publishing connection, so peers receive the chunks in order
+        data = base64.b64encode(payload.encode()).decode()
+        pieces = [data[i:i + self.CHUNK_DATA] for i in range(0, len(data), self.CHUNK_DATA)]
+        chunk_id = uuid.uuid4().hex[:12]
+        return [
+            json.dumps({
+                "chunk": chunk_id, "origin": self.worker_id,
+                "part": i, "parts": len(pieces), "data": piece,
+            })
+            for i, piece in enumerate(pieces)
+        ]
+
+
+def create_backplane(kind: str, dsn: Optional[str] = None, directory: Optional[str] = None) -> InProcessBackplane:
+    kind = (kind or "inprocess").lower()
+    if kind == "unix":
+        return UnixSocketBackplane(directory or os.path.join("/tmp", "scope-backplane"))
+    if kind == "postgres":
+        if not dsn:
+            raise ValueError("Postgres backplane requires a database URL")
+        # SQLAlchemy URLs may carry a driver suffix psycopg does not understand
+        scheme, sep, rest = dsn.partition("://")
+        return PostgresBackplane(f"{scheme.split('+')[0]}{sep}{rest}")
+    return InProcessBackplane()
+
+
+class ClusterPresence:
+    """Users connected to *other* workers, as reported over the backplane."""
+
+    def __init__(self, expiry_seconds: float = 45.0):
+        self.expiry_seconds = expiry_seconds
+        # worker_id -> org_id -> user_ids
+        self._workers: Dict[str, Dict[str, Set[str]]] = {}
+        self._last_seen: Dict[str, float] = {}
+
+    def apply_snapshot(self, worker_id: str, presence: Dict[str, Any]):
+        self._workers[worker_id] = {org: set(users) for org, users in presence.items() if users}
+        self._last_seen[worker_id] = time.monotonic()
+        if not self._workers[worker_id]:
+            self.forget(worker_id)
+
+    def apply_delta(self, worker_id: str, org_id: str, user_id: str, online: bool):
+        orgs = self._workers.setdefault(worker_id, {})
+        self._last_seen[worker_id] = time.monotonic()
+        if online:
+            orgs.setdefault(org_id, set()).add(user_id)
+        else:
+            users = orgs.get(org_id)
+            if users is not None:
+                users.discard(user_id)
+                if not users:
+                    orgs.pop(org_id, None)
+
+    def forget(self, worker_id: str):
+        self._workers.pop(worker_id, None)
+        self._last_seen.pop(worker_id, None)
+
+    def expire(self):
+        cutoff = time.monotonic() - self.expiry_seconds
+        for worker_id, seen in list(self._last_seen.items()):
+            if seen < cutoff:
+                logger.info(f"Backplane worker {worker_id} went silent; dropping its presence")
+                self.forget(worker_id)
+
+    def is_online(self, org_id: str, user_id: str) -> bool:
+        return any(user_id in orgs.get(org_id, ()) for orgs in self._workers.values())
+
+    def online_user_ids(self, org_id: str) -> Set[str]:
+        result: Set[str] = set()
+        for orgs in self._workers.values():
+            result.update(orgs.get(org_id, ()))
+        return result
+
+    def worker_count(self) -> int:
+        return len(self._workers)
@@ -0,0 +1,122 @@
+"""
+Content-addressed blob store for user images.
+
+Blobs live on the local filesystem under <root>/<first two hex digits>/<key>,
+where the key is the SHA-256 of the bytes plus a file extension. Identical
+uploads share one file, and since a key never changes its content, the blobs
+can be served with a strong ETag and cached indefinitely. Users and messages
+store only the short URL returned by url_for.
+"""
+import base64
+import binascii
+import hashlib
+import os
+import re
+import uuid
+from typing import Optional, Tuple
+
+# Raster formats only: SVG could carry script
+IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png", ".png"),
+    (b"\xff\xd8\xff", "image/jpeg", ".jpg"),
+    (b"GIF87a", "image/gif", ".gif"),
+    (b"GIF89a", "image/gif", ".gif"),
+)
+CONTENT_TYPES = {
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+}
+KEY_PATTERN = re.compile(r"^[0-9a-f]{64}\.(png|jpg|gif|webp)$")
+
+
+def default_root() -> str:
+    """
+    The blob directory, shared by the app, the migrations and the scripts.
+
+    BLOB_STORE_DIR wins; otherwise "blobs" inside the same data directory
+    main.get_data_path picks (api/apps/api/data when it exists or when
+    api/data does not, else api/data).
+    """
+    configured = os.getenv("BLOB_STORE_DIR")
+    if configured:
+        return configured
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    primary = os.path.join(base_dir, "apps", "api", "data")
+    fallback = os.path.join(base_dir, "data")
+    data_dir = primary if os.path.exists(primary) or not os.path.exists(fallback) else fallback
+    return os.path.join(data_dir, "blobs")
+
+
+def sniff_image(data: bytes) -> Optional[Tuple[str, str]]:
+    """Return (content type, extension) for a supported image, else None."""
+    for signature, content_type, extension in IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return content_type, extension
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp", ".webp"
+    return None
+
+
+def decode_image(value: str) -> bytes:
+    """Decode a base64 image, with or without a data: URL prefix."""
+    if value.startswith("data:"):
+        _, _, value = value.partition(",")
+    try:
+        return base64.b64decode(value.strip(), validate=True)
+    except (binascii.Error, ValueError):
+        raise ValueError("Image is not valid base64")
+
+
+class BlobStore:
+    def __init__(self, root: str, url_prefix: str = "/api/blobs", max_bytes: int = 2 * 1024 * 1024):
+        self.root = root
+        self.url_prefix = url_prefix.rstrip("/")
+        self.max_bytes = max_bytes
+
+    def put_image(self, data: bytes) -> str:
+        """Store image bytes and return their key. Raises ValueError if unsupported."""
+        if len(data) > self.max_bytes:
+            raise ValueError(f"Image is larger than {self.max_bytes} bytes")
+        sniffed = sniff_image(data)
+        if sniffed is None:
+            raise ValueError("Unsupported image format")
+        key = f"{hashlib.sha256(data).hexdigest()}{sniffed[1]}"
+        path = self._path(key)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        return key
+
+    def put_encoded_image(self, value: str) -> str:
+        return self.put_image(decode_image(value))
+
+    def path_for(self, key: str) -> Optional[str]:
+        """Filesystem path of an existing blob, or None for unknown/invalid keys."""
+        if not KEY_PATTERN.match(key):
+            return None
+        path = self._path(key)
+        return path if os.path.exists(path) else None
+
+    def url_for(self, key: str) -> str:
+        return f"{self.url_prefix}/{key}"
+
+    def is_blob_url(self, value: Optional[str]) -> bool:
+        return bool(value) and value.startswith(f"{self.url_prefix}/")
+
+    @staticmethod
+    def etag_for(key: str) -> str:
+        return f'"{key.split(".", 1)[0]}"'
+
+    @staticmethod
+    def content_type_for(key: str) -> str:
+        return CONTENT_TYPES[os.path.splitext(key)[1]]
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
@@ -1,8 +1,11 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
+from contextlib import contextmanager
 import os
-from typing import Generator
+from typing import AsyncGenerator, Generator, Iterator
 from .models import Base
 
 # Database configuration
@@ -45,9 +48,126 @@ else:
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def to_async_url(url: str) -> str:
+    """Swap the driver in a database URL for its asyncio counterpart."""
+    scheme, sep, rest = url.partition("://")
+    dialect = scheme.split("+")[0]
+    if dialect == "sqlite":
+        return f"sqlite+aiosqlite{sep}{rest}"
+    if dialect == "postgresql":
+        return f"postgresql+psycopg{sep}{rest}"
+    if dialect == "mysql":
+        return f"mysql+aiomysql{sep}{rest}"
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", to_async_url(DATABASE_URL))
+
+# Async engine used by the request handlers, so queries never block the event loop
+if ASYNC_DATABASE_URL.startswith("sqlite"):
+    if ":memory:" in ASYNC_DATABASE_URL or ASYNC_DATABASE_URL.endswith("://"):
+        async_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=StaticPool)
+    else:
+        async_engine = create_async_engine(ASYNC_DATABASE_URL)
+elif ASYNC_DATABASE_URL.startswith("mysql"):
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        pool_pre_ping=True,
+        pool_size=10,
+        max_overflow=20,
+        pool_recycle=3600,
+    )
+else:
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        pool_pre_ping=True,
+        pool_size=10,
+        max_overflow=20,
+    )
+
+# Objects stay readable after commit; lazy refreshes are not possible under asyncio
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+# Schema that init_db produced before migrations were introduced
+INITIAL_REVISION = "0001"
+# Every worker runs init_db on startup; this lock lets one migrate at a time
+MIGRATION_LOCK_NAME = "missedtask_migrations"
+MIGRATION_LOCK_ID = 4_711_021  # pg_advisory_lock key
+MIGRATION_LOCK_TIMEOUT = int(os.getenv("MIGRATION_LOCK_TIMEOUT", "300"))
+
+@contextmanager
+def migration_lock(connection: Connection) -> Iterator[None]:
+    """
+    Serialize schema migrations across workers and processes.
+
+    Take it outside the migration transaction, so the next worker only
+    inspects the schema after the previous one committed. PostgreSQL uses a
+    session advisory lock, MySQL a named lock and SQLite an exclusive lock on
+    a file next to the database. In-memory SQLite belongs to one process.
+    """
+    dialect = connection.dialect.name
+    if dialect in ("postgresql", "mysql"):
+        if dialect == "postgresql":
+            connection.exec_driver_sql(f"SELECT pg_advisory_lock({MIGRATION_LOCK_ID})")
+            release = f"SELECT pg_advisory_unlock({MIGRATION_LOCK_ID})"
+        else:
+            acquired = connection.exec_driver_sql(
+                f"SELECT GET_LOCK('{MIGRATION_LOCK_NAME}', {MIGRATION_LOCK_TIMEOUT})"
+            ).scalar()
+            if acquired != 1:
+                raise RuntimeError("Timed out waiting for another worker to finish migrating")
+            release = f"SELECT RELEASE_LOCK('{MIGRATION_LOCK_NAME}')"
+        # The lock belongs to the session; end the implicit transaction
+        connection.commit()
+        try:
+            yield
+        finally:
+            connection.exec_driver_sql(release)
+            connection.commit()
+        return
+
+    database = connection.engine.url.database
+    if dialect != "sqlite" or not database or database == ":memory:":
+        yield
+        return
+    import fcntl
+
+    with open(f"{database}.migrate-lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def run_migrations(connection: Connection):
+    """Bring the schema on this connection up to the latest Alembic revision"""
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(ALEMBIC_INI)
+    config.attributes["connection"] = connection
+    config.attributes["configure_logger"] = False
+
+    inspector = inspect(connection)
+    if inspector.has_table("alembic_version"):
+        command.upgrade(config, "head")
+        return
+
+    had_tables = inspector.has_table("users")
+    Base.metadata.create_all(bind=connection)
+    if had_tables:
+        # Created by create_all before migrations existed: add what came later
+        command.stamp(config, INITIAL_REVISION)
+        command.upgrade(config, "head")
+    else:
+        command.stamp(config, "head")
+
 def init_db():
-    """Initialize database - create all tables"""
-    Base.metadata.create_all(bind=engine)
+    """Initialize database - create tables and apply pending migrations"""
+    with engine.connect() as connection:
+        with migration_lock(connection):
+            with connection.begin():
+                run_migrations(connection)
 
 def get_db() -> Generator[Session, None, None]:
     """Dependency to get database session"""
@@ -57,6 +177,15 @@ def get_db() -> Generator[Session, None, None]:
     finally:
         db.close()
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """Dependency to get an async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def close_async_db():
+    """Release pooled async connections on shutdown"""
+    await async_engine.dispose()
+
 def get_db_sync() -> Session:
     """Get database session synchronously for migration scripts"""
     return SessionLocal()
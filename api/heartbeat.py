@@ -0,0 +1,126 @@
+"""
+Shared keepalive scheduler for long-lived streams.
+
+Idle SSE streams need a heartbeat every interval seconds so proxies keep
+them open. Instead of one timeout per stream per cycle, every stream sits
+in a single timer wheel: one slot per tick, one task for the whole
+process. Activity on a stream only moves its deadline (a dict write). The
+wheel notices the move lazily when the stream's old slot comes round. On
+each tick the streams whose deadline has passed are handed to on_due in
+one batch, and then rescheduled.
+"""
+import asyncio
+import logging
+import math
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class HeartbeatScheduler:
+    def __init__(
+        self,
+        on_due: Callable[[List[Hashable]], None],
+        interval: float = 30.0,
+        tick: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.on_due = on_due
+        self.interval = interval
+        self.tick = tick
+        self._clock = clock
+        # One extra slot so a full interval never wraps onto the current one
+        self._wheel: List[Set[Hashable]] = [set() for _ in range(math.ceil(interval / tick) + 1)]
+        self._deadlines: Dict[Hashable, float] = {}
+        self._slot_of: Dict[Hashable, int] = {}
+        self._current = self._tick_of(clock())
+        self._task: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.ticks = 0
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def add(self, key: Hashable):
+        self._deadlines[key] = self._clock() + self.interval
+        self._place(key)
+
+    def touch(self, key: Hashable):
+        """The stream just carried traffic; push its heartbeat back."""
+        if key in self._deadlines:
+            self._deadlines[key] = self._clock() + self.interval
+
+    def remove(self, key: Hashable):
+        self._deadlines.pop(key, None)
+        slot = self._slot_of.pop(key, None)
+        if slot is not None:
+            self._wheel[slot].discard(key)
+
+    def advance(self) -> List[Hashable]:
+        """Turn the wheel up to now; returns the streams that are due."""
+        now = self._clock()
+        now_tick = self._tick_of(now)
+        due: List[Hashable] = []
+        # After a long stall one full turn visits every slot
+        first = max(self._current + 1, now_tick - len(self._wheel) + 1)
+        for tick in range(first, now_tick + 1):
+            slot = self._wheel[tick % len(self._wheel)]
+            keys = list(slot)
+            slot.clear()
+            for key in keys:
+                del self._slot_of[key]
+                if self._tick_of(self._deadlines[key]) <= now_tick:
+                    due.append(key)
+                else:
+                    # Touched since it was placed; move to the new deadline
+                    self._place(key)
+        self._current = max(self._current, now_tick)
+        for key in due:
+            self._deadlines[key] = now + self.interval
+            self._place(key)
+        return due
+
+    def stats(self) -> dict:
+        return {
+            "streams": len(self._deadlines),
+            "interval": self.interval,
+            "tick": self.tick,
+            "ticks": self.ticks,
+            "heartbeats_sent": self.sent,
+        }
+
+    async def start(self):
+        if self._task is None or self._task.done():
+            self._current = self._tick_of(self._clock())
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            self.ticks += 1
+            due = self.advance()
+            if not due:
+                continue
+            self.sent += len(due)
+            try:
+                self.on_due(due)
+            except Exception as e:
+                logger.error(f"Heartbeat batch failed: {e}")
+
+    def _tick_of(self, when: float) -> int:
+        return int(when // self.tick)
+
+    def _place(self, key: Hashable):
+        slot = self._tick_of(self._deadlines[key]) % len(self._wheel)
+        self._wheel[slot].add(key)
+        self._slot_of[key] = slot
@@ -1,18 +1,20 @@
-from fastapi import FastAPI, HTTPException, Depends, status, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Depends, Query, status, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, EmailStr
-from typing import List, Optional, Dict, Any, Set
+from typing import List, Optional, Dict, Any, Iterable, Set, Tuple
 from enum import Enum
 import uuid
 from datetime import datetime, timedelta
-import hashlib
+import time
 import secrets
 import logging
 import json
 import os
 import asyncio
-from starlette.responses import StreamingResponse
+import base64
+import bisect
+from starlette.responses import FileResponse, Response, StreamingResponse
 from starlette.requests import Request
 from dotenv import load_dotenv
 
@@ -22,7 +24,22 @@ if not os.getenv("RENDER"):
 
 # Import database modules
 try:
-    from .database import init_db, get_db, engine, DATABASE_URL
+    from .database import init_db, get_async_db, close_async_db, engine, AsyncSessionLocal, DATABASE_URL
+    from .message_log import MessageLogStore
+    from .persistence import JsonWriteBehind
+    from .realtime import SSE_OVERFLOW_POLICIES, ConnectionSender, SseSubscriber, encode_frame
+    from .backplane import ClusterPresence, create_backplane
+    from .responses import FastJSONResponse, dumps, encode_models, encoded_json_response
+    from .blob_store import BlobStore, default_root as default_blob_root
+    from .org_store import OrgPartitions, org_data_name
+    from .session_store import SessionStore, token_digest
+    from .auth_tokens import REFRESH, TokenSigner, looks_like_jwt
+    from .token_revocations import TokenRevocations
+    from .passwords import BcryptHasher, PasswordHasher, PasswordHasherBusy, Sha256Hasher
+    from .typing_indicators import TypingAggregator
+    from .event_log import OrgEventLogs
+    from .heartbeat import HeartbeatScheduler
+    from .presence import PresenceAggregator
     from .models import (
         Issue as IssueModel,
         IssueStatus as ModelIssueStatus,
@@ -59,18 +76,66 @@ except ImportError:
 
     database_module = _load_module("api.database", current_dir / "database.py")
     models_module = _load_module("api.models", current_dir / "models.py")
+    message_log_module = _load_module("api.message_log", current_dir / "message_log.py")
+    persistence_module = _load_module("api.persistence", current_dir / "persistence.py")
+    realtime_module = _load_module("api.realtime", current_dir / "realtime.py")
+    backplane_module = _load_module("api.backplane", current_dir / "backplane.py")
+    responses_module = _load_module("api.responses", current_dir / "responses.py")
+    blob_store_module = _load_module("api.blob_store", current_dir / "blob_store.py")
+    org_store_module = _load_module("api.org_store", current_dir / "org_store.py")
+    session_store_module = _load_module("api.session_store", current_dir / "session_store.py")
+    auth_tokens_module = _load_module("api.auth_tokens", current_dir / "auth_tokens.py")
+    token_revocations_module = _load_module("api.token_revocations", current_dir / "token_revocations.py")
+    passwords_module = _load_module("api.passwords", current_dir / "passwords.py")
+    typing_indicators_module = _load_module("api.typing_indicators", current_dir / "typing_indicators.py")
+    event_log_module = _load_module("api.event_log", current_dir / "event_log.py")
+    heartbeat_module = _load_module("api.heartbeat", current_dir / "heartbeat.py")
+    presence_module = _load_module("api.presence", current_dir / "presence.py")
 
     init_db = database_module.init_db  # type: ignore
-    get_db = database_module.get_db  # type: ignore
+    get_async_db = database_module.get_async_db  # type: ignore
+    close_async_db = database_module.close_async_db  # type: ignore
     engine = database_module.engine  # type: ignore
+    AsyncSessionLocal = database_module.AsyncSessionLocal  # type: ignore
     DATABASE_URL = database_module.DATABASE_URL  # type: ignore
+    MessageLogStore = message_log_module.MessageLogStore  # type: ignore
+    JsonWriteBehind = persistence_module.JsonWriteBehind  # type: ignore
+    ConnectionSender = realtime_module.ConnectionSender  # type: ignore
+    SseSubscriber = realtime_module.SseSubscriber  # type: ignore
+    SSE_OVERFLOW_POLICIES = realtime_module.SSE_OVERFLOW_POLICIES  # type: ignore
+    encode_frame = realtime_module.encode_frame  # type: ignore
+    ClusterPresence = backplane_module.ClusterPresence  # type: ignore
+    create_backplane = backplane_module.create_backplane  # type: ignore
+    FastJSONResponse = responses_module.FastJSONResponse  # type: ignore
+    dumps = responses_module.dumps  # type: ignore
+    encode_models = responses_module.encode_models  # type: ignore
+    encoded_json_response = responses_module.encoded_json_response  # type: ignore
+    BlobStore = blob_store_module.BlobStore  # type: ignore
+    default_blob_root = blob_store_module.default_root  # type: ignore
+    OrgPartitions = org_store_module.OrgPartitions  # type: ignore
+    org_data_name = org_store_module.org_data_name  # type: ignore
+    SessionStore = session_store_module.SessionStore  # type: ignore
+    token_digest = session_store_module.token_digest  # type: ignore
+    REFRESH = auth_tokens_module.REFRESH  # type: ignore
+    TokenSigner = auth_tokens_module.TokenSigner  # type: ignore
+    looks_like_jwt = auth_tokens_module.looks_like_jwt  # type: ignore
+    TokenRevocations = token_revocations_module.TokenRevocations  # type: ignore
+    BcryptHasher = passwords_module.BcryptHasher  # type: ignore
+    PasswordHasher = passwords_module.PasswordHasher  # type: ignore
+    PasswordHasherBusy = passwords_module.PasswordHasherBusy  # type: ignore
+    Sha256Hasher = passwords_module.Sha256Hasher  # type: ignore
+    TypingAggregator = typing_indicators_module.TypingAggregator  # type: ignore
+    OrgEventLogs = event_log_module.OrgEventLogs  # type: ignore
+    HeartbeatScheduler = heartbeat_module.HeartbeatScheduler  # type: ignore
+    PresenceAggregator = presence_module.PresenceAggregator  # type: ignore
 
     IssueModel = models_module.Issue  # type: ignore
     ModelIssueStatus = models_module.IssueStatus  # type: ignore
     ModelIssueType = models_module.IssueType  # type: ignore
     ModelPriority = models_module.Priority  # type: ignore
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import String, and_, cast, or_, select
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
 
 try:
     import websockets  # type: ignore
@@ -88,12 +153,57 @@ logger = logging.getLogger(__name__)
 if not WEBSOCKET_LIB_AVAILABLE:
     logger.warning("WebSocket support missing. Install 'uvicorn[standard]' or add the 'websockets' package to enable real-time chat.")
 
-app = FastAPI(title="Scope API", version="1.0.0", description="Project Management API")
+app = FastAPI(
+    title="Scope API",
+    version="1.0.0",
+    description="Project Management API",
+    default_response_class=FastJSONResponse,
+)
 security = HTTPBearer()
 
 # Configuration
 SECRET_KEY = "scope-secret-key-2024"
 
+# New passwords use PASSWORD_HASH_SCHEME; legacy SHA-256 hashes still verify
+# and are upgraded on the next successful login
+PASSWORD_HASH_SCHEME = os.getenv("PASSWORD_HASH_SCHEME", "bcrypt").lower()
+_password_hashers = [BcryptHasher(rounds=int(os.getenv("BCRYPT_ROUNDS", "12"))), Sha256Hasher(SECRET_KEY)]
+if PASSWORD_HASH_SCHEME == "sha256":
+    _password_hashers.reverse()
+password_hasher = PasswordHasher(
+    _password_hashers,
+    max_workers=int(os.getenv("PASSWORD_HASH_WORKERS", "0")) or None,
+    max_pending=int(os.getenv("PASSWORD_HASH_MAX_PENDING", "0")) or None,
+)
+
+# "session" issues opaque tokens checked against session_store; "jwt" issues
+# signed access + refresh tokens that any worker can verify on its own
+AUTH_TOKEN_MODE = os.getenv("AUTH_TOKEN_MODE", "session").lower()
+JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "")
+# uvicorn reads the same variable as its default --workers count
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1") or 1)
+# Secrets that ship with the code or .env.example and so sign nothing
+PUBLIC_SECRETS = {SECRET_KEY, "scope-secret-key-2024-change-in-production"}
+token_signer = TokenSigner(
+    # Outside jwt mode nothing is signed; a random key keeps it that way
+    JWT_SECRET_KEY if AUTH_TOKEN_MODE == "jwt" else secrets.token_urlsafe(32),
+    access_ttl=int(os.getenv("ACCESS_TOKEN_TTL_SECONDS", "900")),
+    refresh_ttl=int(os.getenv("REFRESH_TOKEN_TTL_SECONDS", str(30 * 24 * 3600))),
+)
+# Used refresh tokens and logouts, shared by every worker through the database
+token_revocations = TokenRevocations(AsyncSessionLocal)
+
+def check_auth_config():
+    """Refuse to sign tokens with a missing or publicly known secret, and
+    refuse session tokens when they would only be valid on one of several workers."""
+    if AUTH_TOKEN_MODE == "jwt" and (not JWT_SECRET_KEY or JWT_SECRET_KEY in PUBLIC_SECRETS):
+        raise RuntimeError("AUTH_TOKEN_MODE=jwt requires JWT_SECRET_KEY to be set to a private value")
+    if AUTH_TOKEN_MODE != "jwt" and WEB_CONCURRENCY > 1:
+        raise RuntimeError(
+            f"WEB_CONCURRENCY={WEB_CONCURRENCY} requires AUTH_TOKEN_MODE=jwt; "
+            "session tokens are only known to the worker that issued them"
+        )
+
 # Data directory handling
 BASE_DIR = os.path.dirname(__file__)
 DATA_DIR_PRIMARY = os.path.join(BASE_DIR, 'apps', 'api', 'data')
@@ -129,6 +239,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Enums
@@ -285,6 +396,17 @@ class AuthResponse(BaseModel):
     token_type: str
     user: UserResponse
     organization: OrganizationResponse
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
+class TokenResponse(BaseModel):
+    access_token: str
+    token_type: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None
 
 class HealthResponse(BaseModel):
     ok: bool
@@ -322,25 +444,360 @@ users_db: Dict[str, dict] = {}
 organizations_db: Dict[str, dict] = {}
 issues_db: Dict[str, dict] = {}
 comments_db: Dict[str, dict] = {}
+issue_comments: Dict[str, List[dict]] = {}  # issue_id -> comments in insertion order
+org_issue_ids: Dict[str, Dict[str, None]] = {}  # org_id -> loaded issue ids (dict used as an ordered set)
+org_comment_ids: Dict[str, Dict[str, None]] = {}  # org_id -> loaded comment ids
 otp_db: Dict[str, dict] = {}
-sessions_db: Dict[str, str] = {}
 issue_counter = 1
 
+# Secondary indexes over users_db / organizations_db
+users_by_email: Dict[str, str] = {}  # email -> user_id
+org_user_ids: Dict[str, Dict[str, None]] = {}  # org_id -> user_ids (dict used as an ordered set)
+organizations_by_domain: Dict[str, str] = {}  # lower-cased domain -> org_id
+organizations_by_name: Dict[str, str] = {}  # lower-cased, stripped name -> org_id
+
+# Reverse session indexes, kept in step with session_store
+user_session_tokens: Dict[str, Set[str]] = {}  # user_id -> token digests
+org_session_users: Dict[str, Set[str]] = {}  # org_id -> user_ids holding a token
+session_user_orgs: Dict[str, str] = {}  # user_id -> org_id the user was indexed under
+
 # Chat in-memory stores
 conversations_db: Dict[str, dict] = {}
 conversation_messages_db: Dict[str, dict] = {}
 user_conversations_db: Dict[str, List[str]] = {}  # user_id -> list of conversation_ids
+org_conversations: Dict[str, Dict[str, None]] = {}  # org_id -> conversation ids (ordered set)
+
+# Per-conversation message index: conversation_id -> messages ordered by (created_at, id)
+conversation_message_index: Dict[str, List[dict]] = {}
+conversation_message_keys: Dict[str, Tuple[str, Tuple[str, str], Optional[str]]] = {}  # message_id -> (conversation_id, sort key, organization_id)
+org_message_ids: Dict[str, Set[str]] = {}  # organization_id -> indexed message ids
+
+# Write-behind queue for the other JSON data files
+json_writer = JsonWriteBehind(
+    get_data_path,
+    max_pending=int(os.getenv("PERSISTENCE_MAX_PENDING", "10000")),
+    commit_delay=float(os.getenv("PERSISTENCE_COMMIT_DELAY", "0.05")),
+)
+
+# Access-token sessions: sliding expiry, swept and snapshotted in the background
+session_store = SessionStore(
+    get_data_path("sessions.json", ensure_dir=False),
+    ttl_seconds=float(os.getenv("SESSION_TTL_SECONDS", str(7 * 24 * 3600))),
+    max_sessions=int(os.getenv("SESSION_MAX_COUNT", "100000")),
+    refresh_interval=float(os.getenv("SESSION_REFRESH_INTERVAL", "300")),
+    sweep_interval=float(os.getenv("SESSION_SWEEP_INTERVAL", "60")),
+    on_removed=lambda digest, user_id: _unindex_session(digest, user_id),
+)
+
+# Content-addressed storage for profile pictures; records keep only the URL
+blob_store = BlobStore(
+    default_blob_root(),
+    max_bytes=int(os.getenv("PROFILE_PICTURE_MAX_BYTES", str(2 * 1024 * 1024))),
+)
+
+# Append-only segment logs backing each org's conversation_messages.json
+CHAT_LOG_SEGMENT_MAX_BYTES = int(os.getenv("CHAT_LOG_SEGMENT_MAX_BYTES", str(4 * 1024 * 1024)))
+CHAT_LOG_MAX_SEGMENTS = int(os.getenv("CHAT_LOG_MAX_SEGMENTS", "8"))
+message_logs: Dict[str, MessageLogStore] = {}  # org_id -> open log
+
+# Orgs are loaded on first use and unloaded after ORG_IDLE_SECONDS without requests
+ORG_IDLE_SECONDS = float(os.getenv("ORG_IDLE_SECONDS", "900"))
+ORG_EVICTION_INTERVAL = float(os.getenv("ORG_EVICTION_INTERVAL", "60"))
+org_eviction_task: Optional[asyncio.Task] = None
 
 # WebSocket connection registries
 active_chat_connections: Dict[str, List[Dict[str, Any]]] = {}
-sse_connections: Dict[str, List[asyncio.Queue]] = {}
+sse_connections: Dict[str, List[SseSubscriber]] = {}
 presence_counters: Dict[str, Dict[str, int]] = {}
+WEBSOCKET_SEND_QUEUE_SIZE = int(os.getenv("WEBSOCKET_SEND_QUEUE_SIZE", "256"))
+# Per-stream SSE buffer and what to do when a client falls that far behind
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "256"))
+SSE_OVERFLOW_POLICY = os.getenv("SSE_OVERFLOW_POLICY", "coalesce").lower()
+if SSE_OVERFLOW_POLICY not in SSE_OVERFLOW_POLICIES:
+    logger.warning(f"Unknown SSE_OVERFLOW_POLICY {SSE_OVERFLOW_POLICY!r}; using coalesce")
+    SSE_OVERFLOW_POLICY = "coalesce"
+
+# Pub/sub backplane so several workers can serve realtime chat together
+REALTIME_BACKPLANE = os.getenv("REALTIME_BACKPLANE", "inprocess")
+PRESENCE_SYNC_INTERVAL = float(os.getenv("PRESENCE_SYNC_INTERVAL", "15"))
+realtime_backplane = create_backplane(
+    REALTIME_BACKPLANE,
+    dsn=os.getenv("REALTIME_BACKPLANE_URL", DATABASE_URL),
+    directory=os.getenv("REALTIME_BACKPLANE_DIR"),
+)
+cluster_presence = ClusterPresence(expiry_seconds=PRESENCE_SYNC_INTERVAL * 3)
+presence_sync_task: Optional[asyncio.Task] = None
+# Same connections keyed by user, for participant-targeted delivery
+user_chat_connections: Dict[str, List[Dict[str, Any]]] = {}
+user_sse_connections: Dict[str, List[SseSubscriber]] = {}
+# Recent events per org with sequential ids, so a reconnecting client only
+# receives what it missed; see api/event_log.py
+REALTIME_REPLAY_EVENTS = int(os.getenv("REALTIME_REPLAY_EVENTS", "1000"))
+event_logs = OrgEventLogs(
+    encode_frame,
+    max_events=REALTIME_REPLAY_EVENTS,
+    unsequenced=('chat_typing', 'heartbeat', 'stream_position'),
+)
+
+def send_sse_heartbeats(subscribers: List[SseSubscriber]):
+    """One heartbeat frame, shared by every SSE stream that has gone quiet."""
+    frame = encode_frame({'type': 'heartbeat', 'timestamp': datetime.utcnow().isoformat()})
+    for subscriber in subscribers:
+        subscriber.enqueue(frame)
+
+# All idle SSE streams share one timer wheel; see api/heartbeat.py
+sse_heartbeats = HeartbeatScheduler(
+    send_sse_heartbeats,
+    interval=float(os.getenv("SSE_HEARTBEAT_INTERVAL", "30")),
+    tick=float(os.getenv("SSE_HEARTBEAT_TICK", "1")),
+)
+
+def _message_sort_key(message: dict) -> Tuple[str, str]:
+    return (str(message.get('created_at') or ''), str(message.get('id') or ''))
+
+def _index_message_org(message_id: str, organization_id: Optional[str]):
+    if organization_id:
+        org_message_ids.setdefault(organization_id, set()).add(message_id)
+
+def index_conversation_message(message: dict):
+    """Insert or replace a message in its conversation's time-ordered index."""
+    message_id = message.get('id')
+    conversation_id = message.get('conversation_id')
+    if not message_id or not conversation_id:
+        return
+    unindex_conversation_message(message_id)
+    organization_id = message_org_id(message)
+    sort_key = _message_sort_key(message)
+    bucket = conversation_message_index.setdefault(conversation_id, [])
+    if not bucket or _message_sort_key(bucket[-1]) <= sort_key:
+        bucket.append(message)
+    else:
+        bisect.insort(bucket, message, key=_message_sort_key)
+    conversation_message_keys[message_id] = (conversation_id, sort_key, organization_id)
+    _index_message_org(message_id, organization_id)
+
+def unindex_conversation_message(message_id: str):
+    """Remove a message from the per-conversation index, if present."""
+    entry = conversation_message_keys.pop(message_id, None)
+    if not entry:
+        return
+    conversation_id, sort_key, organization_id = entry
+    message_ids = org_message_ids.get(organization_id)
+    if message_ids is not None:
+        message_ids.discard(message_id)
+        if not message_ids:
+            del org_message_ids[organization_id]
+    bucket = conversation_message_index.get(conversation_id)
+    if not bucket:
+        return
+    position = bisect.bisect_left(bucket, sort_key, key=_message_sort_key)
+    while position < len(bucket) and _message_sort_key(bucket[position]) == sort_key:
+        if bucket[position].get('id') == message_id:
+            del bucket[position]
+            break
+        position += 1
+    if not bucket:
+        conversation_message_index.pop(conversation_id, None)
+
+def rebuild_conversation_message_index():
+    """Rebuild the per-conversation index from conversation_messages_db."""
+    conversation_message_index.clear()
+    conversation_message_keys.clear()
+    org_message_ids.clear()
+    index_conversation_messages(conversation_messages_db.values())
+
+def index_conversation_messages(messages: Iterable[dict], organization_id: Optional[str] = None):
+    """
+    Bulk-add messages that are not indexed yet, sorting each touched bucket once.
+
+    Pass organization_id when every message belongs to that org (a partition
+    being loaded); otherwise each message's org is looked up.
+    """
+    touched: Set[str] = set()
+    for message in messages:
+        conversation_id = message.get('conversation_id')
+        if not message.get('id') or not conversation_id:
+            continue
+        message_org = organization_id or message_org_id(message)
+        conversation_message_index.setdefault(conversation_id, []).append(message)
+        conversation_message_keys[message['id']] = (conversation_id, _message_sort_key(message), message_org)
+        _index_message_org(message['id'], message_org)
+        touched.add(conversation_id)
+    for conversation_id in touched:
+        conversation_message_index[conversation_id].sort(key=_message_sort_key)
+
+def get_indexed_conversation_messages(conversation_id: str) -> List[dict]:
+    """Time-ordered messages for a conversation (do not mutate the result)."""
+    return conversation_message_index.get(conversation_id, [])
+
+def get_last_conversation_message(conversation_id: str) -> Optional[dict]:
+    bucket = conversation_message_index.get(conversation_id)
+    return bucket[-1] if bucket else None
+
+def index_user(user: dict, previous_email: Optional[str] = None):
+    """Add a user to the email and organization indexes (call after every insert/email change)."""
+    if previous_email and previous_email != user.get('email') and users_by_email.get(previous_email) == user['id']:
+        del users_by_email[previous_email]
+    if user.get('email'):
+        users_by_email.setdefault(user['email'], user['id'])
+    if user.get('organization_id'):
+        org_user_ids.setdefault(user['organization_id'], {})[user['id']] = None
+
+def index_organization(org: dict):
+    if org.get('domain'):
+        organizations_by_domain.setdefault(org['domain'].lower(), org['id'])
+    if org.get('name'):
+        organizations_by_name.setdefault(org['name'].strip().lower(), org['id'])
+
+def rebuild_directory_indexes():
+    """Rebuild the user and organization indexes from users_db / organizations_db."""
+    clear_directory_indexes()
+    for user in users_db.values():
+        index_user(user)
+    for org in organizations_db.values():
+        index_organization(org)
+
+def clear_directory_indexes():
+    users_by_email.clear()
+    org_user_ids.clear()
+    organizations_by_domain.clear()
+    organizations_by_name.clear()
+
+def find_user_by_email(email: Optional[str]) -> Optional[dict]:
+    user_id = users_by_email.get(email) if email else None
+    return users_db.get(user_id) if user_id else None
+
+def get_org_users(organization_id: Optional[str]) -> List[dict]:
+    """Users of one organization, in insertion order."""
+    return [users_db[uid] for uid in org_user_ids.get(organization_id, ()) if uid in users_db]
+
+def find_organization_by_domain(domain: str) -> Optional[dict]:
+    org_id = organizations_by_domain.get(domain.lower())
+    return organizations_db.get(org_id) if org_id else None
+
+def find_organization_by_name(name: str) -> Optional[dict]:
+    org_id = organizations_by_name.get(name.strip().lower())
+    return organizations_db.get(org_id) if org_id else None
+
+def index_comment(comment: dict):
+    issue_id = comment.get('issue_id')
+    if issue_id:
+        issue_comments.setdefault(issue_id, []).append(comment)
+    if comment.get('organization_id'):
+        org_comment_ids.setdefault(comment['organization_id'], {})[comment['id']] = None
+
+def rebuild_issue_comments_index():
+    """Rebuild the issue -> comments and org -> comments indexes from comments_db."""
+    issue_comments.clear()
+    org_comment_ids.clear()
+    for comment in comments_db.values():
+        index_comment(comment)
+
+def store_issue(issue: dict):
+    """Put an issue in issues_db and its organization's index."""
+    issues_db[issue['id']] = issue
+    if issue.get('organization_id'):
+        org_issue_ids.setdefault(issue['organization_id'], {})[issue['id']] = None
+
+def discard_issue(issue_id: str):
+    issue = issues_db.pop(issue_id, None)
+    if issue is None:
+        return
+    issue_ids = org_issue_ids.get(issue.get('organization_id'))
+    if issue_ids is not None:
+        issue_ids.pop(issue_id, None)
+        if not issue_ids:
+            del org_issue_ids[issue['organization_id']]
+
+def get_issue_comments(issue_id: str) -> List[dict]:
+    return issue_comments.get(issue_id, [])
+
+def profile_picture_url(value: Optional[str]) -> Optional[str]:
+    """Blob URL of a profile picture; legacy inline images are not sent out."""
+    return value if blob_store.is_blob_url(value) else None
+
+def migrate_inline_profile_pictures():
+    """Move base64 profile pictures left in users_db into the blob store."""
+    moved = 0
+    for user in users_db.values():
+        picture = user.get('profile_picture')
+        if not picture or blob_store.is_blob_url(picture):
+            continue
+        try:
+            user['profile_picture'] = blob_store.url_for(blob_store.put_encoded_image(picture))
+            moved += 1
+        except ValueError as e:
+            logger.warning(f"Dropping unreadable profile picture for user {user.get('id')}: {e}")
+            user['profile_picture'] = None
+        update_user_data(user)
+    if moved:
+        logger.info(f"Moved {moved} inline profile pictures to the blob store")
+
+def register_session(token: str, user_id: str):
+    """Record a new access token in session_store and the reverse indexes."""
+    _index_session(session_store.create(token, user_id), user_id)
+
+def _index_session(digest: str, user_id: str):
+    user_session_tokens.setdefault(user_id, set()).add(digest)
+    org_id = (users_db.get(user_id) or {}).get('organization_id')
+    if org_id:
+        org_session_users.setdefault(org_id, set()).add(user_id)
+        session_user_orgs[user_id] = org_id
+
+def _unindex_session(digest: str, user_id: str):
+    tokens = user_session_tokens.get(user_id)
+    if tokens is not None:
+        tokens.discard(digest)
+        if not tokens:
+            _forget_session_user(user_id)
+
+def rebuild_session_indexes():
+    """Re-index sessions restored from disk, dropping those of deleted users."""
+    user_session_tokens.clear()
+    org_session_users.clear()
+    session_user_orgs.clear()
+    for digest, user_id in list(session_store.items()):
+        if user_id in users_db:
+            _index_session(digest, user_id)
+        else:
+            session_store.revoke_digest(digest)
+
+def revoke_session(token: str):
+    """Remove a single access token."""
+    digest = token_digest(token)
+    user_id = session_store.revoke_digest(digest)
+    if user_id is not None:
+        _unindex_session(digest, user_id)
+
+def revoke_user_sessions(user_id: str) -> int:
+    """Remove every access token held by a user; returns how many were removed."""
+    tokens = user_session_tokens.get(user_id, set())
+    for digest in tokens:
+        session_store.revoke_digest(digest)
+    _forget_session_user(user_id)
+    return len(tokens)
+
+def _forget_session_user(user_id: str):
+    user_session_tokens.pop(user_id, None)
+    org_id = session_user_orgs.pop(user_id, None)
+    if org_id:
+        users = org_session_users.get(org_id)
+        if users is not None:
+            users.discard(user_id)
+            if not users:
+                org_session_users.pop(org_id, None)
+
+def clear_sessions():
+    session_store.clear()
+    user_session_tokens.clear()
+    org_session_users.clear()
+    session_user_orgs.clear()
 
 def user_has_active_session(user_id: Optional[str]) -> bool:
     """Check whether the given user has an active access token."""
     if not user_id:
         return False
-    return any(uid == user_id for uid in sessions_db.values())
+    return bool(user_session_tokens.get(user_id))
 
 
 def _enum_value(value: Any) -> Optional[str]:
@@ -374,6 +831,91 @@ def issue_model_to_dict(issue: IssueModel) -> Dict[str, Any]:
     }
 
 
+ISSUES_MAX_PAGE_SIZE = int(os.getenv("ISSUES_MAX_PAGE_SIZE", "500"))
+
+def encode_issue_cursor(issue: IssueModel) -> str:
+    """Opaque keyset cursor pointing just past the given issue.
+
+    Legacy rows can lack created_at; their cursor has an empty timestamp.
+    """
+    created_at = issue.created_at.isoformat() if issue.created_at else ""
+    raw = f"{created_at}|{issue.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_issue_cursor(cursor: str) -> Tuple[Optional[datetime], str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, issue_id = raw.split("|", 1)
+        return (datetime.fromisoformat(created_at) if created_at else None), issue_id
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def issue_cursor_clause(created_at: Optional[datetime], issue_id: str, nulls_first: bool):
+    """Issues after the cursor in created_at DESC, id DESC order.
+
+    A descending sort puts NULL created_at first on PostgreSQL and last on
+    SQLite and MySQL, so the rows past a cursor depend on the dialect.
+    """
+    if created_at is None:
+        after = and_(IssueModel.created_at.is_(None), IssueModel.id < issue_id)
+        return or_(after, IssueModel.created_at.is_not(None)) if nulls_first else after
+    after = or_(
+        IssueModel.created_at < created_at,
+        and_(IssueModel.created_at == created_at, IssueModel.id < issue_id)
+    )
+    return after if nulls_first else or_(after, IssueModel.created_at.is_(None))
+
+def issue_label_clause(label: str, dialect: str):
+    """Issues whose JSON labels array contains the label."""
+    if dialect == "postgresql":
+        return cast(IssueModel.labels, JSONB).contains([label])
+    # Match the encoded element inside the array's text form, whichever way
+    # non-ASCII characters were escaped when the row was written
+    encodings = {json.dumps(label), json.dumps(label, ensure_ascii=False)}
+    return or_(*(
+        cast(IssueModel.labels, String).like(f"%{_escape_like(encoded)}%", escape="\\")
+        for encoded in sorted(encodings)
+    ))
+
+# Columns read by the issue list, in IssueResponse field order
+ISSUE_LIST_COLUMNS = (
+    IssueModel.id, IssueModel.key, IssueModel.title, IssueModel.description,
+    IssueModel.issue_type, IssueModel.priority, IssueModel.status,
+    IssueModel.assignee_id, IssueModel.reporter_id, IssueModel.story_points,
+    IssueModel.labels, IssueModel.organization_id, IssueModel.visibility,
+    IssueModel.due_date, IssueModel.created_at, IssueModel.updated_at,
+)
+
+def issue_row_to_payload(row) -> Dict[str, Any]:
+    """IssueResponse-shaped dict built straight from an ISSUE_LIST_COLUMNS row."""
+    (issue_id, key, title, description, issue_type, priority, issue_status, assignee_id,
+     reporter_id, story_points, labels, organization_id, visibility, due_date,
+     created_at, updated_at) = row
+    return {
+        "id": issue_id,
+        "key": key,
+        "title": title,
+        "description": description or "",
+        "issue_type": issue_type.value,
+        "priority": priority.value,
+        "status": issue_status.value,
+        "assignee_id": assignee_id,
+        "reporter_id": reporter_id,
+        "story_points": story_points,
+        "labels": labels or [],
+        "organization_id": organization_id,
+        "visibility": visibility or "public",
+        "deadline": due_date.isoformat() if due_date else None,
+        "created_at": created_at.isoformat() if created_at else datetime.utcnow().isoformat(),
+        "updated_at": updated_at.isoformat() if updated_at else datetime.utcnow().isoformat(),
+    }
+
 def issue_dict_to_response(issue_data: Dict[str, Any]) -> IssueResponse:
     payload = dict(issue_data)
     payload["issue_type"] = IssueType(_enum_value(issue_data.get("issue_type")))
@@ -386,20 +928,20 @@ def get_online_user_ids_for_org(organization_id: Optional[str]) -> Set[str]:
     """Return online user IDs for a specific organization based on active tokens."""
     if not organization_id:
         return set()
-    online_ids: Set[str] = set()
-    for token_user_id in sessions_db.values():
-        user = users_db.get(token_user_id)
-        if user and user.get('organization_id') == organization_id:
-            online_ids.add(token_user_id)
-    return online_ids
+    return set(org_session_users.get(organization_id, ()))
 
 def _increment_presence(organization_id: str, user_id: str) -> bool:
+    """Count a local connection; True when the user just came online cluster-wide."""
     org = presence_counters.setdefault(organization_id, {})
     previous = org.get(user_id, 0)
     org[user_id] = previous + 1
-    return previous == 0
+    if previous != 0:
+        return False
+    _publish_presence(organization_id, user_id, True)
+    return not cluster_presence.is_online(organization_id, user_id)
 
 def _decrement_presence(organization_id: str, user_id: str) -> bool:
+    """Drop a local connection; True when the user just went offline cluster-wide."""
     org = presence_counters.get(organization_id)
     if not org:
         return False
@@ -408,27 +950,76 @@ def _decrement_presence(organization_id: str, user_id: str) -> bool:
         org.pop(user_id, None)
         if not org:
             presence_counters.pop(organization_id, None)
-        return previous > 0
+        if previous <= 0:
+            return False
+        _publish_presence(organization_id, user_id, False)
+        return not cluster_presence.is_online(organization_id, user_id)
     org[user_id] = previous - 1
     return False
 
-async def broadcast_to_sse(organization_id: str, message: dict):
-    if organization_id not in sse_connections:
+def _publish_presence(organization_id: str, user_id: str, online: bool):
+    realtime_backplane.publish({
+        'kind': 'presence',
+        'org': organization_id,
+        'user_id': user_id,
+        'online': online,
+    })
+
+def _local_presence_snapshot() -> Dict[str, List[str]]:
+    return {
+        org_id: [user_id for user_id, count in users.items() if count > 0]
+        for org_id, users in presence_counters.items()
+    }
+
+def get_present_user_ids(organization_id: Optional[str]) -> Set[str]:
+    """Users with a live websocket/SSE connection on any worker."""
+    if not organization_id:
+        return set()
+    present = {
+        user_id for user_id, count in presence_counters.get(organization_id, {}).items() if count > 0
+    }
+    present.update(cluster_presence.online_user_ids(organization_id))
+    return present
+
+def _remove_from_registry(registry: Dict[str, list], key: str, item) -> None:
+    items = registry.get(key)
+    if not items:
         return
-    stale: List[asyncio.Queue] = []
-    for queue in sse_connections[organization_id]:
-        try:
-            queue.put_nowait(message)
-        except Exception:
-            stale.append(queue)
-    if stale:
-        for queue in stale:
-            try:
-                sse_connections[organization_id].remove(queue)
-            except ValueError:
-                pass
-        if not sse_connections.get(organization_id):
-            sse_connections.pop(organization_id, None)
+    try:
+        items.remove(item)
+    except ValueError:
+        pass
+    if not items:
+        registry.pop(key, None)
+
+def add_sse_connection(organization_id: str, user_id: str) -> SseSubscriber:
+    subscriber = SseSubscriber(
+        user_id,
+        organization_id,
+        max_queue=SSE_QUEUE_SIZE,
+        policy=SSE_OVERFLOW_POLICY,
+        # A stream closed for overflowing ends its generator, which then
+        # runs remove_sse_connection and the presence bookkeeping
+        on_close=lambda _subscriber: remove_sse_connection(organization_id, user_id, _subscriber),
+    )
+    sse_connections.setdefault(organization_id, []).append(subscriber)
+    user_sse_connections.setdefault(user_id, []).append(subscriber)
+    sse_heartbeats.add(subscriber)
+    return subscriber
+
+def remove_sse_connection(organization_id: str, user_id: str, subscriber: SseSubscriber):
+    _remove_from_registry(sse_connections, organization_id, subscriber)
+    _remove_from_registry(user_sse_connections, user_id, subscriber)
+    sse_heartbeats.remove(subscriber)
+
+def _deliver_to_sse(organization_id: str, frame):
+    for subscriber in list(sse_connections.get(organization_id, [])):
+        subscriber.enqueue(frame)
+
+async def broadcast_to_sse(organization_id: str, message):
+    frame = event_logs.stamp(organization_id, message, sse_only=True)
+    _deliver_to_sse(organization_id, frame)
+    realtime_backplane.publish({'kind': 'sse', 'org': organization_id, 'message': frame.message})
 
 def add_chat_connection(organization_id: str, websocket, user_data: dict) -> bool:
     if organization_id not in active_chat_connections:
@@ -440,7 +1031,14 @@ def add_chat_connection(organization_id: str, websocket, user_data: dict) -> boo
         'user_name': user_data['name'],
         'user_avatar': user_data['avatar']
     }
+    connection_info['sender'] = ConnectionSender(
+        websocket,
+        label=user_data['name'],
+        max_queue=WEBSOCKET_SEND_QUEUE_SIZE,
+        on_close=lambda _sender: _drop_chat_connection(organization_id, connection_info),
+    )
     active_chat_connections[organization_id].append(connection_info)
+    user_chat_connections.setdefault(user_data['id'], []).append(connection_info)
     logger.info(f"Added chat connection for {user_data['name']} in org {organization_id}")
     return _increment_presence(organization_id, user_data['id'])
 
@@ -455,240 +1053,289 @@ def remove_chat_connection(organization_id: str, websocket, user_id: str) -> boo
         else:
             active_chat_connections.pop(organization_id, None)
         logger.info(f"Removed chat connection from org {organization_id}")
+    for conn in list(user_chat_connections.get(user_id, [])):
+        if conn['websocket'] == websocket:
+            _remove_from_registry(user_chat_connections, user_id, conn)
+            conn['sender'].close()
     return _decrement_presence(organization_id, user_id)
 
-async def broadcast_to_organization(organization_id: str, message: dict, exclude_websocket=None):
+def _drop_chat_connection(organization_id: Optional[str], connection: Dict[str, Any]):
+    """Forget a connection whose socket failed, without touching presence."""
+    if organization_id:
+        _remove_from_registry(active_chat_connections, organization_id, connection)
+    _remove_from_registry(user_chat_connections, connection['user_id'], connection)
+
+def _deliver_to_organization(organization_id: str, frame, exclude_websocket=None):
     if organization_id in active_chat_connections:
-        message_str = json.dumps(message)
-        connections_to_remove = []
-        for connection in active_chat_connections[organization_id]:
+        for connection in list(active_chat_connections[organization_id]):
             if connection['websocket'] == exclude_websocket:
                 continue
-            try:
-                await connection['websocket'].send_text(message_str)
-                logger.info(f"Sent chat message to {connection['user_name']}")
-            except Exception as e:
-                logger.info(f"Failed to send to {connection['user_name']}: {e}")
-                connections_to_remove.append(connection)
-        for conn in connections_to_remove:
-            try:
-                active_chat_connections[organization_id].remove(conn)
-            except ValueError:
-                pass
-        if not active_chat_connections.get(organization_id):
-            active_chat_connections.pop(organization_id, None)
+            connection['sender'].enqueue(frame)
     else:
         logger.info(f"No active chat connections for org {organization_id}")
+    _deliver_to_sse(organization_id, frame)
+
+def _deliver_to_users(user_ids: List[str], frame, exclude_websocket=None):
+    for user_id in dict.fromkeys(user_ids):
+        for connection in list(user_chat_connections.get(user_id, [])):
+            if connection['websocket'] == exclude_websocket:
+                continue
+            connection['sender'].enqueue(frame)
+        for subscriber in list(user_sse_connections.get(user_id, [])):
+            subscriber.enqueue(frame)
+
+async def broadcast_to_organization(organization_id: str, message: dict, exclude_websocket=None):
+    # Encode once; every websocket writer and SSE stream shares the frame
+    frame = event_logs.stamp(organization_id, message)
+    _deliver_to_organization(organization_id, frame, exclude_websocket)
+    realtime_backplane.publish({'kind': 'org', 'org': organization_id, 'message': frame.message})
+
+async def broadcast_to_users(
+    user_ids: List[str],
+    message: dict,
+    exclude_websocket=None,
+    organization_id: Optional[str] = None,
+):
+    """Deliver a message only to the websocket and SSE connections of the given users."""
+    if organization_id is None:
+        organization_id = next(
+            (users_db[u].get('organization_id') for u in user_ids if u in users_db), None
+        )
+    frame = event_logs.stamp(organization_id, message, user_ids=user_ids)
+    _deliver_to_users(user_ids, frame, exclude_websocket)
+    realtime_backplane.publish({
+        'kind': 'users', 'org': organization_id, 'users': list(user_ids), 'message': frame.message,
+    })
+
+def resume_frames(organization_id: str, user_id: str, last_event_id: Optional[str], sse: bool = False) -> list:
+    """Events missed since last_event_id, followed by a stream_position marker."""
+    frames = event_logs.replay(organization_id, last_event_id, user_id, sse) if last_event_id else []
+    marker = {
+        'type': 'stream_position',
+        'event_id': event_logs.position(organization_id),
+        # The gap is no longer buffered; the client must refetch over REST
+        'resync_required': frames is None,
+    }
+    return (frames or []) + [encode_frame(marker)]
+
+def resume_chat_connection(organization_id: str, websocket, user_id: str, since: Optional[str]):
+    for connection in user_chat_connections.get(user_id, []):
+        if connection['websocket'] == websocket:
+            for frame in resume_frames(organization_id, user_id, since):
+                connection['sender'].enqueue(frame)
+
+async def handle_backplane_event(envelope: dict):
+    """Apply an event published by another worker to this worker's connections."""
+    kind = envelope.get('kind')
+    origin = envelope.get('origin')
+    # Events are sequenced by each worker, so remote ones get a local id
+    if kind == 'org':
+        _deliver_to_organization(envelope['org'], event_logs.stamp(envelope['org'], envelope['message']))
+    elif kind == 'users':
+        users = envelope.get('users', [])
+        _deliver_to_users(users, event_logs.stamp(envelope.get('org'), envelope['message'], user_ids=users))
+    elif kind == 'sse':
+        _deliver_to_sse(envelope['org'], event_logs.stamp(envelope['org'], envelope['message'], sse_only=True))
+    elif kind == 'presence':
+        cluster_presence.apply_delta(origin, envelope['org'], envelope['user_id'], envelope['online'])
+    elif kind == 'presence_snapshot':
+        cluster_presence.apply_snapshot(origin, envelope.get('presence', {}))
+    elif kind == 'presence_request':
+        realtime_backplane.publish({'kind': 'presence_snapshot', 'presence': _local_presence_snapshot()})
+
+async def broadcast_presence_diff(organization_id: str, online: List[dict], offline: List[str]):
+    await broadcast_to_organization(
+        organization_id,
+        {
+            'type': 'presence_diff',
+            'organization_id': organization_id,
+            'online': online,
+            'offline': offline,
+            'timestamp': datetime.utcnow().isoformat(),
+        }
+    )
 
-    await broadcast_to_sse(organization_id, message)
+# Online/offline transitions go out as one presence_diff per org per
+# interval instead of one user_status_change each; see api/presence.py
+presence_tracker = PresenceAggregator(
+    broadcast_presence_diff,
+    interval=float(os.getenv("PRESENCE_DIFF_INTERVAL", "1")),
+)
+
+async def presence_sync_loop():
+    """Periodically re-announce local presence and expire silent workers."""
+    while True:
+        await asyncio.sleep(PRESENCE_SYNC_INTERVAL)
+        realtime_backplane.publish({'kind': 'presence_snapshot', 'presence': _local_presence_snapshot()})
+        cluster_presence.expire()
 
 async def broadcast_to_conversation(conversation_id: str, message: dict, exclude_websocket=None):
     """Broadcast message to all participants in a specific conversation"""
     conversation = conversations_db.get(conversation_id)
     if not conversation:
         return
-    
-    # Get organization from conversation participants
+
     participants = conversation.get('participants', [])
     if not participants:
         return
-    
-    # Get first participant's organization (assuming all in same org)
-    first_user = users_db.get(participants[0])
-    if not first_user:
-        return
-    
-    org_id = first_user['organization_id']
-    
-    # Broadcast to organization but add conversation context
+
+    # Deliver only to the participants' own connections, not the whole org
     message['conversation_id'] = conversation_id
-    await broadcast_to_organization(org_id, message, exclude_websocket)
+    await broadcast_to_users(participants, message, exclude_websocket, conversation_org_id(conversation))
+
+def typing_message(conversation_id: str, typing_users: List[dict], changes: List[dict]) -> dict:
+    last = changes[-1]
+    return {
+        'type': 'chat_typing',
+        'conversation_id': conversation_id,
+        'typing_users': typing_users,
+        'changes': changes,
+        # Clients that only read a single user get the latest change
+        'user_id': last['user_id'],
+        'user_name': last['user_name'],
+        'is_typing': last['is_typing'],
+    }
+
+async def broadcast_typing_state(conversation_id: str, typing_users: List[dict], changes: List[dict]):
+    """
+    One coalesced chat_typing event per conversation per flush interval.
+
+    Nobody is told about their own typing: participants who appear in the
+    event get a copy without themselves, or nothing if that leaves no change.
+    """
+    conversation = conversations_db.get(conversation_id)
+    if not conversation:
+        return
+    participants = conversation.get('participants', [])
+    organization_id = conversation_org_id(conversation)
+    involved = {u['user_id'] for u in typing_users} | {c['user_id'] for c in changes}
+
+    others = [user_id for user_id in participants if user_id not in involved]
+    if others:
+        await broadcast_to_users(others, typing_message(conversation_id, typing_users, changes), organization_id=organization_id)
+
+    for user_id in participants:
+        if user_id not in involved:
+            continue
+        their_changes = [c for c in changes if c['user_id'] != user_id]
+        if not their_changes:
+            continue
+        their_typers = [u for u in typing_users if u['user_id'] != user_id]
+        await broadcast_to_users([user_id], typing_message(conversation_id, their_typers, their_changes), organization_id=organization_id)
+
+def typing_conversation_id(organization_id: str, user_id: str, conversation_id: str) -> Optional[str]:
+    """The conversation a typing frame is for, or None if the sender is not in it."""
+    if conversation_id == "team-chat":
+        conversation_id = f"team-chat-{organization_id}"
+    conversation = conversations_db.get(conversation_id)
+    # Participants are read at flush time too, so membership changes apply at once
+    if not conversation or user_id not in conversation.get('participants', []):
+        return None
+    return conversation_id
+
+# Typing frames are coalesced instead of fanned out one by one; see
+# api/typing_indicators.py
+typing_aggregator = TypingAggregator(
+    broadcast_typing_state,
+    interval=float(os.getenv("TYPING_FLUSH_INTERVAL", "0.5")),
+    ttl=float(os.getenv("TYPING_TTL_SECONDS", "6")),
+)
 
 # FILE PERSISTENCE FUNCTIONS
+# All JSON file writes go through the write-behind queue so handlers never
+# wait on disk; see api/persistence.py.
 def save_user_data(user_data):
-    file_path = get_data_path("users.json")
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    
-    try:
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        data = {"users": []}
-    
-    existing_emails = [u.get('email') for u in data["users"]]
-    if user_data.get('email') not in existing_emails:
-        data["users"].append(user_data)
-        with open(file_path, 'w') as f:
-            json.dump(data, f, indent=2)
-        logger.info(f"User saved to file: {user_data['email']}")
-    else:
-        logger.info(f"User already exists in file: {user_data['email']}")
+    json_writer.insert("users.json", "users", user_data, key='email')
+    logger.info(f"User queued for file: {user_data['email']}")
 
 def update_user_data(user_data):
-    file_path = get_data_path("users.json")
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    try:
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        data = {"users": []}
-    found = False
-    for i, u in enumerate(data.get("users", [])):
-        if u.get('id') == user_data.get('id'):
-            data["users"][i] = user_data
-            found = True
-            break
-    if not found:
-        data.setdefault("users", []).append(user_data)
-    with open(file_path, 'w') as f:
-        json.dump(data, f, indent=2)
+    json_writer.upsert("users.json", "users", user_data)
 
 def save_organization_data(org_data):
-    file_path = get_data_path("organizations.json")
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    
-    try:
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        data = {"organizations": []}
-    
-    existing_ids = [o.get('id') for o in data["organizations"]]
-    if org_data.get('id') not in existing_ids:
-        data["organizations"].append(org_data)
-        with open(file_path, 'w') as f:
-            json.dump(data, f, indent=2)
-        logger.info(f"Organization saved to file: {org_data['name']}")
-    else:
-        logger.info(f"Organization already exists in file: {org_data['name']}")
+    json_writer.insert("organizations.json", "organizations", org_data)
+    logger.info(f"Organization queued for file: {org_data['name']}")
 
 def update_organization_data(org_data):
-    file_path = get_data_path("organizations.json")
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    data = {"organizations": []}
-    try:
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        pass
-
-    updated = False
-    for i, org in enumerate(data.get("organizations", [])):
-        if org.get('id') == org_data.get('id'):
-            data["organizations"][i] = org_data
-            updated = True
-            break
-
-    if not updated:
-        data.setdefault("organizations", []).append(org_data)
+    json_writer.upsert("organizations.json", "organizations", org_data)
+    logger.info(f"Organization update queued for file: {org_data['name']}")
+
+# Issues, comments and chat data are partitioned per organization under
+# orgs/<org_id>/; see api/org_store.py.
+def conversation_org_id(conversation: dict) -> Optional[str]:
+    """Owning organization of a conversation (legacy records lack organization_id)."""
+    if conversation.get('organization_id'):
+        return conversation['organization_id']
+    for participant_id in conversation.get('participants', []):
+        participant = users_db.get(participant_id)
+        if participant and participant.get('organization_id'):
+            return participant['organization_id']
+    return None
+
+def message_org_id(message: dict) -> Optional[str]:
+    conversation = conversations_db.get(message.get('conversation_id'))
+    if conversation:
+        return conversation_org_id(conversation)
+    sender = users_db.get(message.get('sender_id') or message.get('author_id'))
+    return sender.get('organization_id') if sender else None
+
+def org_conversation_ids(organization_id: str) -> List[str]:
+    return list(org_conversations.get(organization_id, ()))
+
+def store_conversation(conv: dict):
+    """Put a conversation in conversations_db and its organization's index."""
+    conversations_db[conv['id']] = conv
+    organization_id = conversation_org_id(conv)
+    if organization_id:
+        org_conversations.setdefault(organization_id, {})[conv['id']] = None
+
+def get_message_log(organization_id: str) -> MessageLogStore:
+    """The open message log of an organization, created on first use."""
+    log = message_logs.get(organization_id)
+    if log is None:
+        log = message_logs[organization_id] = MessageLogStore(
+            get_data_path(org_data_name(organization_id, "conversation_messages.json"), ensure_dir=False),
+            segment_max_bytes=CHAT_LOG_SEGMENT_MAX_BYTES,
+            max_sealed_segments=CHAT_LOG_MAX_SEGMENTS,
+        )
+        os.makedirs(os.path.dirname(log.snapshot_path), exist_ok=True)
+    return log
 
-    with open(file_path, 'w') as f:
-        json.dump(data, f, indent=2)
-    logger.info(f"Organization updated in file: {org_data['name']}")
+def close_message_logs():
+    for log in message_logs.values():
+        log.close()
+    message_logs.clear()
 
 def save_issue_data(issue_data):
-    file_path = get_data_path("issues.json")
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    
-    try:
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        data = {"issues": []}
-    
-    existing_ids = [i.get('id') for i in data["issues"]]
-    if issue_data.get('id') not in existing_ids:
-        data["issues"].append(issue_data)
-    else:
-        for i, issue in enumerate(data["issues"]):
-            if issue.get('id') == issue_data.get('id'):
-                data["issues"][i] = issue_data
-                break
-    
-    with open(file_path, 'w') as f:
-        json.dump(data, f, indent=2)
-    logger.info(f"Issue saved to file: {issue_data.get('key', issue_data.get('id'))}")
+    json_writer.upsert(org_data_name(issue_data['organization_id'], "issues.json"), "issues", issue_data)
+    logger.info(f"Issue queued for file: {issue_data.get('key', issue_data.get('id'))}")
 
-def remove_issue_from_file(issue_id: str):
-    file_path = get_data_path("issues.json")
-    try:
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return
-
-    original_count = len(data.get("issues", []))
-    data["issues"] = [issue for issue in data.get("issues", []) if issue.get("id") != issue_id]
-
-    if len(data["issues"]) != original_count:
-        with open(file_path, 'w') as f:
-            json.dump(data, f, indent=2)
-        logger.info(f"Issue removed from file: {issue_id}")
+def remove_issue_from_file(issue_id: str, organization_id: str):
+    json_writer.delete(org_data_name(organization_id, "issues.json"), "issues", issue_id)
+    logger.info(f"Issue removal queued for file: {issue_id}")
 
 def save_comment_data(comment_data):
-    file_path = get_data_path("comments.json")
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    
-    try:
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        data = {"comments": []}
-    
-    existing_ids = [c.get('id') for c in data["comments"]]
-    if comment_data.get('id') not in existing_ids:
-        data["comments"].append(comment_data)
-        with open(file_path, 'w') as f:
-            json.dump(data, f, indent=2)
-        logger.info(f"Comment saved to file: {comment_data['id']}")
+    json_writer.insert(org_data_name(comment_data['organization_id'], "comments.json"), "comments", comment_data)
+    logger.info(f"Comment queued for file: {comment_data['id']}")
 
 def save_conversation_data(conversation_data):
-    file_path = get_data_path("conversations.json")
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    try:
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        data = {"conversations": []}
-    
-    # Upsert by id
-    replaced = False
-    for i, conv in enumerate(data.get("conversations", [])):
-        if conv.get('id') == conversation_data.get('id'):
-            data["conversations"][i] = conversation_data
-            replaced = True
-            break
-    if not replaced:
-        data.setdefault("conversations", []).append(conversation_data)
-    
-    with open(file_path, 'w') as f:
-        json.dump(data, f, indent=2)
-    logger.info(f"Conversation saved: {conversation_data['id']}")
+    organization_id = conversation_org_id(conversation_data)
+    if not organization_id:
+        logger.error(f"Conversation {conversation_data['id']} has no organization; not saved")
+        return
+    json_writer.upsert(org_data_name(organization_id, "conversations.json"), "conversations", conversation_data)
+    logger.info(f"Conversation queued for file: {conversation_data['id']}")
 
 def save_conversation_message(msg_data):
-    file_path = get_data_path("conversation_messages.json")
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
     # Work on a copy so that normalization updates are persisted consistently
     message_record = dict(msg_data) if isinstance(msg_data, dict) else {}
     normalize_message_record(message_record)
-    try:
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        data = {"messages": []}
-
-    replaced = False
-    for idx, existing in enumerate(data.get("messages", [])):
-        if existing.get('id') == message_record.get('id'):
-            data["messages"][idx] = message_record
-            replaced = True
-            break
-
-    if not replaced:
-        data.setdefault("messages", []).append(message_record)
-
-    with open(file_path, 'w') as f:
-        json.dump(data, f, indent=2)
+    if isinstance(msg_data, dict):
+        index_conversation_message(msg_data)
+    organization_id = message_org_id(message_record)
+    if not organization_id:
+        logger.error(f"Conversation message {message_record.get('id')} has no organization; not saved")
+        return
+    get_message_log(organization_id).append(message_record)
     logger.info(f"Conversation message saved: {message_record.get('id')}")
 
 def normalize_message_record(message: dict) -> bool:
@@ -770,11 +1417,12 @@ def build_message_response(message: dict) -> ConversationMessageResponse:
     sender_name = message.get("sender_name") or message.get("author_name") or ""
     sender_avatar = message.get("sender_avatar") or message.get("author_avatar") or ""
 
-    sender_profile_picture = message.get("sender_profile_picture")
-    if not sender_profile_picture and sender_id:
-        sender = users_db.get(sender_id)
-        if sender:
-            sender_profile_picture = sender.get("profile_picture")
+    # The sender's current picture; messages never embed the image itself
+    sender = users_db.get(sender_id) if sender_id else None
+    sender_profile_picture = (
+        profile_picture_url(sender.get("profile_picture") if sender else None)
+        or profile_picture_url(message.get("sender_profile_picture"))
+    )
 
     created_at = message.get("created_at")
     if isinstance(created_at, datetime):
@@ -806,27 +1454,29 @@ def build_message_response(message: dict) -> ConversationMessageResponse:
 
 def delete_conversation_message(message_id):
     """Delete a message from persistent storage"""
-    file_path = get_data_path("conversation_messages.json")
-    try:
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-
-        # Filter out the message to delete
-        original_count = len(data.get("messages", []))
-        data["messages"] = [m for m in data.get("messages", []) if m.get('id') != message_id]
-
-        if len(data["messages"]) < original_count:
-            with open(file_path, 'w') as f:
-                json.dump(data, f, indent=2)
-            logger.info(f"Conversation message deleted: {message_id}")
-            return True
+    entry = conversation_message_keys.get(message_id)
+    if entry is None:
+        # No tombstone for an id that was never stored
+        logger.warning(f"Conversation message {message_id} not found; nothing deleted")
         return False
-    except (FileNotFoundError, json.JSONDecodeError) as e:
+    # Resolve the organization before touching the index, so a failure
+    # leaves the message both indexed and in its log
+    organization_id = entry[2] or message_org_id({'conversation_id': entry[0]})
+    if not organization_id:
+        logger.error(f"Cannot find the organization of message {message_id}")
+        return False
+    unindex_conversation_message(message_id)
+    try:
+        get_message_log(organization_id).delete(message_id)
+        logger.info(f"Conversation message deleted: {message_id}")
+        return True
+    except OSError as e:
         logger.error(f"Error deleting message: {e}")
         return False
 
 def load_data_from_files():
-    global users_db, organizations_db, issues_db, comments_db
+    """Load the users and organizations; per-org data is loaded on demand."""
+    global users_db, organizations_db
 
     # Load users
     try:
@@ -846,70 +1496,162 @@ def load_data_from_files():
     except Exception as e:
         logger.warning(f"Could not load organizations.json: {e}")
 
-    # Load issues
-    try:
-        issue_data = safe_load_json(get_data_path("issues.json"), "issues")
-        for issue in issue_data.get("issues", []):
-            issues_db[issue['id']] = issue
-        logger.info(f"Loaded {len(issues_db)} issues from file")
-    except Exception as e:
-        logger.warning(f"Could not load issues.json: {e}")
+    rebuild_directory_indexes()
+    migrate_inline_profile_pictures()
 
-    # Load comments
-    try:
-        comment_data = safe_load_json(get_data_path("comments.json"), "comments")
-        for comment in comment_data.get("comments", []):
-            comments_db[comment['id']] = comment
-        logger.info(f"Loaded {len(comments_db)} comments from file")
-    except Exception as e:
-        logger.warning(f"Could not load comments.json: {e}")
-    
-    migrate_existing_data()
+def partition_legacy_data():
+    """
+    Split the old all-tenant issues, comments, conversations and message
+    files into per-org partitions. Runs once; the originals are kept with a
+    .pre-partition suffix.
+    """
+    legacy_messages_path = get_data_path("conversation_messages.json", ensure_dir=False)
+    legacy_paths = [get_data_path(name, ensure_dir=False) for name in ("issues.json", "comments.json", "conversations.json")]
+    legacy_paths += [legacy_messages_path, f"{legacy_messages_path}.segments"]
+    if not any(os.path.exists(path) for path in legacy_paths):
+        return
 
-def load_chat_data_from_files():
-    global conversations_db, conversation_messages_db, user_conversations_db
-    
-    # Load conversations
-    try:
-        conv_data = safe_load_json(get_data_path("conversations.json"), "conversations")
-        for conv in conv_data.get("conversations", []):
-            conversations_db[conv['id']] = conv
-            # Build user conversation mapping
-            for participant_id in conv.get('participants', []):
-                if participant_id not in user_conversations_db:
-                    user_conversations_db[participant_id] = []
-                if conv['id'] not in user_conversations_db[participant_id]:
-                    user_conversations_db[participant_id].append(conv['id'])
-        logger.info(f"Loaded {len(conversations_db)} conversations from file")
-    except Exception:
-        pass
-    
-    # Load conversation messages
-    try:
-        conv_data = safe_load_json(get_data_path("conversation_messages.json"), "messages")
-        messages_updated = False
-        for m in conv_data.get("messages", []):
-            if normalize_message_record(m):
-                messages_updated = True
-            conversation_messages_db[m['id']] = m
-        logger.info(f"Loaded {len(conversation_messages_db)} conversation messages from file")
-
-        if messages_updated:
-            try:
-                file_path = get_data_path("conversation_messages.json")
-                with open(file_path, 'w') as f:
-                    json.dump({"messages": list(conversation_messages_db.values())}, f, indent=2)
-                logger.info("Normalized legacy conversation messages and persisted updates")
-            except Exception as e:
-                logger.error(f"Failed to persist normalized chat messages: {e}")
-    except Exception:
-        pass
-    
-    # Ensure team chat conversation exists for all organizations
-    for org_id in organizations_db.keys():
-        team_conv_id = f"team-chat-{org_id}"
-        if team_conv_id not in conversations_db:
-            create_team_conversation(org_id)
+    partitions: Dict[Tuple[str, str], List[dict]] = {}
+
+    def add(organization_id: Optional[str], filename: str, record: dict) -> bool:
+        if not organization_id:
+            return False
+        partitions.setdefault((organization_id, filename), []).append(record)
+        return True
+
+    issue_orgs: Dict[str, str] = {}
+    for issue in safe_load_json(get_data_path("issues.json"), "issues").get("issues", []):
+        issue_orgs[issue['id']] = issue.get('organization_id')
+        add(issue.get('organization_id'), "issues.json", issue)
+
+    unassigned = 0
+    for comment in safe_load_json(get_data_path("comments.json"), "comments").get("comments", []):
+        comment.setdefault('organization_id', issue_orgs.get(comment.get('issue_id')))
+        unassigned += not add(comment['organization_id'], "comments.json", comment)
+
+    conversation_orgs: Dict[str, Optional[str]] = {}
+    for conv in safe_load_json(get_data_path("conversations.json"), "conversations").get("conversations", []):
+        conversation_orgs[conv['id']] = conversation_org_id(conv)
+        unassigned += not add(conversation_orgs[conv['id']], "conversations.json", conv)
+
+    legacy_log = MessageLogStore(legacy_messages_path)
+    for message in legacy_log.replay().values():
+        organization_id = conversation_orgs.get(message.get('conversation_id')) or message_org_id(message)
+        unassigned += not add(organization_id, "conversation_messages.json", message)
+    legacy_log.close()
+
+    for (organization_id, filename), records in partitions.items():
+        if filename == "conversation_messages.json":
+            get_message_log(organization_id).compact(records)
+        else:
+            json_writer.replace_all(org_data_name(organization_id, filename), filename[:-len(".json")], records)
+    json_writer.flush_sync()
+    close_message_logs()
+
+    for path in legacy_paths:
+        if os.path.exists(path):
+            os.replace(path, f"{path}.pre-partition")
+    if unassigned:
+        logger.warning(f"{unassigned} records had no organization and were left in the .pre-partition files")
+    logger.info(f"Partitioned legacy data files into {len({org for org, _ in partitions})} organizations")
+
+def register_conversation(conv: dict):
+    store_conversation(conv)
+    for participant_id in conv.get('participants', []):
+        if participant_id not in user_conversations_db:
+            user_conversations_db[participant_id] = []
+        if conv['id'] not in user_conversations_db[participant_id]:
+            user_conversations_db[participant_id].append(conv['id'])
+
+async def load_organization_data(organization_id: str):
+    """Read one organization's partition into the in-memory stores."""
+    issues = await json_writer.load(org_data_name(organization_id, "issues.json"), "issues")
+    comments = await json_writer.load(org_data_name(organization_id, "comments.json"), "comments")
+    conversations = await json_writer.load(org_data_name(organization_id, "conversations.json"), "conversations")
+    message_log = get_message_log(organization_id)
+    messages = await asyncio.to_thread(message_log.replay)
+
+    for issue in issues:
+        store_issue(issue)
+    for comment in comments:
+        comment.setdefault('organization_id', organization_id)
+        comments_db[comment['id']] = comment
+        index_comment(comment)
+    for conv in conversations:
+        register_conversation(conv)
+
+    # Snapshot + replayed log segments
+    messages_updated = message_log.has_segments()
+    for m in messages.values():
+        if normalize_message_record(m):
+            messages_updated = True
+        conversation_messages_db[m['id']] = m
+    index_conversation_messages(messages.values(), organization_id)
+    if messages_updated:
+        try:
+            await asyncio.to_thread(message_log.compact, list(messages.values()))
+        except Exception as e:
+            logger.error(f"Failed to compact chat message log for org {organization_id}: {e}")
+
+    migrate_existing_data(organization_id, issues)
+    if organization_id in organizations_db:
+        create_team_conversation(organization_id)
+    logger.info(
+        f"Org {organization_id}: {len(issues)} issues, {len(comments)} comments, "
+        f"{len(conversations)} conversations, {len(messages)} messages"
+    )
+
+def unload_organization_data(organization_id: str):
+    """Drop one organization's issues, comments and chat data from memory."""
+    for issue_id in org_issue_ids.pop(organization_id, ()):
+        issues_db.pop(issue_id, None)
+    for comment_id in org_comment_ids.pop(organization_id, ()):
+        comment = comments_db.pop(comment_id, None)
+        if comment is not None:
+            issue_comments.pop(comment.get('issue_id'), None)
+
+    conversation_ids = set(org_conversations.pop(organization_id, ()))
+    for conv_id in conversation_ids:
+        for message in conversation_message_index.pop(conv_id, []):
+            conversation_messages_db.pop(message.get('id'), None)
+            conversation_message_keys.pop(message.get('id'), None)
+    # Messages outside the org's conversations come from the per-org index
+    # rather than a scan of every loaded message
+    for message_id in org_message_ids.pop(organization_id, ()):
+        conversation_messages_db.pop(message_id, None)
+        unindex_conversation_message(message_id)
+    for conv_id in conversation_ids:
+        conversation = conversations_db.pop(conv_id, {})
+        for participant_id in conversation.get('participants', []):
+            user_conversations = user_conversations_db.get(participant_id)
+            if user_conversations and conv_id in user_conversations:
+                user_conversations.remove(conv_id)
+                if not user_conversations:
+                    del user_conversations_db[participant_id]
+
+    message_log = message_logs.pop(organization_id, None)
+    if message_log is not None:
+        message_log.close()
+    event_logs.drop(organization_id)
+
+def _org_has_connections(organization_id: str) -> bool:
+    return bool(active_chat_connections.get(organization_id) or sse_connections.get(organization_id))
+
+org_partitions = OrgPartitions(
+    load_organization_data,
+    unload_organization_data,
+    idle_seconds=ORG_IDLE_SECONDS,
+    is_pinned=_org_has_connections,
+)
+
+async def org_eviction_loop():
+    """Periodically unload organizations nobody has used for a while."""
+    while True:
+        await asyncio.sleep(ORG_EVICTION_INTERVAL)
+        try:
+            org_partitions.evict_idle()
+        except Exception as e:
+            logger.error(f"Organization eviction failed: {e}")
 
 def create_team_conversation(organization_id: str):
     """Create default team chat conversation for organization"""
@@ -918,7 +1660,7 @@ def create_team_conversation(organization_id: str):
         return conversations_db[team_conv_id]
     
     # Get all users in organization
-    org_users = [u['id'] for u in users_db.values() if u.get('organization_id') == organization_id]
+    org_users = [u['id'] for u in get_org_users(organization_id)]
     
     conversation = {
         'id': team_conv_id,
@@ -930,7 +1672,7 @@ def create_team_conversation(organization_id: str):
         'updated_at': datetime.utcnow().isoformat()
     }
     
-    conversations_db[team_conv_id] = conversation
+    store_conversation(conversation)
     save_conversation_data(conversation)
     
     # Add to user conversations mapping
@@ -944,18 +1686,12 @@ def create_team_conversation(organization_id: str):
     return conversation
 
 def log_data_state():
-    logger.info(f"Data state: {len(users_db)} users, {len(organizations_db)} orgs, {len(issues_db)} issues, {len(comments_db)} comments, {len(conversations_db)} conversations")
+    logger.info(f"Data state: {len(users_db)} users, {len(organizations_db)} orgs ({len(org_partitions.loaded())} loaded), {len(issues_db)} issues, {len(comments_db)} comments, {len(conversations_db)} conversations")
 
 # Utility functions
-def hash_password(password: str) -> str:
-    return hashlib.sha256((password + SECRET_KEY).encode()).hexdigest()
-
-def verify_password(password: str, hashed: str) -> bool:
-    return hash_password(password) == hashed
-
 def create_access_token(user_id: str) -> str:
     token = secrets.token_urlsafe(32)
-    sessions_db[token] = user_id
+    register_session(token, user_id)
     logger.info(f"Created access token for user: {user_id}")
     return token
 
@@ -979,28 +1715,41 @@ def create_user_avatar(name: str) -> str:
     else:
         return "UN"
 
-def verify_access_token(token: str) -> Optional[dict]:
-    try:
-        user_id = sessions_db.get(token)
-        if not user_id:
-            return None
-        
-        user = users_db.get(user_id)
-        if not user:
+def issue_auth_tokens(user_id: str) -> Dict[str, Any]:
+    """Tokens for a successful login, in the form AUTH_TOKEN_MODE selects."""
+    if AUTH_TOKEN_MODE != "jwt":
+        return {"access_token": create_access_token(user_id)}
+    tokens = token_signer.issue(user_id, (users_db.get(user_id) or {}).get('organization_id'))
+    # Presence and logout bookkeeping stay local; authentication never reads them
+    register_session(tokens["refresh_token"], user_id)
+    logger.info(f"Issued signed tokens for user: {user_id}")
+    return tokens
+
+def resolve_access_token(token: str) -> Optional[dict]:
+    """User behind a bearer token: a signed access token or an opaque session."""
+    if AUTH_TOKEN_MODE == "jwt" and looks_like_jwt(token):
+        claims = token_signer.decode(token)
+        user = users_db.get(claims["sub"]) if claims else None
+        # Access tokens are short-lived and checked against this worker's
+        # logout time only; refresh tokens also check the shared cutoff
+        if not user or claims["iat"] <= user.get('tokens_revoked_at', 0):
             return None
-            
         return user
+    user_id = session_store.get(token)
+    return users_db.get(user_id) if user_id else None
+
+def verify_access_token(token: str) -> Optional[dict]:
+    try:
+        return resolve_access_token(token)
     except Exception as e:
         logger.error(f"Token verification error: {e}")
         return None
 
-def migrate_existing_data():
-    logger.info("Starting data migration...")
-    
-    # Migrate issues to add visibility field
+def migrate_existing_data(organization_id: str, issues: List[dict]):
+    """Backfill fields added after an organization's issues were written."""
     issues_updated = 0
     deadline_updates = 0
-    for issue_id, issue in issues_db.items():
+    for issue in issues:
         if 'visibility' not in issue:
             issue['visibility'] = 'public'
             issues_updated += 1
@@ -1014,37 +1763,25 @@ def migrate_existing_data():
         if deadline_updates > 0:
             logger.info(f"Migrated {deadline_updates} issues to add deadline field")
         try:
-            file_path = get_data_path("issues.json")
-            data = {"issues": list(issues_db.values())}
-            with open(file_path, 'w') as f:
-                json.dump(data, f, indent=2)
-            logger.info("Updated issues saved to file")
+            json_writer.replace_all(org_data_name(organization_id, "issues.json"), "issues", issues)
+            logger.info("Updated issues queued for file")
         except Exception as e:
             logger.error(f"Failed to save migrated issues: {e}")
-    
-    logger.info("Data migration completed")
 
 # Authentication dependency
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
     try:
         token = credentials.credentials
-        user_id = sessions_db.get(token)
+        user = resolve_access_token(token)
         
-        if not user_id:
+        if not user:
             logger.warning(f"Invalid token used: {token[:10]}...")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid authentication token"
             )
         
-        user = users_db.get(user_id)
-        if not user:
-            logger.warning(f"User not found for token: {user_id}")
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User not found"
-            )
-        
+        await org_partitions.ensure(user.get('organization_id'))
         return user
     except HTTPException:
         raise
@@ -1083,7 +1820,7 @@ def test_endpoint():
 async def signup(request: SignupRequest):
     logger.info(f"Signup request for: {request.email}")
     
-    if any(u.get('email') == request.email for u in users_db.values()):
+    if find_user_by_email(request.email):
         logger.warning(f"User already exists: {request.email}")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -1133,7 +1870,7 @@ async def signup(request: SignupRequest):
 async def signup_member(request: MemberSignupRequest):
     logger.info(f"Member signup request for: {request.email}")
 
-    if any(u.get('email') == request.email for u in users_db.values()):
+    if find_user_by_email(request.email):
         logger.warning(f"User already exists: {request.email}")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -1147,7 +1884,7 @@ async def signup_member(request: MemberSignupRequest):
         )
 
     domain = request.email.split("@")[-1].lower()
-    org = next((o for o in organizations_db.values() if o.get('domain', '').lower() == domain), None)
+    org = find_organization_by_domain(domain)
     if not org:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -1220,9 +1957,8 @@ async def verify_otp(request: VerifyOTPRequest):
     signup_data = otp_data["signup_data"]
     org_domain = signup_data["email"].split("@")[1].lower()
     org_name_lower = signup_data["organization_name"].strip().lower()
-    for o in organizations_db.values():
-        if o.get("domain", "").lower() == org_domain or o.get("name", "").strip().lower() == org_name_lower:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Organization already exists. Use join flow.")
+    if find_organization_by_domain(org_domain) or find_organization_by_name(org_name_lower):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Organization already exists. Use join flow.")
 
     organization = {
         "id": org_id,
@@ -1234,6 +1970,7 @@ async def verify_otp(request: VerifyOTPRequest):
         "created_at": datetime.utcnow().isoformat()
     }
     organizations_db[org_id] = organization
+    index_organization(organization)
     
     user_id = str(uuid.uuid4())
     user = {
@@ -1244,33 +1981,26 @@ async def verify_otp(request: VerifyOTPRequest):
         "organization_id": org_id,
         "avatar": create_user_avatar(signup_data["name"]),
         "is_active": True,
-        "password_hash": hash_password(signup_data["password"]),
+        "password_hash": await password_hasher.hash(signup_data["password"]),
         "created_at": datetime.utcnow().isoformat()
     }
     users_db[user_id] = user
+    index_user(user)
     
     save_user_data(user)
     save_organization_data(organization)
     
     # Create team conversation for the new organization
+    org_partitions.mark_loaded(org_id)
     create_team_conversation(org_id)
     
     del otp_db[request.email]
     
     was_online = user_has_active_session(user_id)
-    access_token = create_access_token(user_id)
+    tokens = issue_auth_tokens(user_id)
     
     if not was_online:
-        await broadcast_to_organization(
-            org_id,
-            {
-                'type': 'user_status_change',
-                'user_id': user_id,
-                'user_name': user['name'],
-                'user_avatar': user.get('avatar'),
-                'is_online': True
-            }
-        )
+        presence_tracker.mark(org_id, user_id, True, user['name'], user.get('avatar'))
     
     logger.info(f"User created successfully: {user['name']} ({user['email']})")
     log_data_state()
@@ -1281,7 +2011,7 @@ async def verify_otp(request: VerifyOTPRequest):
     org_response = OrganizationResponse(**organization)
     
     return AuthResponse(
-        access_token=access_token,
+        **tokens,
         token_type="bearer",
         user=user_response,
         organization=org_response
@@ -1338,10 +2068,11 @@ async def verify_otp_member(request: VerifyOTPRequest):
         "organization_id": org_id,
         "avatar": create_user_avatar(signup_data["name"]),
         "is_active": True,
-        "password_hash": hash_password(signup_data["password"]),
+        "password_hash": await password_hasher.hash(signup_data["password"]),
         "created_at": datetime.utcnow().isoformat()
     }
     users_db[user_id] = user
+    index_user(user)
     save_user_data(user)
 
     organization['user_count'] = organization.get('user_count', 0) + 1
@@ -1349,6 +2080,7 @@ async def verify_otp_member(request: VerifyOTPRequest):
     update_organization_data(organization)
 
     # Add user to team conversation
+    await org_partitions.ensure(org_id)
     team_conv_id = f"team-chat-{org_id}"
     if team_conv_id in conversations_db:
         team_conv = conversations_db[team_conv_id]
@@ -1366,19 +2098,10 @@ async def verify_otp_member(request: VerifyOTPRequest):
     del otp_db[request.email]
 
     was_online = user_has_active_session(user_id)
-    access_token = create_access_token(user_id)
+    tokens = issue_auth_tokens(user_id)
 
     if not was_online:
-        await broadcast_to_organization(
-            org_id,
-            {
-                'type': 'user_status_change',
-                'user_id': user_id,
-                'user_name': user['name'],
-                'user_avatar': user.get('avatar'),
-                'is_online': True
-            }
-        )
+        presence_tracker.mark(org_id, user_id, True, user['name'], user.get('avatar'))
 
     user_payload = {k: v for k, v in user.items() if k != 'password_hash'}
     user_payload['is_online'] = True
@@ -1386,7 +2109,7 @@ async def verify_otp_member(request: VerifyOTPRequest):
     org_response = OrganizationResponse(**organization)
 
     return AuthResponse(
-        access_token=access_token,
+        **tokens,
         token_type="bearer",
         user=user_response,
         organization=org_response
@@ -1397,32 +2120,73 @@ async def verify_otp_member(request: VerifyOTPRequest):
 @app.post("/api/auth/logout")
 async def logout(current_user: dict = Depends(get_current_user)):
     user_id = current_user.get('id')
-    tokens_to_remove = [token for token, uid in sessions_db.items() if uid == user_id]
-    for token in tokens_to_remove:
-        del sessions_db[token]
-    
-    logger.info(f"User logged out: {current_user['email']} (removed {len(tokens_to_remove)} token(s))")
+    removed = revoke_user_sessions(user_id)
+    # Signed tokens cannot be deleted; reject every one issued up to now
+    revoked_at = time.time()
+    current_user['tokens_revoked_at'] = revoked_at
+    update_user_data(current_user)
+    if AUTH_TOKEN_MODE == "jwt":
+        await token_revocations.revoke_user(user_id, revoked_at)
+
+    logger.info(f"User logged out: {current_user['email']} (removed {removed} token(s))")
 
     if not user_has_active_session(user_id):
-        payload = {
-            'type': 'user_status_change',
-            'user_id': user_id,
-            'user_name': current_user.get('name'),
-            'user_avatar': current_user.get('avatar'),
-            'is_online': False
-        }
-        org_id = current_user.get('organization_id')
-        if org_id:
-            await broadcast_to_organization(org_id, payload)
+        presence_tracker.mark(
+            current_user.get('organization_id'), user_id, False, current_user.get('name'), current_user.get('avatar')
+        )
     
     return {"message": "Successfully logged out"}
 
+@app.post("/api/auth/refresh", response_model=TokenResponse)
+async def refresh_tokens(request: RefreshTokenRequest):
+    """Exchange a refresh token for a new access/refresh pair."""
+    invalid = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token"
+    )
+    claims = token_signer.decode(request.refresh_token, REFRESH) if AUTH_TOKEN_MODE == "jwt" else None
+    user = users_db.get(claims["sub"]) if claims else None
+    if not user or not user.get('is_active', False) or not claims.get("jti"):
+        raise invalid
+    revoked_at = max(user.get('tokens_revoked_at', 0), await token_revocations.cutoff(user['id']))
+    if claims["iat"] <= revoked_at:
+        raise invalid
+    # Each refresh token is exchanged once, whichever worker sees it
+    if not await token_revocations.consume(claims["jti"], user['id'], claims["exp"]):
+        raise invalid
+
+    # The session entry only feeds this worker's presence bookkeeping
+    revoke_session(request.refresh_token)
+    tokens = token_signer.issue(user['id'], user.get('organization_id'))
+    register_session(tokens["refresh_token"], user['id'])
+    return TokenResponse(**tokens, token_type="bearer")
+
 # Issue endpoints
 @app.get("/api/issues", response_model=List[IssueResponse])
 async def get_issues(
+    status_filter: Optional[List[IssueStatus]] = Query(None, alias="status"),
+    issue_type: Optional[List[IssueType]] = Query(None, alias="type"),
+    priority: Optional[List[Priority]] = Query(None),
+    assignee_id: Optional[str] = None,
+    sprint_id: Optional[str] = None,
+    epic_id: Optional[str] = None,
+    label: Optional[str] = None,
+    due_after: Optional[datetime] = None,
+    due_before: Optional[datetime] = None,
+    limit: Optional[int] = Query(None, ge=1, le=ISSUES_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
+    """List issues newest first.
+
+    Filters are applied in the database. When `limit` is given the result is
+    one page, and the `X-Next-Cursor` response header carries the cursor for
+    the next page (absent on the last page).
+
+    Only the response columns are selected and the rows are encoded directly,
+    skipping ORM objects and response-model validation.
+    """
     logger.info(f"Getting issues for user: {current_user['email']} (role: {current_user['role']})")
 
     org_id = current_user['organization_id']
@@ -1431,10 +2195,11 @@ async def get_issues(
     if hasattr(user_role, "value"):
         user_role = user_role.value
 
-    query = db.query(IssueModel).filter(IssueModel.organization_id == org_id)
+    dialect = db.bind.dialect.name
+    query = select(*ISSUE_LIST_COLUMNS).where(IssueModel.organization_id == org_id)
 
     if user_role not in ['super_admin', 'admin', 'project_manager']:
-        query = query.filter(
+        query = query.where(
             or_(
                 IssueModel.reporter_id == user_id,
                 IssueModel.assignee_id == user_id,
@@ -1442,25 +2207,47 @@ async def get_issues(
             )
         )
 
-    issues = query.order_by(IssueModel.created_at.desc()).all()
-    logger.info(f"Found {len(issues)} issues for organization {org_id}")
-
-    processed_issues: List[IssueResponse] = []
-    for issue_model in issues:
-        serialized = issue_model_to_dict(issue_model)
-        issues_db[issue_model.id] = {
-            **serialized,
-            "comments": [c for c in comments_db.values() if c.get('issue_id') == issue_model.id]
-        }
-        processed_issues.append(issue_dict_to_response(serialized))
+    if status_filter:
+        query = query.where(IssueModel.status.in_([ModelIssueStatus(s.value) for s in status_filter]))
+    if issue_type:
+        query = query.where(IssueModel.issue_type.in_([ModelIssueType(t.value) for t in issue_type]))
+    if priority:
+        query = query.where(IssueModel.priority.in_([ModelPriority(p.value) for p in priority]))
+    if assignee_id:
+        query = query.where(IssueModel.assignee_id == assignee_id)
+    if sprint_id:
+        query = query.where(IssueModel.sprint_id == sprint_id)
+    if epic_id:
+        query = query.where(IssueModel.epic_id == epic_id)
+    if label:
+        query = query.where(issue_label_clause(label, dialect))
+    if due_after:
+        query = query.where(IssueModel.due_date >= due_after)
+    if due_before:
+        query = query.where(IssueModel.due_date < due_before)
+
+    if cursor:
+        cursor_created_at, cursor_id = decode_issue_cursor(cursor)
+        query = query.where(issue_cursor_clause(cursor_created_at, cursor_id, nulls_first=dialect == "postgresql"))
+
+    query = query.order_by(IssueModel.created_at.desc(), IssueModel.id.desc())
+    headers = {}
+    if limit:
+        rows = (await db.execute(query.limit(limit + 1))).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            headers["X-Next-Cursor"] = encode_issue_cursor(rows[-1])
+    else:
+        rows = (await db.execute(query)).all()
+    logger.info(f"Found {len(rows)} issues for organization {org_id}")
 
-    return processed_issues
+    return encoded_json_response(dumps([issue_row_to_payload(row) for row in rows]), headers=headers)
 
 @app.post("/api/issues", response_model=IssueResponse)
 async def create_issue(
     request: CreateIssueRequest,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     logger.info(f"Creating issue: {request.title}")
     
@@ -1533,11 +2320,11 @@ async def create_issue(
     )
 
     db.add(issue_model)
-    db.commit()
-    db.refresh(issue_model)
+    await db.commit()
+    await db.refresh(issue_model)
 
     serialized_issue = issue_model_to_dict(issue_model)
-    issues_db[issue_id] = {**serialized_issue, "comments": []}
+    store_issue(serialized_issue)
     save_issue_data(serialized_issue)
 
     logger.info(f"Issue created: {serialized_issue['key']} by {current_user['name']} (role: {user_role})")
@@ -1550,15 +2337,11 @@ async def update_issue(
     issue_id: str,
     request: UpdateIssueRequest,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     logger.info(f"Updating issue: {issue_id}")
 
-    issue_model = (
-        db.query(IssueModel)
-        .filter(IssueModel.id == issue_id)
-        .first()
-    )
+    issue_model = await db.get(IssueModel, issue_id)
     if not issue_model:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -1642,14 +2425,11 @@ async def update_issue(
 
     issue_model.updated_at = datetime.utcnow()
 
-    db.commit()
-    db.refresh(issue_model)
+    await db.commit()
+    await db.refresh(issue_model)
 
     serialized_issue = issue_model_to_dict(issue_model)
-    issues_db[issue_id] = {
-        **serialized_issue,
-        "comments": [c for c in comments_db.values() if c.get('issue_id') == issue_id]
-    }
+    store_issue(serialized_issue)
     save_issue_data(serialized_issue)
 
     logger.info(f"Issue updated: {serialized_issue['key']} by {current_user['name']}")
@@ -1660,15 +2440,11 @@ async def update_issue(
 async def delete_issue(
     issue_id: str,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     logger.info(f"Deleting issue: {issue_id}")
 
-    issue_model = (
-        db.query(IssueModel)
-        .filter(IssueModel.id == issue_id)
-        .first()
-    )
+    issue_model = await db.get(IssueModel, issue_id)
     if not issue_model:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -1681,11 +2457,11 @@ async def delete_issue(
             detail="Access denied"
         )
 
-    db.delete(issue_model)
-    db.commit()
+    await db.delete(issue_model)
+    await db.commit()
 
-    issues_db.pop(issue_id, None)
-    remove_issue_from_file(issue_id)
+    discard_issue(issue_id)
+    remove_issue_from_file(issue_id, issue_model.organization_id)
 
     logger.info(f"Issue deleted: {issue_model.key} by {current_user['name']}")
     log_data_state()
@@ -1693,22 +2469,44 @@ async def delete_issue(
     return {"message": "Issue deleted successfully"}
 
 # Comment endpoints
+@app.get("/api/issues/{issue_id}/comments", response_model=List[CommentResponse])
+async def get_comments(
+    issue_id: str,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    issue_model = await db.get(IssueModel, issue_id)
+    if not issue_model:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Issue not found"
+        )
+
+    if issue_model.organization_id != current_user['organization_id']:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied"
+        )
+
+    return [CommentResponse(**comment) for comment in get_issue_comments(issue_id)]
+
 @app.post("/api/issues/{issue_id}/comments", response_model=CommentResponse)
 async def add_comment(
     issue_id: str, 
     request: CreateCommentRequest, 
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     logger.info(f"Adding comment to issue: {issue_id}")
     
-    issue = issues_db.get(issue_id)
+    issue = await db.get(IssueModel, issue_id)
     if not issue:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Issue not found"
         )
     
-    if issue.get('organization_id') != current_user['organization_id']:
+    if issue.organization_id != current_user['organization_id']:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied"
@@ -1726,14 +2524,16 @@ async def add_comment(
         "content": request.content.strip(),
         "author_id": current_user['id'],
         "issue_id": issue_id,
+        "organization_id": issue.organization_id,
         "created_at": datetime.utcnow().isoformat(),
         "updated_at": datetime.utcnow().isoformat()
     }
     
     comments_db[comment_id] = comment
+    index_comment(comment)
     save_comment_data(comment)
     
-    logger.info(f"Comment added to issue {issue['key']} by {current_user['name']}")
+    logger.info(f"Comment added to issue {issue.key} by {current_user['name']}")
     
     return CommentResponse(**comment)
 
@@ -1761,13 +2561,11 @@ async def get_users(current_user: dict = Depends(get_current_user)):
         return UserResponse(**data)
     
     org_id = current_user.get("organization_id")
-    users = [u for u in users_db.values() if u.get("organization_id") == org_id]
+    users = get_org_users(org_id)
     
     # Online users determined by active access tokens (with presence as a secondary signal)
     online_user_ids = get_online_user_ids_for_org(org_id)
-    online_user_ids.update({
-        user_id for user_id, count in presence_counters.get(org_id, {}).items() if count > 0
-    })
+    online_user_ids.update(get_present_user_ids(org_id))
     
     user_responses = []
     for u in users:
@@ -1775,7 +2573,7 @@ async def get_users(current_user: dict = Depends(get_current_user)):
         user_data['is_online'] = u['id'] in online_user_ids
         user_responses.append(to_user_response(user_data))
     
-    return user_responses
+    return encoded_json_response(encode_models(user_responses, UserResponse))
 
 @app.put("/api/users/me/avatar", response_model=UserResponse)
 async def update_my_avatar(request: UpdateAvatarRequest, current_user: dict = Depends(get_current_user)):
@@ -1831,10 +2629,12 @@ async def update_user_profile(user_id: str, request: UpdateProfileRequest, curre
     # Update email if provided
     if request.email is not None:
         # Check if email is already taken by another user
-        email_exists = any(u.get('email') == request.email and u.get('id') != user_id for u in users_db.values())
-        if email_exists:
+        existing = find_user_by_email(request.email)
+        if existing and existing.get('id') != user_id:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Email already in use')
+        previous_email = user.get('email')
         user['email'] = request.email
+        index_user(user, previous_email=previous_email)
 
     users_db[user_id] = user
     update_user_data(user)
@@ -1870,8 +2670,12 @@ async def update_profile_picture(request: UpdateProfilePictureRequest, current_u
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='User not found')
 
-    # Store the base64 profile picture
-    user['profile_picture'] = request.profile_picture
+    # Keep the image in the blob store and only its URL on the user
+    try:
+        key = await asyncio.to_thread(blob_store.put_encoded_image, request.profile_picture)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    user['profile_picture'] = blob_store.url_for(key)
     users_db[user_id] = user
     update_user_data(user)
 
@@ -1894,6 +2698,24 @@ async def update_profile_picture(request: UpdateProfilePictureRequest, current_u
 
     return UserResponse(**sanitized)
 
+@app.get("/api/blobs/{key}")
+async def get_blob(key: str, request: Request):
+    """Serve a stored image. Keys are content hashes, so responses never change."""
+    path = blob_store.path_for(key)
+    if not path:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Blob not found')
+
+    etag = blob_store.etag_for(key)
+    headers = {
+        'ETag': etag,
+        'Cache-Control': 'public, max-age=31536000, immutable',
+    }
+    if_none_match = request.headers.get('if-none-match', '')
+    if if_none_match.strip() == '*' or etag in [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return FileResponse(path, media_type=blob_store.content_type_for(key), headers=headers)
+
 @app.put("/api/users/{user_id}/role", response_model=UserResponse)
 async def update_user_role(user_id: str, request: UpdateRoleRequest, current_user: dict = Depends(get_current_user)):
     _r = current_user.get("role")
@@ -1932,28 +2754,13 @@ async def get_conversations(current_user: dict = Depends(get_current_user)):
         # Get conversations where user is a participant
         user_conversations = []
         
-        for conv in conversations_db.values():
-            # Check if user is participant and conversation is in same org
-            conv_org_id = conv.get('organization_id')
-            if not conv_org_id and conv.get('participants'):
-                # Get org from first participant if not set
-                first_participant = users_db.get(conv['participants'][0])
-                if first_participant:
-                    conv_org_id = first_participant['organization_id']
-            
-            if conv_org_id != org_id:
-                continue
-                
+        for conv_id in org_conversation_ids(org_id):
+            conv = conversations_db[conv_id]
             if user_id not in conv.get('participants', []):
                 continue
             
             # Get last message for this conversation
-            conv_messages = [
-                msg for msg in conversation_messages_db.values()
-                if msg.get('conversation_id') == conv['id']
-            ]
-            conv_messages.sort(key=lambda m: m.get('created_at', ''))
-            last_message = conv_messages[-1] if conv_messages else None
+            last_message = get_last_conversation_message(conv['id'])
             
             # Convert last message to response format
             last_message_response = build_message_response(last_message) if last_message else None
@@ -1991,7 +2798,7 @@ async def get_conversations(current_user: dict = Depends(get_current_user)):
             reverse=True
         )
         
-        return user_conversations
+        return encoded_json_response(encode_models(user_conversations, ConversationResponse))
         
     except Exception as e:
         logger.error(f"Error loading conversations: {e}")
@@ -2053,7 +2860,7 @@ async def create_conversation(
             'updated_at': datetime.utcnow().isoformat()
         }
         
-        conversations_db[conversation_id] = conversation
+        store_conversation(conversation)
         save_conversation_data(conversation)
         
         # Update user conversations mapping
@@ -2109,25 +2916,23 @@ async def get_chat_messages(
                     detail="Access denied to conversation"
                 )
         
-        # Filter messages by conversation
+        # Walk the conversation index backwards to collect the last N messages
         filtered_messages = []
-        for message in conversation_messages_db.values():
-            if message.get('conversation_id') != conversation_id:
-                continue
-            
+        for message in reversed(get_indexed_conversation_messages(conversation_id)):
+            if len(filtered_messages) >= limit:
+                break
+
             # Verify message is from same organization
             msg_author = users_db.get(message.get('author_id'))
             if not msg_author or msg_author.get('organization_id') != org_id:
                 continue
-                
+
             filtered_messages.append(message)
-        
-        # Sort by creation time and limit
-        filtered_messages.sort(key=lambda m: m.get('created_at', ''))
-        filtered_messages = filtered_messages[-limit:]  # Get last N messages
+        filtered_messages.reverse()
         
         logger.info(f"Found {len(filtered_messages)} messages for conversation {conversation_id}")
-        return [build_message_response(msg) for msg in filtered_messages]
+        message_responses = [build_message_response(msg) for msg in filtered_messages]
+        return encoded_json_response(encode_models(message_responses, ConversationMessageResponse))
         
     except HTTPException:
         raise
@@ -2204,7 +3009,7 @@ async def send_chat_message(
         # Create response message with profile picture
         message_response = build_message_response(message)
         # Ensure sender profile picture is populated if we have it on the current user
-        if not message_response.sender_profile_picture and current_user.get('profile_picture'):
+        if not message_response.sender_profile_picture and profile_picture_url(current_user.get('profile_picture')):
             message_response = message_response.model_copy(
                 update={'sender_profile_picture': current_user.get('profile_picture')}
             )
@@ -2245,20 +3050,14 @@ async def get_conversation_messages(conversation_id: str, current_user: dict = D
         if current_user['id'] not in conversation.get('participants', []):
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
 
-        # Get messages for this conversation
-        messages = [
-            msg for msg in conversation_messages_db.values()
-            if msg.get('conversation_id') == conversation_id
-        ]
-
-        # Sort by created_at
-        messages.sort(key=lambda x: x.get('created_at', ''))
+        # Get messages for this conversation (already ordered by created_at)
+        messages = get_indexed_conversation_messages(conversation_id)
 
         # Convert to response format
         message_responses = [build_message_response(msg) for msg in messages]
 
         logger.info(f"Found {len(message_responses)} messages for conversation {conversation_id}")
-        return message_responses
+        return encoded_json_response(encode_models(message_responses, ConversationMessageResponse))
 
     except HTTPException:
         raise
@@ -2324,13 +3123,11 @@ async def get_chat_users(current_user: dict = Depends(get_current_user)):
         logger.info(f"Loading chat users for org: {current_user['organization_id']}")
         
         org_id = current_user['organization_id']
-        org_users = [u for u in users_db.values() if u.get('organization_id') == org_id and u.get('is_active', True)]
+        org_users = [u for u in get_org_users(org_id) if u.get('is_active', True)]
         
         # Combine token-based online detection with active connections as fallback
         online_user_ids = get_online_user_ids_for_org(org_id)
-        online_user_ids.update({
-            user_id for user_id, count in presence_counters.get(org_id, {}).items() if count > 0
-        })
+        online_user_ids.update(get_present_user_ids(org_id))
         
         # Create response with online status
         user_responses = []
@@ -2349,71 +3146,60 @@ async def get_chat_users(current_user: dict = Depends(get_current_user)):
             user_responses.append(UserResponse(**user_data))
         
         logger.info(f"Found {len(user_responses)} chat users, {len(online_user_ids)} online")
-        return user_responses
+        return encoded_json_response(encode_models(user_responses, UserResponse))
         
     except Exception as e:
         logger.error(f"Error loading chat users: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to load users: {str(e)}")
 
 @app.get("/api/chat/stream")
-async def chat_stream(request: Request, token: str):
+async def chat_stream(request: Request, token: str, last_event_id: Optional[str] = None):
     user_data = verify_access_token(token)
     if not user_data:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authentication token")
+    await org_partitions.ensure(user_data['organization_id'])
 
     org_id = user_data['organization_id']
 
-    queue: asyncio.Queue = asyncio.Queue()
-    sse_connections.setdefault(org_id, []).append(queue)
+    subscriber = add_sse_connection(org_id, user_data['id'])
+    # EventSource sends Last-Event-ID by itself when it reconnects
+    resume_from = request.headers.get('last-event-id') or last_event_id
+    for frame in resume_frames(org_id, user_data['id'], resume_from, sse=True):
+        subscriber.enqueue(frame)
 
     first_online = _increment_presence(org_id, user_data['id'])
     if first_online:
-        await broadcast_to_organization(
-            org_id,
-            {
-                'type': 'user_status_change',
-                'user_id': user_data['id'],
-                'user_name': user_data['name'],
-                'user_avatar': user_data['avatar'],
-                'is_online': True
-            }
-        )
+        presence_tracker.mark(org_id, user_data['id'], True, user_data['name'], user_data['avatar'])
 
     async def event_generator():
+        # Heartbeats arrive through the queue from sse_heartbeats, and
+        # StreamingResponse cancels this generator when the client leaves
         try:
             while True:
-                if await request.is_disconnected():
-                    break
-                try:
-                    message = await asyncio.wait_for(queue.get(), timeout=30)
-                    payload = json.dumps(message)
-                    event_type = message.get('type', 'message')
-                    yield f"event: {event_type}\ndata: {payload}\n\n"
-                except asyncio.TimeoutError:
-                    heartbeat = { 'type': 'heartbeat', 'timestamp': datetime.utcnow().isoformat() }
-                    yield f"event: heartbeat\ndata: {json.dumps(heartbeat)}\n\n"
+                frame = await subscriber.get()
+                if frame is None:
+                    break  # closed by the overflow policy
+                sse_heartbeats.touch(subscriber)
+                yield frame.sse
         finally:
-            try:
-                sse_connections.get(org_id, []).remove(queue)
-                if not sse_connections.get(org_id):
-                    sse_connections.pop(org_id, None)
-            except ValueError:
-                pass
+            remove_sse_connection(org_id, user_data['id'], subscriber)
             went_offline = _decrement_presence(org_id, user_data['id'])
             if went_offline and not user_has_active_session(user_data['id']):
-                await broadcast_to_organization(
-                    org_id,
-                    {
-                        'type': 'user_status_change',
-                        'user_id': user_data['id'],
-                        'user_name': user_data['name'],
-                        'user_avatar': user_data['avatar'],
-                        'is_online': False
-                    }
-                )
+                presence_tracker.mark(org_id, user_data['id'], False, user_data['name'], user_data['avatar'])
 
     return StreamingResponse(event_generator(), media_type='text/event-stream')
 
+@app.get("/api/chat/presence")
+async def chat_presence(current_user: dict = Depends(get_current_user)):
+    """Who is online right now; presence_diff events after event_id update it."""
+    org_id = current_user['organization_id']
+    online_user_ids = get_online_user_ids_for_org(org_id) | get_present_user_ids(org_id)
+    return {
+        'organization_id': org_id,
+        'online': sorted(online_user_ids),
+        'event_id': event_logs.position(org_id),
+    }
+
 @app.get("/api/chat/status")
 async def chat_status(current_user: dict = Depends(get_current_user)):
     """Get chat system status"""
@@ -2422,7 +3208,7 @@ async def chat_status(current_user: dict = Depends(get_current_user)):
     presence = presence_counters.get(org_id, {})
 
     token_online_ids = get_online_user_ids_for_org(org_id)
-    presence_online_ids = {user_id for user_id, count in presence.items() if count > 0}
+    presence_online_ids = get_present_user_ids(org_id)
     combined_online_ids = token_online_ids | presence_online_ids
 
     online_users = []
@@ -2442,38 +3228,32 @@ async def chat_status(current_user: dict = Depends(get_current_user)):
         'online_users': online_users,
         'total_messages': len(conversation_messages_db),
         'total_conversations': len(conversations_db),
-        'supports_websocket': WEBSOCKET_LIB_AVAILABLE
+        'supports_websocket': WEBSOCKET_LIB_AVAILABLE,
+        'backplane': realtime_backplane.kind,
+        'cluster_workers': cluster_presence.worker_count() + 1
     }
 
 # Enhanced WebSocket endpoint with chat support
 @app.websocket('/ws/{token}')
-async def websocket_chat(websocket: WebSocket, token: str):
+async def websocket_chat(websocket: WebSocket, token: str, since: Optional[str] = None):
     user_data = verify_access_token(token)
     if not user_data:
         await websocket.close(code=1008, reason="Invalid token")
         return
+    await org_partitions.ensure(user_data['organization_id'])
     
     await websocket.accept()
     logger.info(f"WebSocket connected: {user_data['name']}")
     
     org_id = user_data['organization_id']
     first_online = add_chat_connection(org_id, websocket, user_data)
+    resume_chat_connection(org_id, websocket, user_data['id'], since)
 
     # Ensure team conversation exists
     create_team_conversation(org_id)
 
     if first_online:
-        await broadcast_to_organization(
-            org_id,
-            {
-                'type': 'user_status_change',
-                'user_id': user_data['id'],
-                'user_name': user_data['name'],
-                'user_avatar': user_data['avatar'],
-                'is_online': True
-            },
-            exclude_websocket=websocket
-        )
+        presence_tracker.mark(org_id, user_data['id'], True, user_data['name'], user_data['avatar'])
 
     try:
         while True:
@@ -2544,20 +3324,12 @@ async def websocket_chat(websocket: WebSocket, token: str):
             
             # Handle typing indicators
             elif mtype == 'chat_typing':
-                conversation_id = payload.get('conversation_id', f"team-chat-{org_id}")
-                is_typing = payload.get('is_typing', False)
-                
-                await broadcast_to_conversation(
-                    conversation_id,
-                    {
-                        'type': 'chat_typing',
-                        'conversation_id': conversation_id,
-                        'user_id': user_data['id'],
-                        'user_name': user_data['name'],
-                        'is_typing': is_typing
-                    },
-                    exclude_websocket=websocket
+                conversation_id = typing_conversation_id(
+                    org_id, user_data['id'], payload.get('conversation_id', f"team-chat-{org_id}")
                 )
+                if conversation_id:
+                    is_typing = payload.get('is_typing', False)
+                    typing_aggregator.update(conversation_id, user_data['id'], bool(is_typing), user_data['name'])
                 
     except WebSocketDisconnect:
         logger.info(f"WebSocket disconnected: {user_data['name']}")
@@ -2566,18 +3338,12 @@ async def websocket_chat(websocket: WebSocket, token: str):
     finally:
         # Remove from chat connections
         went_offline = remove_chat_connection(org_id, websocket, user_data['id'])
+        if went_offline:
+            # Other tabs keep their typers; stale ones expire on the ttl
+            typing_aggregator.remove_user(user_data['id'])
 
         if went_offline and not user_has_active_session(user_data['id']):
-            await broadcast_to_organization(
-                org_id,
-                {
-                    'type': 'user_status_change',
-                    'user_id': user_data['id'],
-                    'user_name': user_data['name'],
-                    'user_avatar': user_data['avatar'],
-                    'is_online': False
-                }
-            )
+            presence_tracker.mark(org_id, user_data['id'], False, user_data['name'], user_data['avatar'])
 
 # Debug endpoints
 # Add these debug endpoints and improvements to your existing backend
@@ -2586,25 +3352,26 @@ async def websocket_chat(websocket: WebSocket, token: str):
 @app.get("/debug/token-status/{token}")
 async def debug_token_status(token: str):
     """Debug endpoint to check token status"""
-    user_id = sessions_db.get(token)
+    user_id = session_store.peek(token)
     user_data = users_db.get(user_id) if user_id else None
     
     return {
         "token": token[:10] + "..." if len(token) > 10 else token,
-        "token_exists_in_sessions": token in sessions_db,
+        "token_exists_in_sessions": user_id is not None,
         "user_id_from_token": user_id,
         "user_exists": bool(user_data),
         "user_name": user_data.get('name') if user_data else None,
-        "total_sessions": len(sessions_db),
-        "sessions_sample": {k[:10] + "...": v for k, v in list(sessions_db.items())[:3]}
+        "total_sessions": len(session_store),
+        "sessions_sample": {k[:10] + "...": v for k, v in list(session_store.items())[:3]}
     }
 
 @app.get("/debug/sessions")
 async def debug_sessions():
     """Debug endpoint to check all sessions"""
     return {
-        "total_sessions": len(sessions_db),
-        "sessions": {k[:10] + "...": v for k, v in sessions_db.items()}
+        "total_sessions": len(session_store),
+        "sessions": {k[:10] + "...": v for k, v in session_store.items()},
+        "metrics": session_store.stats()
     }
 
 # Update the verify_access_token function with better logging
@@ -2612,21 +3379,11 @@ def verify_access_token(token: str) -> Optional[dict]:
     """Verify access token and return user data"""
     try:
         logger.info(f"🔍 Verifying token: {token[:10]}... (length: {len(token)})")
-        logger.info(f"📊 Total sessions in memory: {len(sessions_db)}")
-        
-        user_id = sessions_db.get(token)
-        if not user_id:
-            logger.warning(f"❌ Token not found in sessions_db. Available tokens: {len(sessions_db)}")
-            if sessions_db:
-                sample_tokens = list(sessions_db.keys())[:3]
-                logger.info(f"🔍 Sample tokens: {[t[:10] + '...' for t in sample_tokens]}")
-            return None
-        
-        logger.info(f"✅ Token found, user_id: {user_id}")
+        logger.info(f"📊 Total sessions in memory: {len(session_store)}")
         
-        user = users_db.get(user_id)
+        user = resolve_access_token(token)
         if not user:
-            logger.warning(f"❌ User not found for user_id: {user_id}")
+            logger.warning(f"❌ Token invalid, expired or revoked. Active sessions: {len(session_store)}")
             return None
         
         logger.info(f"✅ User found: {user.get('name', 'Unknown')}")
@@ -2639,15 +3396,15 @@ def verify_access_token(token: str) -> Optional[dict]:
 def create_access_token(user_id: str) -> str:
     """Create access token for user"""
     token = secrets.token_urlsafe(32)
-    sessions_db[token] = user_id
+    register_session(token, user_id)
     logger.info(f"🔑 Created access token for user: {user_id}")
     logger.info(f"🎟️ Token: {token[:10]}... (length: {len(token)})")
-    logger.info(f"💾 Sessions count after creation: {len(sessions_db)}")
+    logger.info(f"💾 Sessions count after creation: {len(session_store)}")
     return token
 
 # Enhanced WebSocket endpoint with better error handling
 @app.websocket('/ws/{token}')
-async def websocket_chat(websocket: WebSocket, token: str):
+async def websocket_chat(websocket: WebSocket, token: str, since: Optional[str] = None):
     logger.info(f"🔌 WebSocket connection attempt with token: {token[:10]}...")
     
     user_data = verify_access_token(token)
@@ -2655,6 +3412,7 @@ async def websocket_chat(websocket: WebSocket, token: str):
         logger.error(f"❌ WebSocket authentication failed for token: {token[:10]}...")
         await websocket.close(code=1008, reason="Invalid token")
         return
+    await org_partitions.ensure(user_data['organization_id'])
     
     try:
         await websocket.accept()
@@ -2662,22 +3420,13 @@ async def websocket_chat(websocket: WebSocket, token: str):
         
         org_id = user_data['organization_id']
         first_online = add_chat_connection(org_id, websocket, user_data)
+        resume_chat_connection(org_id, websocket, user_data['id'], since)
 
         # Ensure team conversation exists
         create_team_conversation(org_id)
 
         if first_online:
-            await broadcast_to_organization(
-                org_id,
-                {
-                    'type': 'user_status_change',
-                    'user_id': user_data['id'],
-                    'user_name': user_data['name'],
-                    'user_avatar': user_data['avatar'],
-                    'is_online': True
-                },
-                exclude_websocket=websocket
-            )
+            presence_tracker.mark(org_id, user_data['id'], True, user_data['name'], user_data['avatar'])
 
         while True:
             msg_text = await websocket.receive_text()
@@ -2747,20 +3496,12 @@ async def websocket_chat(websocket: WebSocket, token: str):
             
             # Handle typing indicators
             elif mtype == 'chat_typing':
-                conversation_id = payload.get('conversation_id', f"team-chat-{org_id}")
-                is_typing = payload.get('is_typing', False)
-                
-                await broadcast_to_conversation(
-                    conversation_id,
-                    {
-                        'type': 'chat_typing',
-                        'conversation_id': conversation_id,
-                        'user_id': user_data['id'],
-                        'user_name': user_data['name'],
-                        'is_typing': is_typing
-                    },
-                    exclude_websocket=websocket
+                conversation_id = typing_conversation_id(
+                    org_id, user_data['id'], payload.get('conversation_id', f"team-chat-{org_id}")
                 )
+                if conversation_id:
+                    is_typing = payload.get('is_typing', False)
+                    typing_aggregator.update(conversation_id, user_data['id'], bool(is_typing), user_data['name'])
                 
     except WebSocketDisconnect:
         logger.info(f"🔌 WebSocket disconnected: {user_data['name']}")
@@ -2769,43 +3510,41 @@ async def websocket_chat(websocket: WebSocket, token: str):
     finally:
         # Remove from chat connections
         went_offline = remove_chat_connection(org_id, websocket, user_data['id'])
+        if went_offline:
+            # Other tabs keep their typers; stale ones expire on the ttl
+            typing_aggregator.remove_user(user_data['id'])
 
         if went_offline and not user_has_active_session(user_data['id']):
-            await broadcast_to_organization(
-                org_id,
-                {
-                    'type': 'user_status_change',
-                    'user_id': user_data['id'],
-                    'user_name': user_data['name'],
-                    'user_avatar': user_data['avatar'],
-                    'is_online': False
-                }
-            )
+            presence_tracker.mark(org_id, user_data['id'], False, user_data['name'], user_data['avatar'])
 
 # Enhanced login endpoint with better token logging
 @app.post("/api/auth/login", response_model=AuthResponse)
 async def login(request: LoginRequest):
     logger.info(f"Login request for: {request.email}")
 
-    user = None
-    for u in users_db.values():
-        if u.get('email') == request.email:
-            user = u
-            break
+    user = find_user_by_email(request.email)
 
     if not user:
+        # Same bcrypt cost as a wrong password, so timing doesn't reveal
+        # which emails have accounts
+        await password_hasher.verify_dummy(request.password)
         logger.warning(f"Login failed - user not found: {request.email}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
         )
 
-    if not verify_password(request.password, user.get('password_hash', '')):
+    password_ok, upgraded_hash = await password_hasher.verify(request.password, user.get('password_hash', ''))
+    if not password_ok:
         logger.warning(f"Login failed - wrong password: {request.email}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
         )
+    if upgraded_hash:
+        user['password_hash'] = upgraded_hash
+        update_user_data(user)
+        logger.info(f"Upgraded password hash to {password_hasher.preferred.scheme}: {request.email}")
 
     if not user.get('is_active', False):
         logger.warning(f"Login failed - user inactive: {request.email}")
@@ -2823,24 +3562,16 @@ async def login(request: LoginRequest):
         )
 
     # Ensure team conversation exists
+    await org_partitions.ensure(user['organization_id'])
     create_team_conversation(user['organization_id'])
 
     was_online = user_has_active_session(user['id'])
-    access_token = create_access_token(user['id'])
+    tokens = issue_auth_tokens(user['id'])
     if not was_online:
-        await broadcast_to_organization(
-            user['organization_id'],
-            {
-                'type': 'user_status_change',
-                'user_id': user['id'],
-                'user_name': user['name'],
-                'user_avatar': user.get('avatar'),
-                'is_online': True
-            }
-        )
+        presence_tracker.mark(user['organization_id'], user['id'], True, user['name'], user.get('avatar'))
 
     logger.info(f"Login successful: {user['name']} ({user['email']})")
-    logger.info(f"Token created: {access_token[:10]}...")
+    logger.info(f"Token created: {tokens['access_token'][:10]}...")
 
     user_payload = {k: v for k, v in user.items() if k != "password_hash"}
     user_payload['is_online'] = True
@@ -2848,28 +3579,27 @@ async def login(request: LoginRequest):
     org_response = OrganizationResponse(**organization)
 
     return AuthResponse(
-        access_token=access_token,
+        **tokens,
         token_type="bearer",
         user=user_response,
         organization=org_response
     )
 @app.get("/debug/clear-users")
 async def debug_clear_users():
-    global users_db, sessions_db
+    global users_db
     users_db.clear()
-    sessions_db.clear()
+    users_by_email.clear()
+    org_user_ids.clear()
+    clear_sessions()
     try:
-        path = get_data_path("users.json")
-        with open(path, "w") as f:
-            json.dump({"users": []}, f, indent=2)
+        json_writer.replace_all("users.json", "users", [])
     except Exception as e:
         logger.error(f"Failed to truncate users.json: {e}")
     return {"message": "Users and sessions cleared"}
 
 @app.get("/debug/clear-sessions")
 async def debug_clear_sessions():
-    global sessions_db
-    sessions_db.clear()
+    clear_sessions()
     return {"message": "Sessions cleared"}
 
 @app.get("/debug/data")
@@ -2879,31 +3609,60 @@ async def debug_data():
         "organizations_count": len(organizations_db),
         "issues_count": len(issues_db),
         "comments_count": len(comments_db),
-        "sessions_count": len(sessions_db),
+        "sessions_count": len(session_store),
         "conversations_count": len(conversations_db),
         "chat_messages_count": len(conversation_messages_db),
+        "organization_partitions": org_partitions.stats(),
+        "typing_indicators": typing_aggregator.stats(),
+        "realtime_replay": event_logs.stats(),
+        "sse_heartbeats": sse_heartbeats.stats(),
+        "presence_diffs": presence_tracker.stats(),
         "active_connections": len(sum(active_chat_connections.values(), [])),
         "timestamp": datetime.utcnow().isoformat()
     }
 
+@app.get("/debug/sse-clients")
+async def debug_sse_clients():
+    """Queue depth and drop counts of every SSE stream, most backed up first."""
+    clients = [subscriber.stats() for subscribers in sse_connections.values() for subscriber in subscribers]
+    clients.sort(key=lambda c: (c['depth'], c['dropped']), reverse=True)
+    return {
+        "policy": SSE_OVERFLOW_POLICY,
+        "max_queue": SSE_QUEUE_SIZE,
+        "clients": clients,
+    }
+
 @app.get("/debug/clear")
 async def debug_clear():
-    global users_db, organizations_db, issues_db, comments_db, otp_db, sessions_db, issue_counter
+    global users_db, organizations_db, issues_db, comments_db, otp_db, issue_counter
     global conversations_db, conversation_messages_db, user_conversations_db
     global active_chat_connections, sse_connections, presence_counters
+    global user_chat_connections, user_sse_connections
 
     users_db.clear()
     organizations_db.clear()
+    clear_directory_indexes()
     issues_db.clear()
     comments_db.clear()
+    issue_comments.clear()
+    org_issue_ids.clear()
+    org_comment_ids.clear()
     otp_db.clear()
-    sessions_db.clear()
+    clear_sessions()
     conversations_db.clear()
     conversation_messages_db.clear()
+    conversation_message_index.clear()
+    conversation_message_keys.clear()
+    org_message_ids.clear()
     user_conversations_db.clear()
+    org_conversations.clear()
     active_chat_connections.clear()
     sse_connections.clear()
     presence_counters.clear()
+    user_chat_connections.clear()
+    user_sse_connections.clear()
+    close_message_logs()
+    org_partitions.reset()
     issue_counter = 1
 
     logger.info("All data cleared")
@@ -2914,19 +3673,27 @@ async def debug_clear():
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
     logger.error(f"HTTP Exception: {exc.status_code} - {exc.detail}")
-    from fastapi.responses import JSONResponse
-    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
+    return FastJSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
+
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request, exc):
+    logger.warning(f"Password hashing saturated: {exc}")
+    return FastJSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Server is busy, please try again"},
+        headers={"Retry-After": "1"},
+    )
 
 @app.exception_handler(Exception)
 async def general_exception_handler(request, exc):
     logger.error(f"Unhandled exception: {str(exc)}")
-    from fastapi.responses import JSONResponse
-    return JSONResponse(status_code=500, content={"detail": "Internal server error"})
+    return FastJSONResponse(status_code=500, content={"detail": "Internal server error"})
 
 # Startup event
 @app.on_event("startup")
 async def startup_event():
     logger.info("Starting Scope API...")
+    check_auth_config()
 
     # Log database configuration
     logger.info(f"Database URL: {DATABASE_URL.split('@')[-1] if '@' in DATABASE_URL else DATABASE_URL}")
@@ -2939,10 +3706,48 @@ async def startup_event():
         logger.error(f"Failed to initialize database: {e}")
         raise
 
+    await json_writer.start()
+
+    global presence_sync_task, org_eviction_task
+    await realtime_backplane.start(handle_backplane_event)
+    if realtime_backplane.kind != "inprocess":
+        logger.warning(
+            f"Realtime backplane '{realtime_backplane.kind}' shares websocket/SSE fan-out only; "
+            "users, issues, chat history and sessions are still per worker"
+        )
+        realtime_backplane.publish({'kind': 'presence_request'})
+        presence_sync_task = asyncio.create_task(presence_sync_loop())
+    # Only the directory is read here; each org loads on its first request
     load_data_from_files()
-    load_chat_data_from_files()
+    partition_legacy_data()
+    session_store.load()
+    rebuild_session_indexes()
+    await session_store.start()
+    await typing_aggregator.start()
+    await sse_heartbeats.start()
+    await presence_tracker.start()
+    org_eviction_task = asyncio.create_task(org_eviction_loop())
     log_data_state()
 
+# Shutdown event
+@app.on_event("shutdown")
+async def shutdown_event():
+    logger.info("Stopping Scope API...")
+    if presence_sync_task is not None:
+        presence_sync_task.cancel()
+    if org_eviction_task is not None:
+        org_eviction_task.cancel()
+    await presence_tracker.stop()
+    # Tell the other workers our users are gone before leaving the backplane
+    realtime_backplane.publish({'kind': 'presence_snapshot', 'presence': {}})
+    await realtime_backplane.stop()
+    await json_writer.stop()
+    await session_store.stop()
+    await typing_aggregator.stop()
+    await sse_heartbeats.stop()
+    password_hasher.close()
+    close_message_logs()
+    await close_async_db()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,228 @@
+"""
+Segmented append-only log store for chat messages.
+
+Each send appends one JSON line to the active segment instead of rewriting
+the whole conversation_messages.json file. Segments are replayed on top of
+the JSON snapshot at startup and periodically compacted back into it, so the
+snapshot keeps the same {"messages": [...]} layout used by the migration
+scripts. Compaction triggered by a write runs in a background thread, which
+rebuilds the snapshot from the files themselves.
+"""
+import json
+import logging
+import os
+import threading
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".jsonl"
+
+
+class MessageLogStore:
+    def __init__(
+        self,
+        snapshot_path: str,
+        segment_max_bytes: int = 4 * 1024 * 1024,
+        max_sealed_segments: int = 8,
+    ):
+        self.snapshot_path = snapshot_path
+        self.segment_dir = f"{snapshot_path}.segments"
+        self.segment_max_bytes = segment_max_bytes
+        self.max_sealed_segments = max_sealed_segments
+        self._active_file = None
+        self._active_index: Optional[int] = None
+        self._active_size = 0
+        self._compactor: Optional[threading.Thread] = None
+
+    # ---------- segment bookkeeping ----------
+
+    def _segment_path(self, index: int) -> str:
+        return os.path.join(self.segment_dir, f"{SEGMENT_PREFIX}{index:06d}{SEGMENT_SUFFIX}")
+
+    def _segment_indexes(self) -> List[int]:
+        try:
+            names = os.listdir(self.segment_dir)
+        except FileNotFoundError:
+            return []
+        indexes = []
+        for name in names:
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                try:
+                    indexes.append(int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]))
+                except ValueError:
+                    continue
+        return sorted(indexes)
+
+    def _open_segment(self, index: int):
+        os.makedirs(self.segment_dir, exist_ok=True)
+        path = self._segment_path(index)
+        self._active_file = open(path, "a", encoding="utf-8")
+        self._active_index = index
+        self._active_size = self._active_file.tell()
+
+    def _ensure_active(self):
+        if self._active_file is not None:
+            return
+        indexes = self._segment_indexes()
+        self._open_segment(indexes[-1] if indexes else 1)
+
+    def _rotate(self):
+        """Seal the active segment and start a new one."""
+        self._ensure_active()
+        next_index = (self._active_index or 0) + 1
+        self._active_file.close()
+        self._active_file = None
+        self._open_segment(next_index)
+
+    def sealed_segment_count(self) -> int:
+        return len([i for i in self._segment_indexes() if i != self._active_index])
+
+    # ---------- writes ----------
+
+    def _write(self, entry: dict):
+        self._ensure_active()
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        self._active_file.write(line)
+        self._active_file.flush()
+        self._active_size += len(line)
+
+        if self._active_size >= self.segment_max_bytes:
+            self._rotate()
+            if self.sealed_segment_count() >= self.max_sealed_segments:
+                self.compact_in_background()
+
+    def append(self, message: dict):
+        """Append an upsert for a message record."""
+        self._write({"op": "put", "message": message})
+
+    def delete(self, message_id: str):
+        """Append a tombstone for a message id."""
+        self._write({"op": "delete", "id": message_id})
+
+    # ---------- reads ----------
+
+    def replay(self, before_index: Optional[int] = None) -> Dict[str, dict]:
+        """
+        Rebuild the message map from the snapshot plus all segments, or only
+        the segments numbered below before_index.
+        """
+        messages: Dict[str, dict] = {}
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for message in data.get("messages", []):
+                if message.get("id"):
+                    messages[message["id"]] = message
+        except FileNotFoundError:
+            pass
+        except json.JSONDecodeError as e:
+            logger.error(f"Could not parse message snapshot {self.snapshot_path}: {e}")
+
+        for index in self._segment_indexes():
+            if before_index is not None and index >= before_index:
+                break
+            path = self._segment_path(index)
+            with open(path, "r", encoding="utf-8") as f:
+                for line_no, line in enumerate(f, start=1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn final write after a crash; everything before it is intact
+                        logger.warning(f"Skipping unreadable log entry {path}:{line_no}")
+                        continue
+                    op = entry.get("op")
+                    if op == "put":
+                        message = entry.get("message") or {}
+                        if message.get("id"):
+                            messages[message["id"]] = message
+                    elif op == "delete":
+                        messages.pop(entry.get("id"), None)
+        return messages
+
+    def has_segments(self) -> bool:
+        return bool(self._segment_indexes())
+
+    # ---------- compaction ----------
+
+    def compact(self, messages: Iterable[dict]):
+        """
+        Fold all segments into the snapshot file.
+
+        A fresh segment is opened first so that writes made after the snapshot
+        is taken never land in a segment that is about to be removed.
+        """
+        self.wait_for_compaction()
+        self._rotate()
+        self._write_snapshot(list(messages), self._active_index)
+
+    def compact_in_background(self) -> bool:
+        """
+        Fold the sealed segments into the snapshot on a worker thread.
+
+        The worker replays the current snapshot plus the segments sealed here
+        and writes the result, so the caller neither copies the in-memory
+        messages nor waits for the disk. Sealed segments are never written
+        again, and writes made meanwhile go to the fresh active segment.
+        Returns False if a compaction is already running; the next rotation
+        tries again.
+        """
+        if self.compacting:
+            return False
+        self._rotate()
+        self._compactor = threading.Thread(
+            target=self._fold_segments,
+            args=(self._active_index,),
+            name=f"compact-{os.path.basename(self.snapshot_path)}",
+            daemon=True,
+        )
+        self._compactor.start()
+        return True
+
+    @property
+    def compacting(self) -> bool:
+        return self._compactor is not None and self._compactor.is_alive()
+
+    def wait_for_compaction(self):
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
+
+    def _fold_segments(self, keep_index: int):
+        self._write_snapshot(list(self.replay(before_index=keep_index).values()), keep_index)
+
+    def _write_snapshot(self, messages: List[dict], keep_index: int):
+        tmp_path = f"{self.snapshot_path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"messages": messages}, f, separators=(",", ":"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            # The segments are still there, so nothing is lost
+            logger.error(f"Compacting {os.path.basename(self.snapshot_path)} failed: {e}")
+            return
+
+        removed = 0
+        # Only segments sealed before the snapshot was taken; later rotations
+        # may have sealed more in the meantime
+        for index in self._segment_indexes():
+            if index >= keep_index:
+                continue
+            try:
+                os.remove(self._segment_path(index))
+                removed += 1
+            except FileNotFoundError:
+                pass
+        logger.info(f"Compacted {removed} message log segment(s) into {os.path.basename(self.snapshot_path)}")
+
+    def close(self):
+        self.wait_for_compaction()
+        if self._active_file is not None:
+            self._active_file.close()
+            self._active_file = None
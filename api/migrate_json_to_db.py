@@ -2,6 +2,7 @@
 Migration script to transfer data from JSON files to database
 Run this script once to migrate existing data
 """
+import glob
 import json
 import os
 import sys
@@ -16,6 +17,7 @@ load_dotenv()
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from api.database import init_db, get_db_sync
+from api.blob_store import BlobStore, default_root
 from api.models import (
     Organization, User, Issue, Channel, ChannelMembership,
     Conversation, ConversationMessage
@@ -33,6 +35,24 @@ def load_json_file(filepath):
         print(f"Error decoding JSON from {filepath}: {e}")
         return None
 
+def load_partitioned_file(data_dir, filename, root_key):
+    """Load a data file from the legacy location and every orgs/<org_id>/ partition"""
+    paths = [os.path.join(data_dir, filename)]
+    paths += sorted(glob.glob(os.path.join(data_dir, 'orgs', '*', filename)))
+    records = []
+    found = False
+    for filepath in paths:
+        if not os.path.exists(filepath):
+            continue
+        data = load_json_file(filepath)
+        if data and root_key in data:
+            records.extend(data[root_key])
+            found = True
+    if not found:
+        print(f"Warning: File not found: {paths[0]}")
+        return None
+    return {root_key: records}
+
 def parse_datetime(dt_string):
     """Parse datetime string to datetime object"""
     if not dt_string:
@@ -42,6 +62,16 @@ def parse_datetime(dt_string):
     except (ValueError, AttributeError):
         return None
 
+def profile_picture_reference(store, picture):
+    """Move an inline base64 picture into the blob store and return its URL"""
+    if not picture or store.is_blob_url(picture):
+        return picture
+    try:
+        return store.url_for(store.put_encoded_image(picture))
+    except ValueError as e:
+        print(f"Warning: dropping unreadable profile picture: {e}")
+        return None
+
 def migrate_organizations(db, data_dir):
     """Migrate organizations from JSON to database"""
     print("Migrating organizations...")
@@ -85,6 +115,7 @@ def migrate_users(db, data_dir):
 
     count = 0
     skipped = 0
+    blob_store = BlobStore(default_root())
     for user_data in data['users']:
         try:
             user = User(
@@ -97,7 +128,7 @@ def migrate_users(db, data_dir):
                 is_active=user_data.get('is_active', True),
                 password_hash=user_data['password_hash'],
                 created_at=parse_datetime(user_data.get('created_at')) or datetime.utcnow(),
-                profile_picture=user_data.get('profile_picture')
+                profile_picture=profile_picture_reference(blob_store, user_data.get('profile_picture'))
             )
             db.add(user)
             db.commit()  # Commit each user individually
@@ -112,8 +143,7 @@ def migrate_users(db, data_dir):
 def migrate_issues(db, data_dir):
     """Migrate issues from JSON to database"""
     print("Migrating issues...")
-    filepath = os.path.join(data_dir, 'issues.json')
-    data = load_json_file(filepath)
+    data = load_partitioned_file(data_dir, 'issues.json', 'issues')
 
     if not data or 'issues' not in data:
         print("No issues data found")
@@ -224,8 +254,7 @@ def migrate_channels(db, data_dir):
 def migrate_conversations(db, data_dir):
     """Migrate conversations from JSON to database"""
     print("Migrating conversations...")
-    filepath = os.path.join(data_dir, 'conversations.json')
-    data = load_json_file(filepath)
+    data = load_partitioned_file(data_dir, 'conversations.json', 'conversations')
 
     if not data or 'conversations' not in data:
         print("No conversations data found")
@@ -271,8 +300,7 @@ def migrate_conversations(db, data_dir):
 def migrate_messages(db, data_dir):
     """Migrate conversation messages from JSON to database"""
     print("Migrating messages...")
-    filepath = os.path.join(data_dir, 'conversation_messages.json')
-    data = load_json_file(filepath)
+    data = load_partitioned_file(data_dir, 'conversation_messages.json', 'messages')
 
     if not data or 'messages' not in data:
         print("No messages data found")
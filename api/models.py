@@ -1,5 +1,4 @@
-from sqlalchemy import Column, String, Boolean, DateTime, Integer, Text, ForeignKey, JSON, Enum as SQLEnum
-from sqlalchemy.dialects.mysql import LONGTEXT
+from sqlalchemy import Column, String, Boolean, DateTime, Float, Integer, Text, ForeignKey, JSON, Index, Enum as SQLEnum
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -61,7 +60,7 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     password_hash = Column(String(255), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
-    profile_picture = Column(Text().with_variant(LONGTEXT, "mysql"))  # Base64 encoded image storage
+    profile_picture = Column(String(255))  # Blob store URL, see api/blob_store.py
 
     # Relationships
     organization = relationship("Organization", back_populates="users")
@@ -70,6 +69,10 @@ class User(Base):
     channel_memberships = relationship("ChannelMembership", back_populates="user", cascade="all, delete-orphan")
     sent_messages = relationship("ConversationMessage", back_populates="sender", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_users_organization_id", "organization_id"),
+    )
+
 class Issue(Base):
     __tablename__ = "issues"
 
@@ -97,6 +100,17 @@ class Issue(Base):
     assignee = relationship("User", foreign_keys=[assignee_id], back_populates="assigned_issues")
     reporter = relationship("User", foreign_keys=[reporter_id], back_populates="reported_issues")
 
+    # Issue lists are always org-scoped and ordered newest first; the org
+    # prefix of these composites also serves plain organization_id lookups.
+    __table_args__ = (
+        Index("ix_issues_org_created", "organization_id", "created_at", "id"),
+        Index("ix_issues_org_status_created", "organization_id", "status", "created_at"),
+        Index("ix_issues_org_sprint", "organization_id", "sprint_id"),
+        Index("ix_issues_org_epic", "organization_id", "epic_id"),
+        Index("ix_issues_assignee_id", "assignee_id"),
+        Index("ix_issues_reporter_id", "reporter_id"),
+    )
+
 class Channel(Base):
     __tablename__ = "channels"
 
@@ -113,6 +127,10 @@ class Channel(Base):
     memberships = relationship("ChannelMembership", back_populates="channel", cascade="all, delete-orphan")
     conversations = relationship("Conversation", back_populates="channel", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_channels_organization_id", "organization_id"),
+    )
+
 class ChannelMembership(Base):
     __tablename__ = "channel_memberships"
 
@@ -126,6 +144,11 @@ class ChannelMembership(Base):
     channel = relationship("Channel", back_populates="memberships")
     user = relationship("User", back_populates="channel_memberships")
 
+    __table_args__ = (
+        Index("ix_channel_memberships_channel_user", "channel_id", "user_id"),
+        Index("ix_channel_memberships_user_id", "user_id"),
+    )
+
 class Conversation(Base):
     __tablename__ = "conversations"
 
@@ -142,6 +165,11 @@ class Conversation(Base):
     organization = relationship("Organization", back_populates="conversations")
     messages = relationship("ConversationMessage", back_populates="conversation", cascade="all, delete-orphan", order_by="ConversationMessage.created_at")
 
+    __table_args__ = (
+        Index("ix_conversations_org_updated", "organization_id", "updated_at"),
+        Index("ix_conversations_channel_id", "channel_id"),
+    )
+
 class ConversationMessage(Base):
     __tablename__ = "conversation_messages"
 
@@ -158,3 +186,27 @@ class ConversationMessage(Base):
     # Relationships
     conversation = relationship("Conversation", back_populates="messages")
     sender = relationship("User", back_populates="sent_messages")
+
+    __table_args__ = (
+        Index("ix_conversation_messages_conversation_created", "conversation_id", "created_at"),
+        Index("ix_conversation_messages_sender_id", "sender_id"),
+    )
+
+class RevokedToken(Base):
+    """Refresh tokens that were already exchanged, shared by every worker"""
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(64), primary_key=True)
+    user_id = Column(String(36), nullable=False)
+    expires_at = Column(Float, nullable=False)  # Unix time; the row can go after this
+
+    __table_args__ = (
+        Index("ix_revoked_tokens_expires_at", "expires_at"),
+    )
+
+class TokenCutoff(Base):
+    """Signed tokens a user got at or before revoked_at are rejected (logout)"""
+    __tablename__ = "token_cutoffs"
+
+    user_id = Column(String(36), primary_key=True)
+    revoked_at = Column(Float, nullable=False)  # Unix time, sub-second
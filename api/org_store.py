@@ -0,0 +1,115 @@
+"""
+Lazy loading of the per-organization JSON partitions.
+
+Issues, comments, conversations and chat messages are stored per tenant
+under data/orgs/<org_id>/. Nothing of an organization is read at startup:
+OrgPartitions loads it the first time a request for that org arrives and
+unloads it again once it has been idle for idle_seconds. Startup time and
+resident memory therefore follow the set of active tenants instead of the
+total amount of stored data.
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ORG_PARTITION_DIR = "orgs"
+
+
+def org_data_name(organization_id: str, filename: str) -> str:
+    """Data-dir relative name of one organization's file."""
+    if not organization_id or "/" in organization_id or "\\" in organization_id or organization_id.startswith("."):
+        raise ValueError(f"Invalid organization id: {organization_id!r}")
+    return f"{ORG_PARTITION_DIR}/{organization_id}/{filename}"
+
+
+class OrgPartitions:
+    def __init__(
+        self,
+        load: Callable[[str], Awaitable[None]],
+        unload: Callable[[str], None],
+        idle_seconds: float = 900,
+        is_pinned: Optional[Callable[[str], bool]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._load = load
+        self._unload = unload
+        self.idle_seconds = idle_seconds
+        # Orgs with live connections are never evicted
+        self._is_pinned = is_pinned or (lambda organization_id: False)
+        self._clock = clock
+        self._last_access: Dict[str, float] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.loads = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+
+    def is_loaded(self, organization_id: str) -> bool:
+        return organization_id in self._last_access
+
+    def loaded(self) -> List[str]:
+        return list(self._last_access)
+
+    async def ensure(self, organization_id: Optional[str]):
+        """Load an organization if it is not in memory and mark it as used."""
+        if not organization_id:
+            return
+        if organization_id in self._last_access:
+            self._last_access[organization_id] = self._clock()
+            return
+        lock = self._locks.get(organization_id)
+        if lock is None:
+            lock = self._locks[organization_id] = asyncio.Lock()
+        # Concurrent first requests wait for a single load
+        async with lock:
+            if organization_id not in self._last_access:
+                started = time.perf_counter()
+                await self._load(organization_id)
+                elapsed = time.perf_counter() - started
+                self.loads += 1
+                self.load_seconds += elapsed
+                logger.info(f"Loaded organization {organization_id} in {elapsed * 1000:.1f} ms")
+            self._last_access[organization_id] = self._clock()
+
+    def mark_loaded(self, organization_id: str):
+        """Record an organization created in memory, with nothing to read."""
+        self._last_access[organization_id] = self._clock()
+
+    def evict(self, organization_id: str) -> bool:
+        if organization_id not in self._last_access:
+            return False
+        lock = self._locks.get(organization_id)
+        if lock is not None and lock.locked():
+            return False
+        del self._last_access[organization_id]
+        self._locks.pop(organization_id, None)
+        self._unload(organization_id)
+        self.evictions += 1
+        logger.info(f"Evicted idle organization {organization_id}")
+        return True
+
+    def evict_idle(self) -> List[str]:
+        """Unload every unpinned organization idle for longer than idle_seconds."""
+        cutoff = self._clock() - self.idle_seconds
+        evicted = []
+        for organization_id, last_access in list(self._last_access.items()):
+            if last_access > cutoff or self._is_pinned(organization_id):
+                continue
+            if self.evict(organization_id):
+                evicted.append(organization_id)
+        return evicted
+
+    def reset(self):
+        """Forget every organization without unloading (the stores were cleared)."""
+        self._last_access.clear()
+        self._locks.clear()
+
+    def stats(self) -> dict:
+        return {
+            "loaded": len(self._last_access),
+            "loads": self.loads,
+            "evictions": self.evictions,
+            "load_seconds": round(self.load_seconds, 3),
+        }
@@ -0,0 +1,162 @@
+"""
+Password hashing.
+
+PasswordHasher wraps an ordered list of schemes. The first one hashes new
+passwords; the rest only verify hashes written by older releases. A
+successful verify against an outdated hash (another scheme, or bcrypt with
+fewer rounds) returns a fresh hash so callers can upgrade the stored value
+transparently. The KDF is deliberately slow, so the async methods run it
+on a small dedicated thread pool: the event loop never blocks on it, and
+a login storm queues on the pool instead of starving the default executor.
+The queue is bounded; past max_pending waiting calls the async methods raise
+PasswordHasherBusy so the caller can shed load instead of piling up.
+"""
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import bcrypt
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Too many hash or verify calls are already waiting for the pool."""
+
+
+class Sha256Hasher:
+    """The original scheme: SHA-256 of password + a fixed application secret."""
+
+    scheme = "sha256"
+    _pattern = re.compile(r"^[0-9a-f]{64}$")
+
+    def __init__(self, secret: str):
+        self.secret = secret
+
+    def hash(self, password: str) -> str:
+        return hashlib.sha256((password + self.secret).encode()).hexdigest()
+
+    def verify(self, password: str, hashed: str) -> bool:
+        return hmac.compare_digest(self.hash(password), hashed)
+
+    def identifies(self, hashed: str) -> bool:
+        return bool(self._pattern.match(hashed))
+
+    def needs_rehash(self, hashed: str) -> bool:
+        return False
+
+
+class BcryptHasher:
+    scheme = "bcrypt"
+
+    def __init__(self, rounds: int = 12):
+        self.rounds = rounds
+
+    def hash(self, password: str) -> str:
+        return bcrypt.hashpw(password.encode(), bcrypt.gensalt(self.rounds)).decode()
+
+    def verify(self, password: str, hashed: str) -> bool:
+        try:
+            return bcrypt.checkpw(password.encode(), hashed.encode())
+        except ValueError:
+            return False
+
+    def identifies(self, hashed: str) -> bool:
+        return hashed.startswith(("$2a$", "$2b$", "$2y$"))
+
+    def needs_rehash(self, hashed: str) -> bool:
+        try:
+            return int(hashed.split("$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+
+class PasswordHasher:
+    def __init__(self, hashers: List, max_workers: Optional[int] = None, max_pending: Optional[int] = None):
+        if not hashers:
+            raise ValueError("At least one password hasher is required")
+        self.hashers = hashers
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending or self.max_workers * 16
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self._dummy_hash: Optional[str] = None
+        self.hashed = 0
+        self.verified = 0
+        self.rehashed = 0
+        self.rejected = 0
+
+    @property
+    def preferred(self):
+        return self.hashers[0]
+
+    # ---------- synchronous API (scripts, executor workers) ----------
+
+    def hash_sync(self, password: str) -> str:
+        self.hashed += 1
+        return self.preferred.hash(password)
+
+    def verify_sync(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """(matches, replacement hash or None if the stored one is current)."""
+        self.verified += 1
+        if not hashed:
+            return False, None
+        hasher = next((h for h in self.hashers if h.identifies(hashed)), None)
+        if hasher is None or not hasher.verify(password, hashed):
+            return False, None
+        if hasher is not self.preferred or hasher.needs_rehash(hashed):
+            self.rehashed += 1
+            return True, self.hash_sync(password)
+        return True, None
+
+    def verify_dummy_sync(self, password: str) -> bool:
+        """Spend the same work as a real verify, for accounts that don't exist."""
+        if self._dummy_hash is None:
+            self._dummy_hash = self.preferred.hash("not-a-real-password")
+        self.preferred.verify(password, self._dummy_hash)
+        return False
+
+    # ---------- async API ----------
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.hash_sync, password)
+
+    async def verify(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        return await self._run(self.verify_sync, password, hashed)
+
+    async def verify_dummy(self, password: str) -> bool:
+        return await self._run(self.verify_dummy_sync, password)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "scheme": self.preferred.scheme,
+            "workers": self.max_workers,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "rejected": self.rejected,
+            "hashed": self.hashed,
+            "verified": self.verified,
+            "rehashed": self.rehashed,
+        }
+
+    async def _run(self, func, *args):
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordHasherBusy(f"{self._pending} password hash calls already pending")
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="password-hash")
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._pending -= 1
@@ -0,0 +1,304 @@
+"""
+Write-behind persistence for the JSON data files.
+
+Handlers enqueue record-level operations (upsert / insert / delete / full
+rewrite) and return immediately. A background task coalesces repeated
+writes to the same record, then group-commits each dirty file in a worker
+thread: read once, apply every pending operation, write a temp file and
+rename it over the original.
+
+Until start() is called (scripts, tests, anything without a running event
+loop) operations are applied synchronously, which matches the old
+behaviour of the save_* helpers.
+"""
+import asyncio
+import copy
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (op, key field, record or key value)
+PendingOp = Tuple[str, str, Any]
+
+
+class _PendingFile:
+    def __init__(self, root_key: str):
+        self.root_key = root_key
+        # Full replacement of the file contents, applied before ops
+        self.base: Optional[List[dict]] = None
+        self.ops: "OrderedDict[Tuple[str, Any], PendingOp]" = OrderedDict()
+
+
+class JsonWriteBehind:
+    def __init__(
+        self,
+        path_for: Callable[[str], str],
+        max_pending: int = 10000,
+        commit_delay: float = 0.05,
+        retry_delay: float = 0.5,
+        max_retry_delay: float = 5.0,
+        max_stop_retries: int = 5,
+    ):
+        self.path_for = path_for
+        self.max_pending = max_pending
+        self.commit_delay = commit_delay
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.max_stop_retries = max_stop_retries
+        self._pending: Dict[str, _PendingFile] = {}
+        # Files the worker has taken off the queue but not yet committed
+        self._inflight: Dict[str, _PendingFile] = {}
+        self._file_locks: Dict[str, threading.Lock] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        # Set when a file hits max_pending: commit without the group delay
+        self._urgent = False
+        self._retries = 0
+        self.commits = 0
+        self.coalesced = 0
+        self.failures = 0
+
+    # ---------- public API ----------
+
+    def upsert(self, name: str, root_key: str, record: dict, key: str = "id"):
+        """Replace the record whose `key` matches, or append it."""
+        # Snapshot now: the live dict keeps changing on the event loop while
+        # the worker thread serializes it
+        record = copy.deepcopy(record)
+        self._enqueue(name, root_key, ("upsert", key, record), record.get(key))
+
+    def insert(self, name: str, root_key: str, record: dict, key: str = "id"):
+        """Append the record only if no record with the same `key` exists."""
+        record = copy.deepcopy(record)
+        self._enqueue(name, root_key, ("insert", key, record), record.get(key))
+
+    def delete(self, name: str, root_key: str, value: Any, key: str = "id"):
+        """Remove every record whose `key` equals value."""
+        self._enqueue(name, root_key, ("delete", key, value), value)
+
+    def replace_all(self, name: str, root_key: str, records: List[dict]):
+        """Rewrite the whole file with the given records."""
+        pending = self._pending_for(name, root_key)
+        pending.base = copy.deepcopy(list(records))
+        pending.ops.clear()
+        self._after_enqueue(name)
+
+    async def load(self, name: str, root_key: str) -> List[dict]:
+        """
+        Read a file's records as they will be once every queued write lands.
+
+        The queued operations are captured before the file is read, so a
+        commit that finishes while the read is running is either already on
+        disk or replayed here; replaying one is harmless.
+        """
+        queued = [
+            (pending.base, list(pending.ops.values()))
+            for pending in (self._inflight.get(name), self._pending.get(name))
+            if pending is not None
+        ]
+        records = await asyncio.to_thread(self._read_locked, name, root_key)
+        for base, ops in queued:
+            if base is not None:
+                records = list(base)
+            records = self._apply(records, ops)
+        # Queued records are shared with the worker thread; hand out copies
+        return copy.deepcopy(records) if queued else records
+
+    def pending_count(self) -> int:
+        return sum(len(p.ops) + (1 if p.base is not None else 0) for p in self._pending.values())
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        if self.running:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        if self._pending:
+            self._wakeup.set()
+        logger.info("Write-behind persistence worker started")
+
+    async def stop(self):
+        """Flush everything still pending and stop the worker."""
+        if not self.running:
+            self.flush_sync()
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+        self._wakeup = None
+        logger.info(f"Write-behind persistence worker stopped ({self.commits} commits, {self.coalesced} coalesced writes)")
+
+    def flush_sync(self):
+        """Commit every pending file on the calling thread."""
+        for name in list(self._pending):
+            self._commit(name, self._pending.pop(name))
+
+    # ---------- internals ----------
+
+    def _pending_for(self, name: str, root_key: str) -> _PendingFile:
+        pending = self._pending.get(name)
+        if pending is None:
+            pending = self._pending[name] = _PendingFile(root_key)
+        return pending
+
+    def _enqueue(self, name: str, root_key: str, op: PendingOp, value: Any):
+        pending = self._pending_for(name, root_key)
+        slot = (op[1], value)
+        if pending.ops.pop(slot, None) is not None:
+            self.coalesced += 1
+        # Re-inserting moves the slot to the end so ops keep last-write order
+        pending.ops[slot] = op
+        self._after_enqueue(name)
+
+    def _after_enqueue(self, name: str):
+        if not self.running:
+            self._commit(name, self._pending.pop(name))
+            return
+        pending = self._pending.get(name)
+        if pending is not None and len(pending.ops) >= self.max_pending and not self._urgent:
+            # Backpressure: the worker is not keeping up, so skip the group
+            # delay. The commit itself stays on the worker thread, in order.
+            logger.warning(f"Write-behind queue for {name} is full ({len(pending.ops)}); committing now")
+            self._urgent = True
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if not self._stopping and not self._urgent and self.commit_delay:
+                # Group commit: let a burst of writes accumulate first
+                await asyncio.sleep(self.commit_delay)
+            self._urgent = False
+            failed = False
+            # Take one file at a time so later writes keep coalescing into
+            # files that have not been committed yet
+            for name in list(self._pending):
+                pending = self._pending.pop(name, None)
+                if pending is None:
+                    continue
+                self._inflight[name] = pending
+                try:
+                    await asyncio.to_thread(self._commit, name, pending)
+                except Exception as e:
+                    failed = True
+                    self.failures += 1
+                    self._requeue(name, pending)
+                    logger.error(f"Write-behind commit failed for {name}: {e}")
+                finally:
+                    self._inflight.pop(name, None)
+            if failed:
+                self._retries += 1
+                if self._stopping and self._retries > self.max_stop_retries:
+                    logger.error(f"Write-behind stopping with {self.pending_count()} uncommitted write(s)")
+                    break
+                await asyncio.sleep(min(self.retry_delay * 2 ** (self._retries - 1), self.max_retry_delay))
+                self._wakeup.set()
+                continue
+            self._retries = 0
+            if self._stopping and not self._pending:
+                break
+
+    def _requeue(self, name: str, failed: _PendingFile):
+        """Put a file that failed to commit back in the queue under any newer writes."""
+        newer = self._pending.get(name)
+        if newer is not None:
+            if newer.base is not None:
+                # A full rewrite queued since supersedes everything that failed
+                return
+            for slot, op in newer.ops.items():
+                failed.ops.pop(slot, None)
+                failed.ops[slot] = op
+        self._pending[name] = failed
+
+    def _lock_for(self, name: str) -> threading.Lock:
+        lock = self._file_locks.get(name)
+        if lock is None:
+            lock = self._file_locks.setdefault(name, threading.Lock())
+        return lock
+
+    def _read(self, file_path: str, root_key: str) -> List[dict]:
+        try:
+            with open(file_path, "r") as f:
+                return json.load(f).get(root_key, [])
+        except (FileNotFoundError, json.JSONDecodeError):
+            return []
+
+    def _read_locked(self, name: str, root_key: str) -> List[dict]:
+        with self._lock_for(name):
+            return self._read(self.path_for(name), root_key)
+
+    def _commit(self, name: str, pending: _PendingFile):
+        with self._lock_for(name):
+            file_path = self.path_for(name)
+            root_key = pending.root_key
+            if pending.base is not None:
+                records = list(pending.base)
+            else:
+                records = self._read(file_path, root_key)
+
+            records = self._apply(records, pending.ops.values())
+
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            tmp_path = f"{file_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({root_key: records}, f, indent=2, default=str)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, file_path)
+            self.commits += 1
+            logger.debug(f"Committed {len(pending.ops)} write(s) to {name}")
+
+    @staticmethod
+    def _apply(records: List[dict], ops) -> List[dict]:
+        result: List[Optional[dict]] = list(records)
+        indexes: Dict[str, Dict[Any, List[int]]] = {}
+
+        def index_for(key: str) -> Dict[Any, List[int]]:
+            if key not in indexes:
+                positions: Dict[Any, List[int]] = {}
+                for i, record in enumerate(result):
+                    if record is not None:
+                        positions.setdefault(record.get(key), []).append(i)
+                indexes[key] = positions
+            return indexes[key]
+
+        def append(record: dict):
+            result.append(record)
+            for key, positions in indexes.items():
+                positions.setdefault(record.get(key), []).append(len(result) - 1)
+
+        for kind, key, payload in ops:
+            if kind == "delete":
+                for i in index_for(key).pop(payload, []):
+                    result[i] = None
+                continue
+            positions = [i for i in index_for(key).get(payload.get(key), []) if result[i] is not None]
+            if kind == "insert":
+                if not positions:
+                    append(payload)
+            elif positions:
+                position = positions[0]
+                previous = result[position]
+                result[position] = payload
+                for other_key, other_positions in indexes.items():
+                    if previous.get(other_key) != payload.get(other_key):
+                        stale = other_positions.get(previous.get(other_key), [])
+                        if position in stale:
+                            stale.remove(position)
+                        other_positions.setdefault(payload.get(other_key), []).append(position)
+            else:
+                append(payload)
+
+        return [record for record in result if record is not None]
@@ -0,0 +1,116 @@
+"""
+Batched presence updates.
+
+After a deploy every client reconnects within a few seconds. With one
+user_status_change broadcast per connect, an org of N users receives N
+events on each of N connections. PresenceAggregator collects online and
+offline transitions per organization and flushes them on a short
+interval. Each organization with changes gets one presence_diff event
+listing who came online and who went offline in that window. A user who
+flaps (offline then back online, as on a reconnect) inside one window
+cancels out and is not reported at all.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# (organization_id, users that came online, user ids that went offline)
+EmitCallback = Callable[[str, List[dict], List[str]], Awaitable[None]]
+
+
+class PresenceAggregator:
+    def __init__(self, emit: EmitCallback, interval: float = 1.0):
+        self.emit = emit
+        self.interval = interval
+        # organization_id -> user_id -> pending transition
+        self._pending: Dict[str, Dict[str, dict]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.transitions = 0
+        self.cancelled = 0
+        self.emitted = 0
+
+    def mark(
+        self,
+        organization_id: Optional[str],
+        user_id: str,
+        online: bool,
+        user_name: Optional[str] = None,
+        user_avatar: Optional[str] = None,
+    ):
+        """Record a transition; it goes out with the org's next presence_diff."""
+        if not organization_id:
+            return
+        self.transitions += 1
+        users = self._pending.setdefault(organization_id, {})
+        entry = users.get(user_id)
+        if entry is None:
+            # The first transition in the window tells us the state before it
+            entry = users[user_id] = {'was_online': not online}
+        entry.update(online=online, user_name=user_name, user_avatar=user_avatar)
+        self._ensure_running()
+
+    async def flush(self) -> int:
+        """Emit one presence_diff per organization with net changes."""
+        pending, self._pending = self._pending, {}
+        sent = 0
+        for organization_id, users in pending.items():
+            online: List[dict] = []
+            offline: List[str] = []
+            for user_id, entry in users.items():
+                if entry['online'] == entry['was_online']:
+                    self.cancelled += 1
+                elif entry['online']:
+                    online.append({
+                        'user_id': user_id,
+                        'user_name': entry['user_name'],
+                        'user_avatar': entry['user_avatar'],
+                    })
+                else:
+                    offline.append(user_id)
+            if not online and not offline:
+                continue
+            try:
+                await self.emit(organization_id, online, offline)
+                sent += 1
+            except Exception as e:
+                logger.error(f"Presence broadcast failed for org {organization_id}: {e}")
+        self.emitted += sent
+        return sent
+
+    def stats(self) -> dict:
+        return {
+            "interval": self.interval,
+            "pending_organizations": len(self._pending),
+            "transitions": self.transitions,
+            "cancelled": self.cancelled,
+            "emitted": self.emitted,
+        }
+
+    async def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Don't lose the last window's transitions on shutdown
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            try:
+                self._task = asyncio.get_running_loop().create_task(self._run())
+            except RuntimeError:
+                pass
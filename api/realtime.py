@@ -0,0 +1,280 @@
+"""
+Outbound realtime delivery primitives.
+
+A broadcast is encoded once into an OutboundFrame that every websocket and
+SSE recipient shares. Each websocket gets a ConnectionSender: a bounded
+outbound queue drained by its own writer task, so one slow client can no
+longer hold up delivery to everybody queued behind it. Each SSE stream
+gets an SseSubscriber, a bounded queue with a configurable overflow policy.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Events that only carry "latest state"; a newer frame may replace a queued one
+COALESCE_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "presence_diff": ("organization_id",),
+    # Each frame lists everyone typing in the conversation
+    "chat_typing": ("conversation_id",),
+    "heartbeat": (),
+}
+
+
+def merge_presence_diffs(queued: dict, newer: dict) -> dict:
+    """One presence_diff with the latest state of every user in either diff."""
+    online = {user['user_id']: user for user in queued.get('online', [])}
+    offline = dict.fromkeys(queued.get('offline', []))
+    for user in newer.get('online', []):
+        offline.pop(user['user_id'], None)
+        online[user['user_id']] = user
+    for user_id in newer.get('offline', []):
+        online.pop(user_id, None)
+        offline[user_id] = None
+    return {**newer, 'online': list(online.values()), 'offline': list(offline)}
+
+
+# Events whose queued frame is combined with the newer one instead of being
+# replaced by it: (queued message, newer message) -> merged message
+COALESCE_MERGERS: Dict[str, Callable[[dict, dict], dict]] = {
+    "presence_diff": merge_presence_diffs,
+}
+
+
+class OutboundFrame:
+    __slots__ = ("message", "event_type", "text", "coalesce_key", "_sse")
+
+    def __init__(self, message: dict):
+        self.message = message
+        self.event_type = message.get("type", "message")
+        self.text = json.dumps(message)
+        fields = COALESCE_FIELDS.get(self.event_type)
+        self.coalesce_key = (
+            (self.event_type,) + tuple(message.get(f) for f in fields)
+            if fields is not None else None
+        )
+        self._sse: Optional[str] = None
+
+    @property
+    def sse(self) -> str:
+        """Server-sent-event encoding, built on first use and then shared."""
+        if self._sse is None:
+            event_id = self.message.get("event_id")
+            prefix = f"id: {event_id}\n" if event_id else ""
+            self._sse = f"{prefix}event: {self.event_type}\ndata: {self.text}\n\n"
+        return self._sse
+
+
+def encode_frame(message: Any) -> OutboundFrame:
+    return message if isinstance(message, OutboundFrame) else OutboundFrame(message)
+
+
+def coalesce_into(queue: Deque[OutboundFrame], frame: OutboundFrame) -> bool:
+    """Fold a latest-state frame into a queued one with the same key, if any."""
+    if frame.coalesce_key is None:
+        return False
+    for i, pending in enumerate(queue):
+        if pending.coalesce_key == frame.coalesce_key:
+            merge = COALESCE_MERGERS.get(frame.event_type)
+            queue[i] = OutboundFrame(merge(pending.message, frame.message)) if merge else frame
+            return True
+    return False
+
+
+class ConnectionSender:
+    """Bounded outbound queue plus writer task for a single websocket."""
+
+    def __init__(
+        self,
+        websocket,
+        label: str = "",
+        max_queue: int = 256,
+        on_close: Optional[Callable[["ConnectionSender"], None]] = None,
+    ):
+        self.websocket = websocket
+        self.label = label
+        self.max_queue = max_queue
+        self.on_close = on_close
+        self.closed = False
+        self.sent = 0
+        self.coalesced = 0
+        self._queue: Deque[OutboundFrame] = deque()
+        self._ready = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def enqueue(self, frame: OutboundFrame) -> bool:
+        """Queue a frame without waiting; returns False if the connection was dropped."""
+        if self.closed:
+            return False
+
+        if coalesce_into(self._queue, frame):
+            self.coalesced += 1
+            return True
+
+        if len(self._queue) >= self.max_queue:
+            logger.warning(f"Dropping slow websocket consumer {self.label} ({len(self._queue)} frames queued)")
+            self.close(code=1013, reason="Client too slow")
+            return False
+
+        self._queue.append(frame)
+        self._idle.clear()
+        self._ready.set()
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._writer())
+        return True
+
+    async def _writer(self):
+        try:
+            while not self.closed:
+                if not self._queue:
+                    self._idle.set()
+                    self._ready.clear()
+                    await self._ready.wait()
+                    continue
+                frame = self._queue.popleft()
+                try:
+                    await self.websocket.send_text(frame.text)
+                    self.sent += 1
+                except Exception as e:
+                    logger.info(f"Failed to send to {self.label}: {e}")
+                    self.close()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._idle.set()
+
+    async def join(self):
+        """Wait until everything queued so far has been written."""
+        await self._idle.wait()
+
+    def close(self, code: Optional[int] = None, reason: str = ""):
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.clear()
+        self._idle.set()
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+        if code is not None:
+            try:
+                asyncio.get_running_loop().create_task(self._close_socket(code, reason))
+            except RuntimeError:
+                pass
+        if self.on_close:
+            self.on_close(self)
+
+    async def _close_socket(self, code: int, reason: str):
+        try:
+            await self.websocket.close(code=code, reason=reason)
+        except Exception:
+            pass
+
+
+# What an SseSubscriber does when its queue is full:
+#   coalesce     latest-state frames replace their queued predecessor; if the
+#                queue is still full the stream is closed
+#   drop_oldest  the oldest queued frame is discarded
+#   disconnect   the stream is closed; the client resumes with Last-Event-ID
+SSE_OVERFLOW_POLICIES = ("coalesce", "drop_oldest", "disconnect")
+
+
+class SseSubscriber:
+    """Bounded outbound queue for a single SSE stream."""
+
+    def __init__(
+        self,
+        user_id: str = "",
+        organization_id: str = "",
+        max_queue: int = 256,
+        policy: str = "coalesce",
+        on_close: Optional[Callable[["SseSubscriber"], None]] = None,
+    ):
+        if policy not in SSE_OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown SSE overflow policy {policy!r}")
+        self.user_id = user_id
+        self.organization_id = organization_id
+        self.max_queue = max_queue
+        self.policy = policy
+        self.on_close = on_close
+        self.connected_at = time.time()
+        self.closed = False
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.high_water = 0
+        self._queue: Deque[OutboundFrame] = deque()
+        self._ready = asyncio.Event()
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def enqueue(self, frame: OutboundFrame) -> bool:
+        """Queue a frame without waiting; returns False if the stream was closed."""
+        if self.closed:
+            return False
+
+        if self.policy == "coalesce" and coalesce_into(self._queue, frame):
+            self.coalesced += 1
+            return True
+
+        if len(self._queue) >= self.max_queue:
+            if self.policy != "drop_oldest":
+                logger.warning(
+                    f"Closing slow SSE consumer {self.user_id} in org {self.organization_id} "
+                    f"({len(self._queue)} frames queued)"
+                )
+                self.dropped += 1
+                self.close()
+                return False
+            self._queue.popleft()
+            self.dropped += 1
+
+        self._queue.append(frame)
+        self.high_water = max(self.high_water, len(self._queue))
+        self._ready.set()
+        return True
+
+    async def get(self) -> Optional[OutboundFrame]:
+        """Next frame to write, or None once the stream has been closed."""
+        while not self._queue:
+            if self.closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        self.sent += 1
+        return self._queue.popleft()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.dropped += len(self._queue)
+        self._queue.clear()
+        self._ready.set()
+        if self.on_close:
+            self.on_close(self)
+
+    def stats(self) -> dict:
+        return {
+            "user_id": self.user_id,
+            "organization_id": self.organization_id,
+            "policy": self.policy,
+            "depth": len(self._queue),
+            "high_water": self.high_water,
+            "max_queue": self.max_queue,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "connected_seconds": round(time.time() - self.connected_at, 1),
+        }
@@ -0,0 +1,46 @@
+"""
+JSON response helpers.
+
+FastJSONResponse is the app's default response class. It renders with orjson
+when that is installed and with pydantic-core otherwise. List endpoints can
+skip FastAPI's response_model round trip by encoding their models straight to
+bytes with encode_models and returning them through encoded_json_response.
+"""
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Type
+
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import to_json, to_jsonable_python
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """Encode a JSON-compatible value to compact UTF-8 bytes."""
+    if orjson is not None:
+        return orjson.dumps(content, default=to_jsonable_python, option=orjson.OPT_NON_STR_KEYS)
+    return to_json(content)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+
+def encode_models(items: Sequence[BaseModel], model: Type[BaseModel]) -> bytes:
+    """Encode a list of models in a single pydantic-core pass."""
+    return _list_adapter(model).dump_json(list(items))
+
+
+def encoded_json_response(body: bytes, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Wrap an already-encoded JSON document."""
+    return Response(content=body, status_code=status_code, headers=headers, media_type="application/json")
@@ -0,0 +1,249 @@
+"""
+Access-token session store with expiry.
+
+Sessions are keyed by the SHA-256 of the token, so neither memory dumps nor
+the sessions file hold usable bearer tokens. Each session expires ttl
+seconds after it was last used (sliding expiry); to keep lookups cheap the
+expiry is pushed forward at most once every refresh_interval seconds. A
+background task sweeps expired sessions and writes the survivors to a
+compact JSON snapshot, which load() restores after a restart. When the
+store is full the session closest to expiry is evicted.
+"""
+import asyncio
+import hashlib
+import heapq
+import json
+import logging
+import os
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (digest, user_id) of a session that expired or was evicted
+RemovedCallback = Callable[[str, str], None]
+
+
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class SessionStore:
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl_seconds: float = 7 * 24 * 3600,
+        max_sessions: int = 100000,
+        refresh_interval: float = 300,
+        sweep_interval: float = 60,
+        on_removed: Optional[RemovedCallback] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.refresh_interval = refresh_interval
+        self.sweep_interval = sweep_interval
+        self.on_removed = on_removed
+        self._clock = clock
+        self._sessions: Dict[str, Tuple[str, float]] = {}  # digest -> (user_id, expires_at)
+        # Min-heap of (expires_at, digest); entries go stale on refresh/revoke
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._dirty = False
+        self._task: Optional[asyncio.Task] = None
+        self.created = 0
+        self.refreshed = 0
+        self.expired = 0
+        self.evicted = 0
+        self.revoked = 0
+
+    # ---------- public API ----------
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, token: str) -> bool:
+        return self.peek(token) is not None
+
+    def create(self, token: str, user_id: str) -> str:
+        """Store a new session and return its digest."""
+        while len(self._sessions) >= self.max_sessions and self._evict_soonest():
+            pass
+        digest = token_digest(token)
+        self._put(digest, user_id, self._clock() + self.ttl_seconds)
+        self.created += 1
+        return digest
+
+    def get(self, token: str) -> Optional[str]:
+        """User id of a live session, sliding its expiry forward."""
+        digest = token_digest(token)
+        entry = self._sessions.get(digest)
+        if entry is None:
+            return None
+        user_id, expires_at = entry
+        now = self._clock()
+        if expires_at <= now:
+            self._remove(digest, expired=True)
+            return None
+        if now + self.ttl_seconds - expires_at >= self.refresh_interval:
+            self._put(digest, user_id, now + self.ttl_seconds)
+            self.refreshed += 1
+        return user_id
+
+    def peek(self, token: str) -> Optional[str]:
+        """User id of a live session without refreshing it."""
+        entry = self._sessions.get(token_digest(token))
+        if entry is None or entry[1] <= self._clock():
+            return None
+        return entry[0]
+
+    def revoke(self, token: str) -> Optional[str]:
+        return self.revoke_digest(token_digest(token))
+
+    def revoke_digest(self, digest: str) -> Optional[str]:
+        entry = self._sessions.pop(digest, None)
+        if entry is None:
+            return None
+        self._dirty = True
+        self.revoked += 1
+        return entry[0]
+
+    def items(self) -> Iterator[Tuple[str, str]]:
+        """(digest, user_id) of every stored session."""
+        return ((digest, entry[0]) for digest, entry in self._sessions.items())
+
+    def clear(self):
+        self._sessions.clear()
+        self._expiry_heap.clear()
+        self._dirty = True
+
+    def sweep(self) -> int:
+        """Drop every expired session; returns how many were removed."""
+        now = self._clock()
+        removed = 0
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            expires_at, digest = heapq.heappop(self._expiry_heap)
+            entry = self._sessions.get(digest)
+            if entry is not None and entry[1] == expires_at:
+                self._remove(digest, expired=True)
+                removed += 1
+        if len(self._expiry_heap) > 2 * len(self._sessions) + 1024:
+            self._expiry_heap = [(expires_at, digest) for digest, (_, expires_at) in self._sessions.items()]
+            heapq.heapify(self._expiry_heap)
+        return removed
+
+    def stats(self) -> dict:
+        now = self._clock()
+        soonest = min((entry[1] for entry in self._sessions.values()), default=None)
+        return {
+            "active": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "ttl_seconds": self.ttl_seconds,
+            "created": self.created,
+            "refreshed": self.refreshed,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "revoked": self.revoked,
+            "next_expiry_in": round(soonest - now, 1) if soonest is not None else None,
+        }
+
+    # ---------- persistence ----------
+
+    def load(self) -> int:
+        """Restore unexpired sessions from the snapshot file."""
+        if not self.path:
+            return 0
+        try:
+            with open(self.path, "r") as f:
+                rows = json.load(f).get("sessions", [])
+        except FileNotFoundError:
+            return 0
+        except (json.JSONDecodeError, AttributeError) as e:
+            logger.error(f"Could not parse session snapshot {self.path}: {e}")
+            return 0
+        now = self._clock()
+        for digest, user_id, expires_at in rows:
+            if expires_at > now:
+                self._put(digest, user_id, expires_at)
+        self._dirty = False
+        logger.info(f"Restored {len(self._sessions)} sessions")
+        return len(self._sessions)
+
+    def snapshot(self) -> List[list]:
+        now = self._clock()
+        return [
+            [digest, user_id, round(expires_at)]
+            for digest, (user_id, expires_at) in self._sessions.items()
+            if expires_at > now
+        ]
+
+    def save(self, rows: Optional[List[list]] = None):
+        if not self.path:
+            return
+        rows = self.snapshot() if rows is None else rows
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"sessions": rows}, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    # ---------- background sweeper ----------
+
+    async def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.sweep()
+        self.save()
+        self._dirty = False
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                removed = self.sweep()
+                if removed:
+                    logger.info(f"Expired {removed} sessions ({len(self._sessions)} active)")
+                if self._dirty:
+                    # Snapshot on the loop, write in a worker thread
+                    self._dirty = False
+                    await asyncio.to_thread(self.save, self.snapshot())
+            except Exception as e:
+                logger.error(f"Session sweep failed: {e}")
+
+    # ---------- internals ----------
+
+    def _put(self, digest: str, user_id: str, expires_at: float):
+        self._sessions[digest] = (user_id, expires_at)
+        heapq.heappush(self._expiry_heap, (expires_at, digest))
+        self._dirty = True
+
+    def _evict_soonest(self) -> bool:
+        """Remove the session closest to expiry; False if the heap is empty."""
+        while self._expiry_heap:
+            expires_at, digest = heapq.heappop(self._expiry_heap)
+            entry = self._sessions.get(digest)
+            if entry is not None and entry[1] == expires_at:
+                self._remove(digest, expired=False)
+                return True
+        return False
+
+    def _remove(self, digest: str, expired: bool):
+        user_id, _ = self._sessions.pop(digest)
+        self._dirty = True
+        if expired:
+            self.expired += 1
+        else:
+            self.evicted += 1
+        if self.on_removed is not None:
+            self.on_removed(digest, user_id)
@@ -0,0 +1,101 @@
+"""
+Refresh-token revocation kept in the database.
+
+Signed refresh tokens can be verified by any worker, but rotating them
+(each one is good for a single exchange) and logging out need state every
+worker sees. Both live in the application database rather than in a
+worker's memory:
+
+* revoked_tokens: the jti of every refresh token already exchanged. The
+  primary key makes the exchange atomic, so two workers racing on the same
+  token cannot both succeed.
+* token_cutoffs: per-user logout time; tokens issued at or before it are
+  rejected.
+
+Rows for tokens past their expiry are pruned now and then on write.
+"""
+import logging
+import time
+from typing import Callable
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from .models import RevokedToken, TokenCutoff
+
+logger = logging.getLogger(__name__)
+
+
+class TokenRevocations:
+    def __init__(
+        self,
+        session_factory: Callable,
+        prune_interval: float = 3600.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.session_factory = session_factory
+        self.prune_interval = prune_interval
+        self._clock = clock
+        self._last_prune = 0.0
+        self.consumed = 0
+        self.reused = 0
+
+    async def consume(self, jti: str, user_id: str, expires_at: float) -> bool:
+        """Mark a refresh token as used; False if it had been used already."""
+        async with self.session_factory() as db:
+            try:
+                await db.execute(insert(RevokedToken).values(jti=jti, user_id=user_id, expires_at=expires_at))
+                await db.commit()
+            except IntegrityError:
+                await db.rollback()
+                self.reused += 1
+                logger.warning(f"Refresh token reused for user {user_id}")
+                return False
+        self.consumed += 1
+        await self._maybe_prune()
+        return True
+
+    async def revoke_user(self, user_id: str, revoked_at: float):
+        """Reject every token the user was issued at or before revoked_at."""
+        async with self.session_factory() as db:
+            result = await db.execute(
+                update(TokenCutoff).where(TokenCutoff.user_id == user_id).values(revoked_at=revoked_at)
+            )
+            if not result.rowcount:
+                try:
+                    await db.execute(insert(TokenCutoff).values(user_id=user_id, revoked_at=revoked_at))
+                except IntegrityError:
+                    # Another worker inserted it first
+                    await db.rollback()
+                    await db.execute(
+                        update(TokenCutoff).where(TokenCutoff.user_id == user_id).values(revoked_at=revoked_at)
+                    )
+            await db.commit()
+
+    async def cutoff(self, user_id: str) -> float:
+        """The user's last logout time, or 0."""
+        async with self.session_factory() as db:
+            value = await db.scalar(select(TokenCutoff.revoked_at).where(TokenCutoff.user_id == user_id))
+        return value or 0.0
+
+    async def prune(self) -> int:
+        """Forget used tokens that have expired anyway."""
+        async with self.session_factory() as db:
+            result = await db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= self._clock()))
+            await db.commit()
+        return result.rowcount or 0
+
+    def stats(self) -> dict:
+        return {"consumed": self.consumed, "reused": self.reused}
+
+    async def _maybe_prune(self):
+        now = self._clock()
+        if now - self._last_prune < self.prune_interval:
+            return
+        self._last_prune = now
+        try:
+            removed = await self.prune()
+            if removed:
+                logger.info(f"Pruned {removed} expired refresh-token revocation(s)")
+        except Exception as e:
+            logger.error(f"Pruning refresh-token revocations failed: {e}")
@@ -0,0 +1,157 @@
+"""
+Typing indicator aggregation.
+
+Clients send a typing frame on almost every keystroke. Instead of fanning
+each one out, TypingAggregator keeps who is typing in which conversation
+and flushes on a fixed interval: a conversation whose typers changed since
+the last flush gets exactly one event with the net starts and stops of
+that window, and repeated "still typing" frames only push the typer's expiry
+forward. A typer that stops sending frames (closed tab, lost connection)
+is dropped once its ttl runs out, and that stop goes out in the next flush.
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (conversation_id, users typing now, starts/stops since the last event)
+EmitCallback = Callable[[str, List[dict], List[dict]], Awaitable[None]]
+
+
+class TypingAggregator:
+    def __init__(
+        self,
+        emit: EmitCallback,
+        interval: float = 0.5,
+        ttl: float = 6.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.emit = emit
+        self.interval = interval
+        self.ttl = ttl
+        self._clock = clock
+        # conversation_id -> user_id -> (user_name, expires_at)
+        self._typers: Dict[str, Dict[str, Tuple[Optional[str], float]]] = {}
+        # conversation_id -> user_id -> user_name, as of the last emitted event
+        self._announced: Dict[str, Dict[str, Optional[str]]] = {}
+        self._dirty: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        self.received = 0
+        self.emitted = 0
+        self.expired = 0
+
+    # ---------- public API ----------
+
+    def update(self, conversation_id: str, user_id: str, is_typing: bool, user_name: Optional[str] = None):
+        """Record one typing frame; nothing is sent until the next flush."""
+        self.received += 1
+        typers = self._typers.setdefault(conversation_id, {})
+        if is_typing:
+            if user_id not in typers:
+                self._dirty.add(conversation_id)
+            typers[user_id] = (user_name, self._clock() + self.ttl)
+        elif typers.pop(user_id, None) is not None:
+            self._dirty.add(conversation_id)
+        if not typers:
+            self._typers.pop(conversation_id, None)
+        self._ensure_running()
+
+    def remove_user(self, user_id: str):
+        """Stop a user's typing everywhere, e.g. when their connection closes."""
+        for conversation_id in list(self._typers):
+            if user_id in self._typers[conversation_id]:
+                self.update(conversation_id, user_id, False, self._typers[conversation_id][user_id][0])
+
+    def typing_users(self, conversation_id: str) -> List[dict]:
+        return [
+            {'user_id': user_id, 'user_name': name}
+            for user_id, (name, _) in self._typers.get(conversation_id, {}).items()
+        ]
+
+    async def flush(self) -> int:
+        """Expire stale typers and emit one event per changed conversation."""
+        self._expire()
+        dirty, self._dirty = self._dirty, set()
+        sent = 0
+        for conversation_id in dirty:
+            # Diff against what was last announced, so a start and stop
+            # inside one window cancel out to nothing
+            current = {user_id: name for user_id, (name, _) in self._typers.get(conversation_id, {}).items()}
+            announced = self._announced.get(conversation_id, {})
+            changes = [
+                {'user_id': user_id, 'user_name': name, 'is_typing': True}
+                for user_id, name in current.items()
+                if user_id not in announced
+            ] + [
+                {'user_id': user_id, 'user_name': name, 'is_typing': False}
+                for user_id, name in announced.items()
+                if user_id not in current
+            ]
+            if current:
+                self._announced[conversation_id] = current
+            else:
+                self._announced.pop(conversation_id, None)
+            if not changes:
+                continue
+            try:
+                await self.emit(conversation_id, self.typing_users(conversation_id), changes)
+                sent += 1
+            except Exception as e:
+                logger.error(f"Typing broadcast failed for {conversation_id}: {e}")
+        self.emitted += sent
+        return sent
+
+    def stats(self) -> dict:
+        return {
+            "interval": self.interval,
+            "ttl": self.ttl,
+            "conversations": len(self._typers),
+            "typers": sum(len(typers) for typers in self._typers.values()),
+            "received": self.received,
+            "emitted": self.emitted,
+            "expired": self.expired,
+        }
+
+    # ---------- flush loop ----------
+
+    async def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    # ---------- internals ----------
+
+    def _ensure_running(self):
+        """Start the flush loop on first use (routers without a startup hook)."""
+        if self._task is None or self._task.done():
+            try:
+                self._task = asyncio.get_running_loop().create_task(self._run())
+            except RuntimeError:
+                pass
+
+    def _expire(self):
+        now = self._clock()
+        for conversation_id in list(self._typers):
+            typers = self._typers[conversation_id]
+            for user_id, (_, expires_at) in list(typers.items()):
+                if expires_at <= now:
+                    del typers[user_id]
+                    self._dirty.add(conversation_id)
+                    self.expired += 1
+            if not typers:
+                del self._typers[conversation_id]
@@ -0,0 +1,163 @@
+"""
+Check that the hot org-scoped queries are served by an index.
+
+Runs EXPLAIN for the query shapes used by api/main.py and the chat routes
+and fails if the expected index does not appear in the plan.
+
+    python -m api.verify_query_plans           # database from DATABASE_URL
+    python -m api.verify_query_plans --fresh   # throwaway SQLite at head
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+
+from dotenv import load_dotenv
+from sqlalchemy import and_, create_engine, desc, or_, select
+from sqlalchemy.pool import StaticPool
+
+load_dotenv()
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.database import engine as default_engine, run_migrations
+from api.models import (
+    ChannelMembership, Conversation, ConversationMessage, Issue, IssueStatus, User
+)
+
+ORG = "org-id"
+USER = "user-id"
+CURSOR = datetime(2024, 1, 1)
+
+# (description, expected index, statement)
+CHECKS = [
+    (
+        "issue list, newest first",
+        "ix_issues_org_created",
+        select(Issue).where(Issue.organization_id == ORG)
+        .order_by(Issue.created_at.desc(), Issue.id.desc()).limit(50),
+    ),
+    (
+        "issue list, member visibility",
+        "ix_issues_org_created",
+        select(Issue).where(
+            Issue.organization_id == ORG,
+            or_(Issue.reporter_id == USER, Issue.assignee_id == USER, Issue.visibility == "public"),
+        ).order_by(Issue.created_at.desc(), Issue.id.desc()).limit(50),
+    ),
+    (
+        "issue list, next keyset page",
+        "ix_issues_org_created",
+        select(Issue).where(
+            Issue.organization_id == ORG,
+            # As built by main.issue_cursor_clause where NULLs sort last
+            or_(Issue.created_at < CURSOR, and_(Issue.created_at == CURSOR, Issue.id < "issue-id"),
+                Issue.created_at.is_(None)),
+        ).order_by(Issue.created_at.desc(), Issue.id.desc()).limit(50),
+    ),
+    (
+        "board column by status",
+        "ix_issues_org_status_created",
+        select(Issue).where(Issue.organization_id == ORG, Issue.status == IssueStatus.TODO)
+        .order_by(Issue.created_at.desc()).limit(50),
+    ),
+    (
+        "sprint backlog",
+        "ix_issues_org_sprint",
+        select(Issue).where(Issue.organization_id == ORG, Issue.sprint_id == "sprint-id"),
+    ),
+    (
+        "issues assigned to a user",
+        "ix_issues_assignee_id",
+        select(Issue).where(Issue.assignee_id == USER),
+    ),
+    (
+        "issues reported by a user",
+        "ix_issues_reporter_id",
+        select(Issue).where(Issue.reporter_id == USER),
+    ),
+    (
+        "organization members",
+        "ix_users_organization_id",
+        select(User).where(User.organization_id == ORG),
+    ),
+    (
+        "conversation list by activity",
+        "ix_conversations_org_updated",
+        select(Conversation).where(Conversation.organization_id == ORG)
+        .order_by(desc(Conversation.updated_at)),
+    ),
+    (
+        "message history page",
+        "ix_conversation_messages_conversation_created",
+        select(ConversationMessage).where(ConversationMessage.conversation_id == "conversation-id")
+        .order_by(desc(ConversationMessage.created_at)).limit(50),
+    ),
+    (
+        "channel membership check",
+        "ix_channel_memberships_channel_user",
+        select(ChannelMembership).where(
+            ChannelMembership.channel_id == "channel-id", ChannelMembership.user_id == USER
+        ),
+    ),
+]
+
+def explain(connection, statement) -> str:
+    """Return the database's plan for a statement as one string"""
+    dialect = connection.dialect.name
+    compiled = statement.compile(dialect=connection.dialect)
+    params = compiled.construct_params()
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    if dialect == "sqlite":
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).fetchall()
+        return "\n".join(str(row[-1]) for row in rows)
+    rows = connection.exec_driver_sql(f"EXPLAIN {compiled}", params).mappings().fetchall()
+    if dialect == "mysql":
+        return "\n".join(f"{row['table']}: key={row['key']}" for row in rows)
+    return "\n".join(str(list(row.values())[0]) for row in rows)
+
+def verify(connection, verbose: bool = False) -> list:
+    """Run every check and return the descriptions of those that failed"""
+    if connection.dialect.name == "postgresql":
+        # Small tables are cheaper to scan; ask whether the index is usable at all
+        connection.exec_driver_sql("SET enable_seqscan = off")
+    failures = []
+    for description, index_name, statement in CHECKS:
+        plan = explain(connection, statement)
+        # SQLite reports a sort it could not take from the index as a temp b-tree
+        ok = index_name in plan and "TEMP B-TREE" not in plan
+        print(f"{'OK  ' if ok else 'FAIL'} {description} ({index_name})")
+        if verbose or not ok:
+            for line in plan.splitlines():
+                print(f"       {line}")
+        if not ok:
+            failures.append(description)
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fresh", action="store_true", help="check a new in-memory SQLite database at head")
+    parser.add_argument("--verbose", "-v", action="store_true", help="print every plan")
+    args = parser.parse_args()
+
+    if args.fresh:
+        engine = create_engine("sqlite://", poolclass=StaticPool)
+        with engine.begin() as connection:
+            run_migrations(connection)
+    else:
+        engine = default_engine
+
+    with engine.connect() as connection:
+        failures = verify(connection, verbose=args.verbose)
+        connection.rollback()
+
+    print()
+    if failures:
+        print(f"{len(failures)} of {len(CHECKS)} queries are not using their index")
+        sys.exit(1)
+    print(f"All {len(CHECKS)} queries use their index")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark: GET /api/issues encoding paths
+
+Compares the previous ORM path (hydrate IssueModel, issue_model_to_dict,
+IssueResponse, then FastAPI's response-model validation and encoding) with
+the column projection that get_issues uses now.
+
+    python benchmarks/issue_listing.py [--issues 5000] [--rounds 10]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import main
+from api.models import Base
+
+ORG_ID = "bench-org"
+ADMIN = {"id": "bench-user", "email": "bench@example.com", "role": "admin", "organization_id": ORG_ID}
+RESPONSE_ADAPTER = TypeAdapter(List[main.IssueResponse])
+
+
+async def seed(session, count):
+    start = datetime(2024, 1, 1)
+    statuses = list(main.ModelIssueStatus)
+    for n in range(count):
+        session.add(main.IssueModel(
+            id=f"issue-{n:06d}", key=f"BENCH-{n}", title=f"Issue number {n}",
+            description="Steps to reproduce the problem " * 4,
+            issue_type=main.ModelIssueType.TASK, status=statuses[n % len(statuses)],
+            priority=main.ModelPriority.MEDIUM, story_points=3,
+            assignee_id="bench-user", reporter_id="bench-user", organization_id=ORG_ID,
+            labels=["backend", "api"], visibility="public",
+            created_at=start + timedelta(seconds=n), updated_at=start + timedelta(seconds=n),
+            due_date=start + timedelta(days=30),
+        ))
+    await session.commit()
+
+
+async def orm_path(db):
+    """What get_issues did before the projection"""
+    query = (
+        select(main.IssueModel)
+        .where(main.IssueModel.organization_id == ORG_ID)
+        .order_by(main.IssueModel.created_at.desc(), main.IssueModel.id.desc())
+    )
+    issues = (await db.execute(query)).scalars().all()
+    processed = [main.issue_dict_to_response(main.issue_model_to_dict(issue)) for issue in issues]
+    # FastAPI's serialize_response: validate against response_model, then encode
+    validated = RESPONSE_ADAPTER.validate_python(processed, from_attributes=True)
+    content = jsonable_encoder(RESPONSE_ADAPTER.dump_python(validated, mode="json"))
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+async def projection_path(db):
+    response = await main.get_issues(
+        status_filter=None, issue_type=None, priority=None, assignee_id=None, sprint_id=None,
+        epic_id=None, label=None, due_after=None, due_before=None, limit=None, cursor=None,
+        current_user=ADMIN, db=db,
+    )
+    return response.body
+
+
+async def measure(session_factory, path, rounds):
+    timings = []
+    for _ in range(rounds):
+        async with session_factory() as db:
+            started = time.perf_counter()
+            body = await path(db)
+            timings.append(time.perf_counter() - started)
+    return timings, body
+
+
+async def run(count, rounds):
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with session_factory() as session:
+        await seed(session, count)
+
+    results = {}
+    for name, path in (("orm", orm_path), ("projection", projection_path)):
+        await measure(session_factory, path, 1)  # warm up
+        results[name] = await measure(session_factory, path, rounds)
+    await engine.dispose()
+
+    assert json.loads(results["orm"][1]) == json.loads(results["projection"][1]), "paths disagree"
+    print(f"{count} issues, {rounds} rounds (median)")
+    for name, (timings, body) in results.items():
+        print(f"  {name:<11} {statistics.median(timings) * 1000:8.1f} ms  {len(body) / 1024:8.0f} KiB")
+    speedup = statistics.median(results["orm"][0]) / statistics.median(results["projection"][0])
+    print(f"  speedup     {speedup:8.2f}x")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--issues", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(run(args.issues, args.rounds))
+
+
+if __name__ == "__main__":
+    main_cli()
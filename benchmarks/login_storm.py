@@ -0,0 +1,80 @@
+"""
+Benchmark: event loop latency during a login storm
+
+Fires --logins concurrent password checks at the event loop while a probe
+task measures how late its 5 ms ticks fire. "inline" verifies bcrypt on the
+loop, like the old hash_password call sites would have. "executor" uses
+PasswordHasher, which runs the KDF on its bounded thread pool.
+
+    python benchmarks/login_storm.py [--logins 50] [--rounds 12] [--workers 4]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.passwords import BcryptHasher, PasswordHasher, Sha256Hasher
+
+PROBE_INTERVAL = 0.005
+
+
+async def probe(lags, stop):
+    while not stop.is_set():
+        expected = time.perf_counter() + PROBE_INTERVAL
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(max(0.0, time.perf_counter() - expected))
+
+
+async def storm(hasher, stored, logins, inline):
+    async def login():
+        if inline:
+            return hasher.verify_sync("correct horse", stored)
+        return await hasher.verify("correct horse", stored)
+
+    lags = []
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(lags, stop))
+    await asyncio.sleep(PROBE_INTERVAL * 4)
+    started = time.perf_counter()
+    results = await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe_task
+    assert all(ok for ok, _ in results)
+    return elapsed, lags
+
+
+def report(name, elapsed, lags, logins):
+    lags_ms = sorted(lag * 1000 for lag in lags) or [0.0]
+    p99 = lags_ms[min(len(lags_ms) - 1, int(len(lags_ms) * 0.99))]
+    print(
+        f"  {name:<9} {logins / elapsed:7.1f} logins/s   loop lag p50 {statistics.median(lags_ms):7.1f} ms"
+        f"   p99 {p99:7.1f} ms   max {lags_ms[-1]:7.1f} ms"
+    )
+
+
+async def run(logins, rounds, workers):
+    hasher = PasswordHasher([BcryptHasher(rounds=rounds), Sha256Hasher("bench")], max_workers=workers)
+    stored = hasher.hash_sync("correct horse")
+    print(f"{logins} concurrent logins, bcrypt rounds={rounds}, {workers} hash workers")
+    for name, inline in (("inline", True), ("executor", False)):
+        elapsed, lags = await storm(hasher, stored, logins, inline)
+        report(name, elapsed, lags, logins)
+    hasher.close()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(run(args.logins, args.rounds, args.workers))
+
+
+if __name__ == "__main__":
+    main_cli()
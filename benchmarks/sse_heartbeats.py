@@ -0,0 +1,91 @@
+"""
+Benchmark: keepalive cost for idle SSE streams
+
+Simulates --streams idle subscribers for --seconds. "wait_for" is the old
+loop: each stream waits on its queue with a --interval timeout and writes
+its own heartbeat when the timeout fires. "wheel" parks every stream on a
+plain queue.get() and lets one HeartbeatScheduler push heartbeats into
+the idle queues in batches. Both deliver the same number of heartbeats.
+The interval is scaled down so the timer churn shows up in a few seconds.
+
+    python benchmarks/sse_heartbeats.py [--streams 5000] [--seconds 5] [--interval 0.5]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.heartbeat import HeartbeatScheduler
+
+HEARTBEAT = "event: heartbeat\ndata: {}\n\n"
+
+
+async def wait_for_streams(streams, seconds, interval):
+    sent = 0
+
+    async def stream(queue):
+        nonlocal sent
+        while True:
+            try:
+                await asyncio.wait_for(queue.get(), timeout=interval)
+            except asyncio.TimeoutError:
+                sent += 1
+
+    tasks = [asyncio.create_task(stream(asyncio.Queue())) for _ in range(streams)]
+    await asyncio.sleep(seconds)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return sent
+
+
+async def wheel_streams(streams, seconds, interval):
+    sent = 0
+
+    def on_due(queues):
+        for queue in queues:
+            queue.put_nowait(HEARTBEAT)
+
+    async def stream(queue):
+        nonlocal sent
+        while True:
+            await queue.get()
+            sent += 1
+
+    wheel = HeartbeatScheduler(on_due, interval=interval, tick=interval / 10)
+    queues = [asyncio.Queue() for _ in range(streams)]
+    for queue in queues:
+        wheel.add(queue)
+    tasks = [asyncio.create_task(stream(queue)) for queue in queues]
+    await wheel.start()
+    await asyncio.sleep(seconds)
+    await wheel.stop()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return sent
+
+
+def measure(name, scenario, streams, seconds, interval):
+    cpu = time.process_time()
+    sent = asyncio.run(scenario(streams, seconds, interval))
+    cpu = time.process_time() - cpu
+    print(f"  {name:<9} {sent:8d} heartbeats   cpu {cpu:6.2f} s   ({cpu / seconds * 100:5.1f}% of one core)")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--streams", type=int, default=5000)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--interval", type=float, default=0.5)
+    args = parser.parse_args()
+    print(f"{args.streams} idle streams for {args.seconds:g}s, heartbeat every {args.interval:g}s")
+    measure("wait_for", wait_for_streams, args.streams, args.seconds, args.interval)
+    measure("wheel", wheel_streams, args.streams, args.seconds, args.interval)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,133 @@
+"""
+Benchmark: API startup with per-organization lazy loading
+
+Generates a data directory with --orgs tenants and compares the startup
+work (users and organizations only) with loading every organization up
+front, which is what startup used to do. Also reports the cold load of a
+single organization, i.e. the extra latency of its first request.
+
+    python benchmarks/startup.py [--orgs 200] [--users 10] [--issues 200] [--messages 500]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import main
+from api.org_store import org_data_name
+
+
+def write_json(root, name, root_key, records):
+    path = os.path.join(root, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({root_key: records}, f)
+
+
+def generate(root, orgs, users, issues, messages):
+    start = datetime(2024, 1, 1)
+    all_users, all_orgs = [], []
+    for o in range(orgs):
+        org_id = f"org-{o:05d}"
+        all_orgs.append({"id": org_id, "name": f"Org {o}", "domain": f"org{o}.example.com"})
+        member_ids = [f"{org_id}-user-{u}" for u in range(users)]
+        all_users += [
+            {"id": user_id, "email": f"{user_id}@example.com", "name": user_id, "organization_id": org_id}
+            for user_id in member_ids
+        ]
+        write_json(root, org_data_name(org_id, "issues.json"), "issues", [
+            {"id": f"{org_id}-issue-{n}", "key": f"ORG-{n}", "title": f"Issue {n}", "description": "Steps " * 10,
+             "organization_id": org_id, "reporter_id": member_ids[0], "visibility": "public", "deadline": None,
+             "created_at": (start + timedelta(minutes=n)).isoformat()}
+            for n in range(issues)
+        ])
+        write_json(root, org_data_name(org_id, "comments.json"), "comments", [
+            {"id": f"{org_id}-comment-{n}", "issue_id": f"{org_id}-issue-{n % issues}", "content": "Looks good",
+             "author_id": member_ids[0], "organization_id": org_id}
+            for n in range(issues)
+        ])
+        team_id = f"team-chat-{org_id}"
+        write_json(root, org_data_name(org_id, "conversations.json"), "conversations", [
+            {"id": team_id, "type": "team", "name": "Team Chat", "participants": member_ids,
+             "organization_id": org_id, "created_at": start.isoformat(), "updated_at": start.isoformat()}
+        ])
+        write_json(root, org_data_name(org_id, "conversation_messages.json"), "messages", [
+            {"id": f"{org_id}-message-{n}", "conversation_id": team_id, "sender_id": member_ids[n % users],
+             "sender_name": "Someone", "content": f"Message number {n}", "message_type": "text", "type": "text",
+             "edited": False, "created_at": (start + timedelta(seconds=n)).isoformat()}
+            for n in range(messages)
+        ])
+    write_json(root, "users.json", "users", all_users)
+    write_json(root, "organizations.json", "organizations", all_orgs)
+    return [org["id"] for org in all_orgs]
+
+
+def reset():
+    main.close_message_logs()
+    main.org_partitions.reset()
+    for store in (main.users_db, main.organizations_db, main.issues_db, main.comments_db, main.conversations_db,
+                  main.conversation_messages_db, main.user_conversations_db):
+        store.clear()
+    main.clear_directory_indexes()
+    main.rebuild_issue_comments_index()
+    main.rebuild_conversation_message_index()
+
+
+def measure(label, work):
+    reset()
+    started = time.perf_counter()
+    work()
+    elapsed = time.perf_counter() - started
+    # Second run for memory: tracemalloc slows allocation-heavy code severalfold
+    reset()
+    tracemalloc.start()
+    work()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<24} {elapsed * 1000:9.1f} ms  {current / 1024 / 1024:8.1f} MiB resident")
+    return elapsed
+
+
+def run(org_count, users, issues, messages):
+    logging.disable(logging.INFO)
+    root = tempfile.mkdtemp(prefix="scope-startup-")
+    main.get_data_path = lambda name, ensure_dir=True: os.path.join(root, name)
+    main.json_writer.path_for = lambda name: os.path.join(root, name)
+    org_ids = generate(root, org_count, users, issues, messages)
+
+    def load_orgs(ids):
+        async def scenario():
+            for org_id in ids:
+                await main.org_partitions.ensure(org_id)
+        asyncio.run(scenario())
+
+    print(f"{org_count} orgs x ({users} users, {issues} issues, {issues} comments, {messages} messages)")
+    lazy = measure("lazy startup", main.load_data_from_files)
+    measure("first request, one org", lambda: (main.load_data_from_files(), load_orgs(org_ids[:1])))
+    eager = measure("eager (all orgs)", lambda: (main.load_data_from_files(), load_orgs(org_ids)))
+    print(f"  startup speedup          {eager / lazy:9.1f}x")
+    reset()
+    shutil.rmtree(root, ignore_errors=True)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orgs", type=int, default=200)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--issues", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=500)
+    args = parser.parse_args()
+    run(args.orgs, args.users, args.issues, args.messages)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,19 @@
+"""
+Shared test fixtures
+"""
+import pytest
+
+
+class FakeClock:
+    """Stands in for time.time / time.monotonic; tests move it by hand."""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
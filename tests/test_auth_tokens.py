@@ -0,0 +1,141 @@
+"""
+Tests for signed access and refresh tokens
+"""
+import asyncio
+import os
+import sys
+
+import jwt
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import main
+from api.auth_tokens import REFRESH, TokenSigner, looks_like_jwt
+from api.models import Base
+from api.token_revocations import TokenRevocations
+
+
+def test_access_tokens_verify_locally_and_expire(clock):
+    signer = TokenSigner("secret", access_ttl=60, clock=clock)
+    tokens = signer.issue("u1", "org-a")
+
+    assert looks_like_jwt(tokens["access_token"])
+    claims = signer.decode(tokens["access_token"])
+    assert (claims["sub"], claims["org"]) == ("u1", "org-a")
+
+    # A refresh token is not accepted where an access token is expected
+    assert signer.decode(tokens["refresh_token"]) is None
+    assert signer.decode(tokens["refresh_token"], REFRESH)["sub"] == "u1"
+
+    assert TokenSigner("other-secret", clock=clock).decode(tokens["access_token"]) is None
+    clock.now += 61
+    assert signer.decode(tokens["access_token"]) is None
+
+
+@pytest.fixture
+def jwt_mode(monkeypatch, tmp_path):
+    database = tmp_path / "auth.db"
+    Base.metadata.create_all(create_engine(f"sqlite:///{database}"))
+    # A fresh connection per use, since each asyncio.run is a new loop
+    engine = create_async_engine(f"sqlite+aiosqlite:///{database}", poolclass=NullPool)
+    monkeypatch.setattr(main, "token_revocations", TokenRevocations(async_sessionmaker(engine)))
+    monkeypatch.setattr(main, "AUTH_TOKEN_MODE", "jwt")
+    monkeypatch.setattr(main, "update_user_data", lambda user: None)
+    main.clear_sessions()
+    main.users_db["u1"] = {"id": "u1", "organization_id": "org-a", "is_active": True}
+    yield
+    main.clear_sessions()
+    main.users_db.pop("u1", None)
+
+
+def test_signed_tokens_skip_the_session_store(jwt_mode):
+    tokens = main.issue_auth_tokens("u1")
+    main.session_store.clear()
+
+    assert main.verify_access_token(tokens["access_token"])["id"] == "u1"
+    assert main.verify_access_token(tokens["refresh_token"]) is None
+
+
+def test_refresh_and_logout(jwt_mode):
+    tokens = main.issue_auth_tokens("u1")
+    refreshed = asyncio.run(main.refresh_tokens(main.RefreshTokenRequest(refresh_token=tokens["refresh_token"])))
+    assert main.verify_access_token(refreshed.access_token)["id"] == "u1"
+    assert main.user_has_active_session("u1")
+
+    # Logging out rejects every token issued before it
+    main.users_db["u1"]["tokens_revoked_at"] = main.token_signer.decode(tokens["access_token"])["iat"] + 1
+    assert main.verify_access_token(refreshed.access_token) is None
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.refresh_tokens(main.RefreshTokenRequest(refresh_token=refreshed.refresh_token)))
+    assert excinfo.value.status_code == 401
+
+
+def test_refresh_token_is_single_use(jwt_mode):
+    tokens = main.issue_auth_tokens("u1")
+    request = main.RefreshTokenRequest(refresh_token=tokens["refresh_token"])
+    asyncio.run(main.refresh_tokens(request))
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.refresh_tokens(request))
+    assert excinfo.value.status_code == 401
+    # Another worker has no local session for it and still refuses it
+    main.clear_sessions()
+    with pytest.raises(HTTPException):
+        asyncio.run(main.refresh_tokens(request))
+
+
+def test_refresh_works_on_a_worker_that_did_not_issue_it(jwt_mode):
+    tokens = main.issue_auth_tokens("u1")
+    main.clear_sessions()
+    refreshed = asyncio.run(main.refresh_tokens(main.RefreshTokenRequest(refresh_token=tokens["refresh_token"])))
+    assert main.verify_access_token(refreshed.access_token)["id"] == "u1"
+
+
+def test_logout_is_seen_by_every_worker(jwt_mode):
+    tokens = main.issue_auth_tokens("u1")
+    asyncio.run(main.token_revocations.revoke_user("u1", main.token_signer.decode(tokens["access_token"])["iat"]))
+    # Revoked in the same instant it was issued still counts
+    with pytest.raises(HTTPException):
+        asyncio.run(main.refresh_tokens(main.RefreshTokenRequest(refresh_token=tokens["refresh_token"])))
+
+
+def test_forged_jwt_is_rejected_in_session_mode(monkeypatch):
+    monkeypatch.setattr(main, "AUTH_TOKEN_MODE", "session")
+    main.users_db["victim"] = {"id": "victim", "organization_id": "org-a", "is_active": True}
+    try:
+        for secret in main.PUBLIC_SECRETS:
+            forged = jwt.encode(
+                {"sub": "victim", "typ": "access", "iss": "scope-api", "iat": 0, "exp": 4102444800},
+                secret, algorithm="HS256",
+            )
+            assert main.verify_access_token(forged) is None
+    finally:
+        main.users_db.pop("victim", None)
+
+
+def test_jwt_mode_refuses_public_secrets(monkeypatch):
+    monkeypatch.setattr(main, "AUTH_TOKEN_MODE", "jwt")
+    for secret in ["", *main.PUBLIC_SECRETS]:
+        monkeypatch.setattr(main, "JWT_SECRET_KEY", secret)
+        with pytest.raises(RuntimeError):
+            main.check_auth_config()
+    monkeypatch.setattr(main, "JWT_SECRET_KEY", "a-private-value")
+    main.check_auth_config()
+
+
+def test_session_mode_refuses_several_workers(monkeypatch):
+    monkeypatch.setattr(main, "AUTH_TOKEN_MODE", "session")
+    monkeypatch.setattr(main, "WEB_CONCURRENCY", 4)
+    with pytest.raises(RuntimeError):
+        main.check_auth_config()
+    monkeypatch.setattr(main, "WEB_CONCURRENCY", 1)
+    main.check_auth_config()
+    monkeypatch.setattr(main, "AUTH_TOKEN_MODE", "jwt")
+    monkeypatch.setattr(main, "JWT_SECRET_KEY", "a-private-value")
+    monkeypatch.setattr(main, "WEB_CONCURRENCY", 4)
+    main.check_auth_config()
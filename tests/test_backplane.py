@@ -0,0 +1,82 @@
+"""
+Tests for the cross-process realtime backplane
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.backplane import ClusterPresence, PostgresBackplane, UnixSocketBackplane
+
+
+def test_unix_backplane_delivers_to_peers_only(tmp_path):
+    """Envelopes reach every other worker but are not echoed back"""
+    async def scenario():
+        received = {"a": [], "b": [], "c": []}
+        workers = {}
+        for name in received:
+            async def handler(envelope, name=name):
+                received[name].append(envelope)
+            workers[name] = UnixSocketBackplane(str(tmp_path))
+            await workers[name].start(handler)
+
+        workers["a"].publish({"kind": "org", "org": "o1", "message": {"type": "ping"}})
+        for _ in range(50):
+            if received["b"] and received["c"]:
+                break
+            await asyncio.sleep(0.01)
+        for worker in workers.values():
+            await worker.stop()
+        return received, workers
+
+    received, workers = asyncio.run(scenario())
+    assert received["a"] == []
+    for name in ("b", "c"):
+        assert len(received[name]) == 1
+        assert received[name][0]["message"] == {"type": "ping"}
+        assert received[name][0]["origin"] == workers["a"].worker_id
+    assert os.listdir(tmp_path) == []
+
+
+def test_postgres_backplane_chunks_oversized_envelopes():
+    """Envelopes over the NOTIFY limit are split and reassembled by peers"""
+    async def scenario():
+        sender = PostgresBackplane("postgresql://localhost/test")
+        receiver = PostgresBackplane("postgresql://localhost/test")
+        received = []
+
+        async def handler(envelope):
+            received.append(envelope)
+
+        receiver._handler = handler
+        message = {"type": "new_message", "content": "x" * 20000}
+        payloads = sender._payloads({"kind": "org", "org": "o1", "message": message, "origin": sender.worker_id})
+        assert len(payloads) > 1
+        assert all(len(p.encode()) <= PostgresBackplane.MAX_PAYLOAD for p in payloads)
+        for payload in payloads:
+            await receiver._receive(payload)
+        # The sender ignores its own chunks
+        sender._handler = handler
+        await sender._receive(payloads[0])
+        return received, message, receiver
+
+    received, message, receiver = asyncio.run(scenario())
+    assert len(received) == 1
+    assert received[0]["message"] == message
+    assert receiver._chunks == {}
+
+
+def test_cluster_presence_tracks_remote_workers():
+    """Deltas and snapshots from peers are aggregated per organization"""
+    presence = ClusterPresence(expiry_seconds=0)
+    presence.apply_delta("w1", "org", "u1", True)
+    presence.apply_snapshot("w2", {"org": ["u2"], "other": ["u3"]})
+    assert presence.online_user_ids("org") == {"u1", "u2"}
+    assert presence.is_online("other", "u3")
+
+    presence.apply_delta("w1", "org", "u1", False)
+    assert not presence.is_online("org", "u1")
+
+    presence.expire()
+    assert presence.online_user_ids("org") == set()
@@ -0,0 +1,77 @@
+"""
+Tests for the profile picture blob store
+"""
+import asyncio
+import base64
+import os
+import sys
+
+import pytest
+from starlette.requests import Request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import main
+from api.blob_store import BlobStore, default_root
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 32
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = BlobStore(str(tmp_path))
+    monkeypatch.setattr(main, "blob_store", store)
+    return store
+
+
+def _request(headers=None):
+    raw = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+def test_identical_images_share_one_blob(store, tmp_path):
+    """Uploads are addressed by content and stored once"""
+    data_url = "data:image/png;base64," + base64.b64encode(PNG).decode()
+    key = store.put_encoded_image(data_url)
+
+    assert store.put_image(PNG) == key
+    assert key.endswith(".png")
+    assert [len(files) for _, _, files in os.walk(tmp_path) if files] == [1]
+    with pytest.raises(ValueError):
+        store.put_image(b"<svg onload=alert(1)>")
+
+
+def test_blob_endpoint_supports_conditional_requests(store):
+    """Blobs carry a strong ETag and answer If-None-Match with 304"""
+    key = store.put_image(PNG)
+
+    response = asyncio.run(main.get_blob(key, _request()))
+    assert response.media_type == "image/png"
+    assert "immutable" in response.headers["cache-control"]
+
+    cached = asyncio.run(main.get_blob(key, _request({"If-None-Match": response.headers["etag"]})))
+    assert cached.status_code == 304
+
+    with pytest.raises(main.HTTPException):
+        asyncio.run(main.get_blob("../users.json", _request()))
+
+
+def test_messages_reference_the_sender_picture_url(store):
+    """Chat messages carry the sender's blob URL, never an inline image"""
+    url = store.url_for(store.put_image(PNG))
+    main.users_db["u-pic"] = {"id": "u-pic", "name": "Pic", "profile_picture": url}
+    try:
+        message = {"id": "m1", "conversation_id": "c1", "sender_id": "u-pic", "content": "hi",
+                   "sender_profile_picture": "data:image/png;base64,AAAA"}
+        assert main.build_message_response(message).sender_profile_picture == url
+    finally:
+        main.users_db.pop("u-pic", None)
+
+
+def test_app_and_migrations_share_the_blob_root(monkeypatch):
+    """The app and the migrations resolve the same blob directory"""
+    if not os.getenv("BLOB_STORE_DIR"):
+        assert main.blob_store.root == default_root()
+        assert os.path.dirname(main.blob_store.root) == os.path.dirname(main.get_data_path("x", ensure_dir=False))
+    monkeypatch.setenv("BLOB_STORE_DIR", "/srv/blobs")
+    assert default_root() == "/srv/blobs"
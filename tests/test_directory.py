@@ -0,0 +1,48 @@
+"""
+Tests for the user / organization lookup indexes
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import main
+
+
+@pytest.fixture(autouse=True)
+def directory():
+    saved_users, saved_orgs = dict(main.users_db), dict(main.organizations_db)
+    main.users_db.clear()
+    main.organizations_db.clear()
+    main.organizations_db["o1"] = {"id": "o1", "name": " Acme ", "domain": "Acme.io"}
+    main.users_db["u1"] = {"id": "u1", "email": "ann@acme.io", "organization_id": "o1"}
+    main.users_db["u2"] = {"id": "u2", "email": "bob@acme.io", "organization_id": "o1"}
+    main.rebuild_directory_indexes()
+    yield
+    main.users_db.clear()
+    main.users_db.update(saved_users)
+    main.organizations_db.clear()
+    main.organizations_db.update(saved_orgs)
+    main.rebuild_directory_indexes()
+
+
+def test_lookups_after_rebuild():
+    """Email, domain, name and membership lookups resolve without scans"""
+    assert main.find_user_by_email("bob@acme.io")["id"] == "u2"
+    assert main.find_user_by_email("nobody@acme.io") is None
+    assert main.find_organization_by_domain("acme.IO")["id"] == "o1"
+    assert main.find_organization_by_name("acme")["id"] == "o1"
+    assert [u["id"] for u in main.get_org_users("o1")] == ["u1", "u2"]
+
+
+def test_email_change_moves_index_entry():
+    """Re-indexing with the previous email frees the old address"""
+    user = main.users_db["u1"]
+    user["email"] = "ann@new.io"
+    main.index_user(user, previous_email="ann@acme.io")
+
+    assert main.find_user_by_email("ann@acme.io") is None
+    assert main.find_user_by_email("ann@new.io") is user
+    assert [u["id"] for u in main.get_org_users("o1")] == ["u1", "u2"]
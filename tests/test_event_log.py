@@ -0,0 +1,52 @@
+"""
+Tests for the per-organization realtime replay buffer
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import main
+from api.event_log import OrgEventLogs
+
+
+def test_replay_returns_only_missed_events_for_the_recipient():
+    logs = OrgEventLogs(dict, max_events=3, unsequenced=("chat_typing",))
+    start = logs.position("org-1")
+    logs.stamp("org-1", {"type": "issue_created", "n": 1})
+    dm = logs.stamp("org-1", {"type": "chat_message", "n": 2}, user_ids=["u2"])
+    logs.stamp("org-1", {"type": "chat_typing"})
+    logs.stamp("org-1", {"type": "issue_updated", "n": 3}, sse_only=True)
+
+    assert [f["n"] for f in logs.replay("org-1", start, "u1", sse=True)] == [1, 3]
+    assert [f["n"] for f in logs.replay("org-1", start, "u2")] == [1, 2]
+    assert [f["n"] for f in logs.replay("org-1", dm["event_id"], "u2", sse=True)] == [3]
+
+    # Once the gap falls out of the buffer, or the log was rebuilt, resync
+    logs.stamp("org-1", {"type": "issue_created", "n": 4})
+    assert logs.replay("org-1", start, "u1") is None
+    assert logs.replay("org-1", "deadbeef-1", "u1") is None
+    logs.drop("org-1")
+    assert logs.replay("org-1", dm["event_id"], "u2") is None
+    assert logs.stats()["resyncs"] == 3
+
+
+def test_sse_reconnect_resumes_from_last_event_id():
+    main.users_db["u1"] = {"id": "u1", "organization_id": "org-1"}
+    try:
+        async def scenario():
+            first = main.resume_frames("org-1", "u1", None, sse=True)[-1].message["event_id"]
+            for n in range(3):
+                await main.broadcast_to_organization("org-1", {"type": "issue_created", "n": n})
+            return first
+
+        first = asyncio.run(scenario())
+        frames = main.resume_frames("org-1", "u1", first, sse=True)
+        assert [f.message.get("n") for f in frames] == [0, 1, 2, None]
+        assert frames[0].sse.startswith("id: ")
+        assert frames[-1].message["resync_required"] is False
+        assert main.resume_frames("org-1", "u1", "stale-7", sse=True)[-1].message["resync_required"] is True
+    finally:
+        main.users_db.pop("u1", None)
+        main.event_logs.drop("org-1")
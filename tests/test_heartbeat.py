@@ -0,0 +1,49 @@
+"""
+Tests for the shared SSE heartbeat scheduler
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import main
+from api.heartbeat import HeartbeatScheduler
+
+
+def test_only_idle_streams_get_heartbeats(clock):
+    wheel = HeartbeatScheduler(lambda due: None, interval=30, tick=1, clock=clock)
+    for key in ("idle", "busy", "gone"):
+        wheel.add(key)
+    wheel.remove("gone")
+
+    clock.now += 20
+    wheel.touch("busy")
+    assert wheel.advance() == []
+    clock.now += 11
+    assert wheel.advance() == ["idle"]
+
+    # "busy" was pushed back to t+50; "idle" was rescheduled to t+61
+    clock.now += 20
+    assert wheel.advance() == ["busy"]
+    clock.now += 10
+    assert wheel.advance() == ["idle"]
+
+    # A long stall still visits every slot once
+    clock.now += 500
+    assert sorted(wheel.advance()) == ["busy", "idle"]
+    assert len(wheel) == 2
+
+
+def test_idle_sse_streams_share_one_heartbeat_frame():
+    subscribers = [main.add_sse_connection("org-1", "u1") for _ in range(2)]
+    try:
+        main.send_sse_heartbeats(subscribers)
+        frames = [asyncio.run(subscriber.get()) for subscriber in subscribers]
+        assert frames[0] is frames[1]
+        assert frames[0].sse.startswith("event: heartbeat\n")
+        assert len(main.sse_heartbeats) == 2
+    finally:
+        for subscriber in subscribers:
+            main.remove_sse_connection("org-1", "u1", subscriber)
+    assert len(main.sse_heartbeats) == 0
@@ -0,0 +1,33 @@
+"""
+Tests for the issue -> comments index
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import main
+
+
+@pytest.fixture(autouse=True)
+def comments():
+    saved = dict(main.comments_db)
+    main.comments_db.clear()
+    yield
+    main.comments_db.clear()
+    main.comments_db.update(saved)
+    main.rebuild_issue_comments_index()
+
+
+def test_comments_grouped_by_issue():
+    """Each issue sees only its own comments, in the order they were added"""
+    for comment_id, issue_id in (("c1", "i1"), ("c2", "i2"), ("c3", "i1")):
+        main.comments_db[comment_id] = {"id": comment_id, "issue_id": issue_id}
+    main.rebuild_issue_comments_index()
+    main.index_comment({"id": "c4", "issue_id": "i2"})
+
+    assert [c["id"] for c in main.get_issue_comments("i1")] == ["c1", "c3"]
+    assert [c["id"] for c in main.get_issue_comments("i2")] == ["c2", "c4"]
+    assert main.get_issue_comments("missing") == []
@@ -0,0 +1,142 @@
+"""
+Tests for filtered, keyset-paginated issue listing
+"""
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import main
+from api.models import Base
+
+ADMIN = {"id": "u1", "email": "ann@acme.io", "role": "admin", "organization_id": "o1"}
+
+
+def with_db(scenario):
+    """Run scenario(session) against a fresh in-memory database with seven issues"""
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+            _seed(session)
+            await session.commit()
+            result = await scenario(session)
+        await engine.dispose()
+        return result
+    return asyncio.run(run())
+
+
+def _seed(session):
+    start = datetime(2024, 1, 1)
+    for n in range(7):
+        session.add(main.IssueModel(
+            id=f"i{n}", key=f"ACME-{n}", title=f"Issue {n}", reporter_id="u1", organization_id="o1",
+            issue_type=main.ModelIssueType.BUG if n % 2 else main.ModelIssueType.TASK,
+            status=main.ModelIssueStatus.TODO, priority=main.ModelPriority.MEDIUM,
+            labels=["backend", "urgent"] if n == 3 else ["frontend"],
+            # Two issues share a timestamp so the id tiebreak is exercised
+            created_at=start + timedelta(minutes=min(n, 5)),
+            due_date=start + timedelta(days=n),
+        ))
+
+
+async def _page(db, **filters):
+    params = dict(status_filter=None, issue_type=None, priority=None, assignee_id=None, sprint_id=None,
+                  epic_id=None, label=None, due_after=None, due_before=None, limit=None, cursor=None)
+    params.update(filters)
+    response = await main.get_issues(current_user=ADMIN, db=db, **params)
+    return json.loads(response.body), response.headers.get("X-Next-Cursor")
+
+
+async def _list(db, **filters):
+    issues, _ = await _page(db, **filters)
+    return [issue["id"] for issue in issues]
+
+
+def test_pages_cover_every_issue_once():
+    """Following X-Next-Cursor walks the list newest first without gaps"""
+    async def scenario(db):
+        seen, cursor = [], None
+        while True:
+            issues, cursor = await _page(db, limit=3, cursor=cursor)
+            seen.extend(issue["id"] for issue in issues)
+            if not cursor:
+                return seen, await _list(db)
+
+    seen, unpaged = with_db(scenario)
+    assert seen == ["i6", "i5", "i4", "i3", "i2", "i1", "i0"]
+    assert seen == unpaged
+
+
+def test_projection_matches_response_model():
+    """The lean row encoding is identical to the validated IssueResponse"""
+    async def scenario(db):
+        issues, _ = await _page(db)
+        models = [await db.get(main.IssueModel, issue["id"]) for issue in issues]
+        return issues, models
+
+    issues, models = with_db(scenario)
+    for payload, model in zip(issues, models):
+        expected = main.issue_dict_to_response(main.issue_model_to_dict(model))
+        assert payload == json.loads(expected.model_dump_json())
+        assert list(payload) == list(main.IssueResponse.model_fields)
+
+
+def test_filters_compile_into_query():
+    """Type, label and due range filters narrow the result in the database"""
+    start = datetime(2024, 1, 1)
+
+    async def scenario(db):
+        return (
+            await _list(db, issue_type=[main.IssueType.BUG]),
+            await _list(db, label="backend"),
+            await _list(db, label="back"),
+            await _list(db, due_after=start + timedelta(days=2), due_before=start + timedelta(days=4)),
+        )
+
+    by_type, by_label, by_partial_label, by_due = with_db(scenario)
+    assert by_type == ["i5", "i3", "i1"]
+    assert by_label == ["i3"]
+    assert by_partial_label == []
+    assert by_due == ["i3", "i2"]
+
+
+def test_non_ascii_label_matches():
+    """Labels outside ASCII match however the array was encoded"""
+    async def scenario(db):
+        (await db.get(main.IssueModel, "i2")).labels = ["café"]
+        await db.commit()
+        return await _list(db, label="café")
+
+    assert with_db(scenario) == ["i2"]
+
+
+def test_pages_include_issues_without_created_at():
+    """Legacy rows with no created_at are paged after the dated ones"""
+    async def scenario(db):
+        for issue_id in ("i0", "i1"):
+            (await db.get(main.IssueModel, issue_id)).created_at = None
+        await db.commit()
+        seen, cursor = [], None
+        while True:
+            issues, cursor = await _page(db, limit=2, cursor=cursor)
+            seen.extend(issue["id"] for issue in issues)
+            if not cursor:
+                return seen
+
+    assert with_db(scenario) == ["i6", "i5", "i4", "i3", "i2", "i1", "i0"]
+    assert main.decode_issue_cursor(main.encode_issue_cursor(main.IssueModel(id="i1"))) == (None, "i1")
+
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(main.HTTPException) as excinfo:
+        with_db(lambda db: _list(db, limit=2, cursor="not-a-cursor"))
+    assert excinfo.value.status_code == 400
@@ -0,0 +1,69 @@
+"""
+Tests for the per-conversation chat message index
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import main
+
+
+@pytest.fixture(autouse=True)
+def clean_index():
+    main.conversation_messages_db.clear()
+    main.conversation_message_index.clear()
+    main.conversation_message_keys.clear()
+    yield
+    main.conversation_messages_db.clear()
+    main.conversation_message_index.clear()
+    main.conversation_message_keys.clear()
+
+
+def _message(message_id, created_at, conversation_id="c1"):
+    return {"id": message_id, "conversation_id": conversation_id, "created_at": created_at}
+
+
+def test_out_of_order_inserts_stay_sorted():
+    """Late-arriving messages are placed by created_at"""
+    main.index_conversation_message(_message("m2", "2024-01-02T00:00:00"))
+    main.index_conversation_message(_message("m3", "2024-01-03T00:00:00"))
+    main.index_conversation_message(_message("m1", "2024-01-01T00:00:00"))
+
+    ids = [m["id"] for m in main.get_indexed_conversation_messages("c1")]
+    assert ids == ["m1", "m2", "m3"]
+    assert main.get_last_conversation_message("c1")["id"] == "m3"
+
+
+def test_unindex_updates_last_message():
+    """Removing the newest message exposes the previous one"""
+    main.index_conversation_message(_message("m1", "2024-01-01T00:00:00"))
+    main.index_conversation_message(_message("m2", "2024-01-02T00:00:00"))
+    main.unindex_conversation_message("m2")
+
+    assert main.get_last_conversation_message("c1")["id"] == "m1"
+    main.unindex_conversation_message("m1")
+    assert main.get_last_conversation_message("c1") is None
+    assert "c1" not in main.conversation_message_index
+
+
+def test_rebuild_matches_incremental_index():
+    """A full rebuild groups and orders messages per conversation"""
+    for message in (
+        _message("a2", "2024-01-02T00:00:00", "a"),
+        _message("b1", "2024-01-01T00:00:00", "b"),
+        _message("a1", "2024-01-01T00:00:00", "a"),
+    ):
+        main.conversation_messages_db[message["id"]] = message
+    main.rebuild_conversation_message_index()
+
+    assert [m["id"] for m in main.get_indexed_conversation_messages("a")] == ["a1", "a2"]
+    assert [m["id"] for m in main.get_indexed_conversation_messages("b")] == ["b1"]
+
+
+def test_deleting_unknown_message_writes_no_tombstone(monkeypatch):
+    """An id that was never indexed is reported as not deleted"""
+    monkeypatch.setattr(main, "get_message_log", lambda organization_id: pytest.fail("log touched"))
+    assert main.delete_conversation_message("missing") is False
@@ -0,0 +1,104 @@
+"""
+Tests for the append-only chat message log
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.message_log import MessageLogStore
+
+
+def _message(message_id, content="hi"):
+    return {"id": message_id, "content": content, "conversation_id": "c1"}
+
+
+def test_append_and_replay(tmp_path):
+    """Appended messages and tombstones are replayed in order"""
+    store = MessageLogStore(str(tmp_path / "conversation_messages.json"))
+    store.append(_message("m1"))
+    store.append(_message("m2"))
+    store.append(_message("m1", "edited"))
+    store.delete("m2")
+    store.close()
+
+    messages = MessageLogStore(str(tmp_path / "conversation_messages.json")).replay()
+    assert list(messages) == ["m1"]
+    assert messages["m1"]["content"] == "edited"
+
+
+def test_replay_skips_torn_write(tmp_path):
+    """A partially written final line does not lose earlier messages"""
+    store = MessageLogStore(str(tmp_path / "conversation_messages.json"))
+    store.append(_message("m1"))
+    store.close()
+    segment = os.path.join(store.segment_dir, os.listdir(store.segment_dir)[0])
+    with open(segment, "a") as f:
+        f.write('{"op":"put","message":{"id":')
+
+    assert list(store.replay()) == ["m1"]
+
+
+def test_compaction_folds_segments_into_snapshot(tmp_path):
+    """Rotation past the segment limit compacts into the JSON snapshot"""
+    state = {}
+    store = MessageLogStore(
+        str(tmp_path / "conversation_messages.json"),
+        segment_max_bytes=1,
+        max_sealed_segments=3,
+    )
+    for i in range(5):
+        message = _message(f"m{i}")
+        state[message["id"]] = message
+        store.append(message)
+    store.close()
+
+    assert store.sealed_segment_count() < 3
+    with open(tmp_path / "conversation_messages.json") as f:
+        snapshot = json.load(f)
+    assert {m["id"] for m in snapshot["messages"]} >= {"m0", "m1", "m2"}
+    assert set(store.replay()) == set(state)
+
+
+def test_background_compaction_writes_compact_json(tmp_path):
+    """Write-triggered compaction rebuilds the snapshot from the log files"""
+    state = {}
+    store = MessageLogStore(
+        str(tmp_path / "conversation_messages.json"),
+        segment_max_bytes=1,
+        max_sealed_segments=2,
+    )
+    for i in range(2):
+        message = _message(f"m{i}")
+        state[message["id"]] = message
+        store.append(message)
+    assert store._compactor is not None
+    store.wait_for_compaction()
+    # Written after the snapshot was taken: must survive in its segment
+    store.append(_message("m2"))
+    store.close()
+
+    with open(tmp_path / "conversation_messages.json") as f:
+        raw = f.read()
+    assert "\n" not in raw
+    assert [m["id"] for m in json.loads(raw)["messages"]] == ["m0", "m1"]
+    assert set(store.replay()) == {"m0", "m1", "m2"}
+
+
+def test_background_compaction_applies_tombstones(tmp_path):
+    """Edits and deletes in sealed segments are folded into the snapshot"""
+    store = MessageLogStore(
+        str(tmp_path / "conversation_messages.json"),
+        segment_max_bytes=1,
+        max_sealed_segments=3,
+    )
+    store.append(_message("m0"))
+    store.append(_message("m1"))
+    store.delete("m0")
+    store.wait_for_compaction()
+    store.close()
+
+    with open(tmp_path / "conversation_messages.json") as f:
+        assert json.load(f)["messages"] == [_message("m1")]
+    assert list(store.replay()) == ["m1"]
@@ -0,0 +1,182 @@
+"""
+Tests for lazy per-organization loading and idle eviction
+"""
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import main
+from api.org_store import OrgPartitions, org_data_name
+from api.persistence import JsonWriteBehind
+
+
+def test_concurrent_requests_load_once():
+    """Requests racing for a cold org share one load"""
+    loads = []
+
+    async def load(org_id):
+        loads.append(org_id)
+        await asyncio.sleep(0.01)
+
+    async def scenario():
+        partitions = OrgPartitions(load, lambda org_id: None)
+        await asyncio.gather(*(partitions.ensure("org-a") for _ in range(5)))
+        await partitions.ensure("org-a")
+        return partitions
+
+    partitions = asyncio.run(scenario())
+    assert loads == ["org-a"]
+    assert partitions.loaded() == ["org-a"]
+
+
+def test_idle_orgs_are_evicted_unless_pinned(clock):
+    unloaded = []
+    pinned = {"org-b"}
+
+    async def load(org_id):
+        pass
+
+    partitions = OrgPartitions(load, unloaded.append, idle_seconds=60, is_pinned=pinned.__contains__, clock=clock)
+
+    async def scenario():
+        for org_id in ("org-a", "org-b", "org-c"):
+            await partitions.ensure(org_id)
+        clock.now += 50
+        await partitions.ensure("org-c")
+        clock.now += 50
+        return partitions.evict_idle()
+
+    assert asyncio.run(scenario()) == ["org-a"]
+    assert unloaded == ["org-a"]
+    assert sorted(partitions.loaded()) == ["org-b", "org-c"]
+
+
+def test_org_data_name_rejects_paths():
+    assert org_data_name("org-a", "issues.json") == "orgs/org-a/issues.json"
+    for bad in ("", "../x", "a/b", ".hidden"):
+        with pytest.raises(ValueError):
+            org_data_name(bad, "issues.json")
+
+
+def test_writer_load_includes_queued_writes(tmp_path):
+    """A reload right after eviction sees writes the worker has not committed"""
+    async def scenario():
+        writer = JsonWriteBehind(lambda name: str(tmp_path / name), commit_delay=0.5)
+        writer.upsert("issues.json", "issues", {"id": "i1", "title": "on disk"})
+        await writer.start()
+        writer.upsert("issues.json", "issues", {"id": "i1", "title": "queued"})
+        writer.insert("issues.json", "issues", {"id": "i2", "title": "new"})
+        records = await writer.load("issues.json", "issues")
+        await writer.stop()
+        return records
+
+    assert asyncio.run(scenario()) == [{"id": "i1", "title": "queued"}, {"id": "i2", "title": "new"}]
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "get_data_path", lambda name, ensure_dir=True: str(tmp_path / name))
+    monkeypatch.setattr(main.json_writer, "path_for", lambda name: str(tmp_path / name))
+    saved_users, saved_orgs = dict(main.users_db), dict(main.organizations_db)
+    main.users_db.clear()
+    main.organizations_db.clear()
+    main.users_db["u1"] = {"id": "u1", "organization_id": "org-a"}
+    main.organizations_db["org-a"] = {"id": "org-a", "name": "Acme"}
+    main.rebuild_directory_indexes()
+    yield tmp_path
+    main.close_message_logs()
+    main.org_partitions.reset()
+    for store in (main.issues_db, main.comments_db, main.conversations_db, main.conversation_messages_db,
+                  main.user_conversations_db, main.users_db, main.organizations_db,
+                  main.org_issue_ids, main.org_conversations):
+        store.clear()
+    main.users_db.update(saved_users)
+    main.organizations_db.update(saved_orgs)
+    main.rebuild_directory_indexes()
+    main.rebuild_issue_comments_index()
+    main.rebuild_conversation_message_index()
+
+
+def _write(path, root_key, records):
+    with open(path, "w") as f:
+        json.dump({root_key: records}, f)
+
+
+def test_legacy_files_are_split_and_loaded_lazily(data_dir):
+    _write(data_dir / "issues.json", "issues", [{"id": "i1", "organization_id": "org-a"}])
+    _write(data_dir / "comments.json", "comments", [{"id": "c1", "issue_id": "i1"}])
+    _write(data_dir / "conversations.json", "conversations", [{"id": "d1", "participants": ["u1"]}])
+    _write(data_dir / "conversation_messages.json", "messages", [{"id": "m1", "conversation_id": "d1", "sender_id": "u1"}])
+
+    main.partition_legacy_data()
+
+    assert (data_dir / "issues.json.pre-partition").exists()
+    assert not (data_dir / "issues.json").exists()
+    assert not main.issues_db
+
+    asyncio.run(main.org_partitions.ensure("org-a"))
+
+    assert list(main.issues_db) == ["i1"]
+    assert main.issues_db["i1"]["visibility"] == "public"
+    assert [c["id"] for c in main.get_issue_comments("i1")] == ["c1"]
+    assert set(main.conversations_db) == {"d1", "team-chat-org-a"}
+    assert [m["id"] for m in main.get_indexed_conversation_messages("d1")] == ["m1"]
+
+
+def test_evicted_org_reloads_its_writes(data_dir):
+    async def scenario():
+        await main.org_partitions.ensure("org-a")
+        message = {"id": "m2", "conversation_id": "team-chat-org-a", "sender_id": "u1", "content": "hi"}
+        main.conversation_messages_db["m2"] = message
+        main.save_conversation_message(message)
+        assert main.org_partitions.evict("org-a")
+        assert not main.conversations_db and not main.conversation_messages_db and not main.user_conversations_db
+        await main.org_partitions.ensure("org-a")
+
+    asyncio.run(scenario())
+    assert [m["id"] for m in main.get_indexed_conversation_messages("team-chat-org-a")] == ["m2"]
+    assert main.user_conversations_db["u1"] == ["team-chat-org-a"]
+
+
+def test_eviction_uses_the_per_org_message_index(data_dir):
+    async def scenario():
+        await main.org_partitions.ensure("org-a")
+        # Its conversation is gone, but the sender still ties it to org-a
+        orphan = {"id": "m3", "conversation_id": "deleted", "sender_id": "u1", "content": "hi"}
+        main.conversation_messages_db["m3"] = orphan
+        main.index_conversation_message(orphan)
+        main.conversation_messages_db["other"] = {"id": "other", "conversation_id": "elsewhere"}
+        assert "m3" in main.org_message_ids["org-a"]
+        assert main.org_partitions.evict("org-a")
+
+    asyncio.run(scenario())
+    assert list(main.conversation_messages_db) == ["other"]
+    assert "org-a" not in main.org_message_ids
+    assert "m3" not in main.conversation_message_keys
+
+
+def test_eviction_leaves_other_orgs_alone(data_dir):
+    main.users_db["u2"] = {"id": "u2", "organization_id": "org-b"}
+    main.organizations_db["org-b"] = {"id": "org-b", "name": "Globex"}
+    main.rebuild_directory_indexes()
+
+    async def scenario():
+        await main.org_partitions.ensure("org-a")
+        await main.org_partitions.ensure("org-b")
+        main.store_issue({"id": "i2", "organization_id": "org-b"})
+        comment = {"id": "c2", "issue_id": "i2", "organization_id": "org-b"}
+        main.comments_db["c2"] = comment
+        main.index_comment(comment)
+        assert main.org_conversation_ids("org-a") == ["team-chat-org-a"]
+        assert main.org_partitions.evict("org-a")
+
+    asyncio.run(scenario())
+    assert list(main.issues_db) == ["i2"] and list(main.comments_db) == ["c2"]
+    assert set(main.conversations_db) == {"team-chat-org-b"}
+    assert "org-a" not in main.org_conversations and "org-a" not in main.org_issue_ids
+    assert main.org_conversation_ids("org-b") == ["team-chat-org-b"]
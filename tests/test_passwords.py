@@ -0,0 +1,73 @@
+"""
+Tests for password hashing and rehash-on-login
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.passwords import BcryptHasher, PasswordHasher, PasswordHasherBusy, Sha256Hasher
+
+
+def _hasher(rounds=4):
+    return PasswordHasher([BcryptHasher(rounds=rounds), Sha256Hasher("secret")], max_workers=2)
+
+
+def test_hash_and_verify_off_the_loop():
+    hasher = _hasher()
+
+    async def scenario():
+        hashed = await hasher.hash("hunter2")
+        return hashed, await hasher.verify("hunter2", hashed), await hasher.verify("wrong", hashed)
+
+    hashed, good, bad = asyncio.run(scenario())
+    hasher.close()
+    assert hashed.startswith("$2b$04$")
+    assert good == (True, None)
+    assert bad == (False, None)
+
+
+def test_legacy_hash_is_upgraded_on_success():
+    """A correct password against an old SHA-256 hash yields a bcrypt replacement"""
+    hasher = _hasher()
+    legacy = Sha256Hasher("secret").hash("hunter2")
+
+    assert hasher.verify_sync("wrong", legacy) == (False, None)
+    ok, upgraded = hasher.verify_sync("hunter2", legacy)
+    assert ok and upgraded.startswith("$2b$")
+    assert hasher.verify_sync("hunter2", upgraded) == (True, None)
+    assert hasher.stats()["rehashed"] == 1
+
+
+def test_rounds_change_triggers_rehash():
+    old = BcryptHasher(rounds=4).hash("hunter2")
+    ok, upgraded = _hasher(rounds=5).verify_sync("hunter2", old)
+    assert ok and upgraded.startswith("$2b$05$")
+
+
+def test_unknown_or_empty_hash_never_matches():
+    hasher = _hasher()
+    assert hasher.verify_sync("hunter2", "") == (False, None)
+    assert hasher.verify_sync("hunter2", "plaintext") == (False, None)
+
+
+def test_dummy_verify_never_matches():
+    hasher = _hasher()
+    assert asyncio.run(hasher.verify_dummy("not-a-real-password")) is False
+    hasher.close()
+    assert hasher._dummy_hash.startswith("$2b$04$")
+
+
+def test_saturated_pool_sheds_load():
+    """Calls past max_pending fail fast instead of queueing"""
+    hasher = PasswordHasher([BcryptHasher(rounds=4)], max_workers=1, max_pending=2)
+
+    async def scenario():
+        return await asyncio.gather(*(hasher.hash("hunter2") for _ in range(4)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    hasher.close()
+    assert sum(isinstance(r, PasswordHasherBusy) for r in results) == 2
+    assert hasher.stats()["rejected"] == 2
+    assert hasher.stats()["pending"] == 0
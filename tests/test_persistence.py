@@ -0,0 +1,94 @@
+"""
+Tests for the write-behind JSON persistence queue
+"""
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.persistence import JsonWriteBehind
+
+
+def _read(tmp_path, name, root_key):
+    with open(tmp_path / name) as f:
+        return json.load(f)[root_key]
+
+
+def test_writes_are_synchronous_until_started(tmp_path):
+    """Without a running worker every operation hits disk immediately"""
+    writer = JsonWriteBehind(lambda name: str(tmp_path / name))
+    writer.insert("users.json", "users", {"id": "u1", "email": "a@x.io"}, key="email")
+    writer.insert("users.json", "users", {"id": "u2", "email": "a@x.io"}, key="email")
+    writer.upsert("users.json", "users", {"id": "u1", "email": "b@x.io"})
+
+    assert _read(tmp_path, "users.json", "users") == [{"id": "u1", "email": "b@x.io"}]
+
+
+def test_worker_coalesces_and_flushes_on_stop(tmp_path):
+    """Repeated writes to one record collapse into a single commit"""
+    async def scenario():
+        writer = JsonWriteBehind(lambda name: str(tmp_path / name), commit_delay=10)
+        await writer.start()
+        record = {"id": "i1", "title": "v0"}
+        for i in range(5):
+            record["title"] = f"v{i}"
+            writer.upsert("issues.json", "issues", record)
+        writer.upsert("issues.json", "issues", {"id": "i2", "title": "other"})
+        writer.delete("issues.json", "issues", "i2")
+        assert not (tmp_path / "issues.json").exists()
+        await writer.stop()
+        return writer
+
+    writer = asyncio.run(scenario())
+    assert _read(tmp_path, "issues.json", "issues") == [{"id": "i1", "title": "v4"}]
+    assert writer.commits == 1
+    assert writer.coalesced == 5
+
+
+def test_failed_commit_is_retried_with_newer_writes_on_top(tmp_path):
+    """A commit that fails keeps its writes queued for the next cycle"""
+    async def scenario():
+        writer = JsonWriteBehind(lambda name: str(tmp_path / name), commit_delay=0, retry_delay=0.01)
+        commit = writer._commit
+        attempts = []
+
+        def flaky_commit(name, pending):
+            attempts.append(len(pending.ops))
+            if len(attempts) == 1:
+                # Arrives while the first commit is still in flight
+                writer.upsert("issues.json", "issues", {"id": "i1", "title": "newer"})
+                raise OSError("disk full")
+            commit(name, pending)
+
+        writer._commit = flaky_commit
+        await writer.start()
+        writer.upsert("issues.json", "issues", {"id": "i1", "title": "older"})
+        writer.upsert("issues.json", "issues", {"id": "i2", "title": "kept"})
+        await asyncio.sleep(0.1)
+        assert _read(tmp_path, "issues.json", "issues") == [
+            {"id": "i2", "title": "kept"},
+            {"id": "i1", "title": "newer"},
+        ]
+        await writer.stop()
+        return writer, attempts
+
+    writer, attempts = asyncio.run(scenario())
+    assert attempts == [2, 2]
+    assert writer.failures == 1
+
+
+def test_full_queue_commits_off_the_event_loop(tmp_path):
+    """Backpressure wakes the worker instead of writing on the caller's thread"""
+    async def scenario():
+        writer = JsonWriteBehind(lambda name: str(tmp_path / name), max_pending=3, commit_delay=10)
+        await writer.start()
+        for i in range(3):
+            writer.upsert("issues.json", "issues", {"id": f"i{i}"})
+        assert not (tmp_path / "issues.json").exists()
+        await asyncio.sleep(0.1)
+        assert len(_read(tmp_path, "issues.json", "issues")) == 3
+        await writer.stop()
+
+    asyncio.run(scenario())
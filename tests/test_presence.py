@@ -0,0 +1,44 @@
+"""
+Tests for batched presence_diff events
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import main
+from api.presence import PresenceAggregator
+
+
+def test_reconnect_storm_becomes_one_diff_per_org():
+    events = []
+
+    async def emit(organization_id, online, offline):
+        events.append((organization_id, [u['user_id'] for u in online], offline))
+
+    presence = PresenceAggregator(emit)
+    for n in range(50):
+        presence.mark("org-a", f"u{n}", True, f"User {n}")
+    presence.mark("org-b", "v1", False)
+    # A reconnect inside the window nets out to nothing
+    presence.mark("org-b", "v2", False)
+    presence.mark("org-b", "v2", True)
+
+    assert asyncio.run(presence.flush()) == 2
+    assert events[0] == ("org-a", [f"u{n}" for n in range(50)], [])
+    assert events[1] == ("org-b", [], ["v1"])
+    assert presence.stats()["cancelled"] == 1
+    assert asyncio.run(presence.flush()) == 0
+
+
+def test_presence_snapshot_for_fresh_clients(monkeypatch):
+    main.users_db["u1"] = {"id": "u1", "organization_id": "org-1"}
+    monkeypatch.setitem(main.presence_counters, "org-1", {"u2": 1})
+    try:
+        snapshot = asyncio.run(main.chat_presence(main.users_db["u1"]))
+        assert snapshot["online"] == ["u2"]
+        assert snapshot["event_id"] == main.event_logs.position("org-1")
+    finally:
+        main.users_db.pop("u1", None)
+        main.event_logs.drop("org-1")
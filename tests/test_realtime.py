@@ -0,0 +1,167 @@
+"""
+Tests for realtime fan-out helpers
+"""
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import main
+from api.realtime import SseSubscriber
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+
+@pytest.fixture(autouse=True)
+def clean_registries():
+    yield
+    main.active_chat_connections.clear()
+    main.sse_connections.clear()
+    main.presence_counters.clear()
+    main.user_chat_connections.clear()
+    main.user_sse_connections.clear()
+    main.conversations_db.pop("dm-1", None)
+    for user_id in ("u1", "u2", "u3"):
+        main.users_db.pop(user_id, None)
+
+
+def _user(user_id):
+    user = {"id": user_id, "name": user_id, "avatar": "XX", "organization_id": "org-1"}
+    main.users_db[user_id] = user
+    return user
+
+
+def test_conversation_broadcast_reaches_only_participants():
+    """A direct message is not delivered to the rest of the organization"""
+    async def scenario():
+        sockets = {}
+        for user_id in ("u1", "u2", "u3"):
+            sockets[user_id] = FakeWebSocket()
+            main.add_chat_connection("org-1", sockets[user_id], _user(user_id))
+        subscriber = main.add_sse_connection("org-1", "u3")
+        main.conversations_db["dm-1"] = {"id": "dm-1", "type": "direct", "participants": ["u1", "u2"]}
+
+        await main.broadcast_to_conversation("dm-1", {"type": "chat_message"})
+        for connection in main.active_chat_connections["org-1"]:
+            await connection["sender"].join()
+        return sockets, subscriber
+
+    sockets, subscriber = asyncio.run(scenario())
+    assert len(sockets["u1"].sent) == 1
+    assert len(sockets["u2"].sent) == 1
+    assert sockets["u3"].sent == []
+    assert subscriber.depth == 0
+
+
+def test_organization_broadcast_encodes_once():
+    """Websocket and SSE recipients share one encoded frame"""
+    async def scenario():
+        websocket = FakeWebSocket()
+        main.add_chat_connection("org-1", websocket, _user("u1"))
+        subscribers = [main.add_sse_connection("org-1", "u2") for _ in range(2)]
+
+        await main.broadcast_to_organization("org-1", {"type": "issue_created", "id": "i1"})
+        await main.active_chat_connections["org-1"][0]["sender"].join()
+        return websocket, [await s.get() for s in subscribers]
+
+    websocket, frames = asyncio.run(scenario())
+    event_id = frames[0].message["event_id"]
+    assert websocket.sent == [{"type": "issue_created", "id": "i1", "event_id": event_id}]
+    assert frames[0] is frames[1]
+    assert frames[0].sse.startswith(f"id: {event_id}\nevent: issue_created\n")
+
+
+def test_slow_consumer_is_dropped_without_blocking():
+    """A stalled socket overflows its own queue and is disconnected"""
+    class StalledWebSocket(FakeWebSocket):
+        closed_with = None
+
+        async def send_text(self, text):
+            await asyncio.Event().wait()
+
+        async def close(self, code=None, reason=None):
+            self.closed_with = code
+
+    async def scenario():
+        stalled, healthy = StalledWebSocket(), FakeWebSocket()
+        main.add_chat_connection("org-1", stalled, _user("u1"))
+        main.add_chat_connection("org-1", healthy, _user("u2"))
+        sender = main.active_chat_connections["org-1"][0]["sender"]
+        sender.max_queue = 2
+        for i in range(5):
+            await main.broadcast_to_organization("org-1", {"type": "issue_updated", "n": i})
+        await main.active_chat_connections["org-1"][-1]["sender"].join()
+        await asyncio.sleep(0)
+        return stalled, healthy, sender
+
+    stalled, healthy, sender = asyncio.run(scenario())
+    assert len(healthy.sent) == 5
+    assert sender.closed
+    assert stalled.closed_with == 1013
+    assert "u1" not in main.user_chat_connections
+
+
+def test_removed_connection_leaves_user_registry():
+    """Disconnecting clears the per-user registry entry"""
+    websocket = FakeWebSocket()
+    main.add_chat_connection("org-1", websocket, _user("u1"))
+    main.remove_chat_connection("org-1", websocket, "u1")
+
+    assert "u1" not in main.user_chat_connections
+    assert "org-1" not in main.active_chat_connections
+
+
+def test_sse_overflow_policies():
+    """Bounded SSE queues coalesce, drop or disconnect instead of growing"""
+    def presence(online=(), offline=()):
+        return main.encode_frame({
+            "type": "presence_diff", "organization_id": "org-1",
+            "online": [{"user_id": u} for u in online], "offline": list(offline),
+        })
+
+    def issue(n):
+        return main.encode_frame({"type": "issue_updated", "n": n})
+
+    coalescing = SseSubscriber(max_queue=2, policy="coalesce")
+    coalescing.enqueue(presence(online=["u1", "u2"]))
+    coalescing.enqueue(issue(1))
+    assert coalescing.enqueue(presence(online=["u3"], offline=["u1"]))
+    assert (coalescing.depth, coalescing.coalesced) == (2, 1)
+    # Queued diffs are merged, keeping each user's latest state
+    merged = coalescing._queue[0].message
+    assert [u["user_id"] for u in merged["online"]] == ["u2", "u3"]
+    assert merged["offline"] == ["u1"]
+    assert coalescing.enqueue(issue(2)) is False
+    assert coalescing.closed and coalescing.dropped == 3
+
+    dropping = SseSubscriber(max_queue=2, policy="drop_oldest")
+    for n in range(5):
+        dropping.enqueue(issue(n))
+    assert [asyncio.run(dropping.get()).message["n"] for _ in range(2)] == [3, 4]
+    assert (dropping.dropped, dropping.high_water, dropping.sent) == (3, 2, 2)
+
+
+def test_overflowing_sse_stream_is_unregistered():
+    subscriber = main.add_sse_connection("org-1", "u1")
+    subscriber.max_queue = 1
+    subscriber.policy = "disconnect"
+
+    async def scenario():
+        for n in range(2):
+            await main.broadcast_to_organization("org-1", {"type": "issue_updated", "n": n})
+        return await subscriber.get()
+
+    assert asyncio.run(scenario()) is None
+    assert "org-1" not in main.sse_connections
+    assert "u1" not in main.user_sse_connections
+    assert asyncio.run(main.debug_sse_clients())["clients"] == []
@@ -0,0 +1,35 @@
+"""
+Tests for the JSON response helpers
+"""
+import json
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import main
+from api.responses import FastJSONResponse, encode_models, encoded_json_response
+
+
+def test_fast_response_matches_stdlib_json():
+    """The default response class renders the same document as json.dumps"""
+    content = {"status": main.IssueStatus.DONE, "names": ["Zoë", "李"], "count": 3, "missing": None}
+    body = FastJSONResponse(content).body
+
+    assert json.loads(body) == json.loads(json.dumps(content))
+    assert "Zoë".encode() in body
+    assert json.loads(FastJSONResponse({"at": datetime(2024, 1, 2, 3, 4, 5)}).body) == {"at": "2024-01-02T03:04:05"}
+
+
+def test_encoded_models_are_sent_verbatim():
+    users = [
+        main.UserResponse(id=f"u{n}", name=f"User {n}", email=f"u{n}@acme.io", avatar="UU", role="developer",
+                          organization_id="o1", is_active=True, is_online=n == 1, created_at="2024-01-01")
+        for n in range(2)
+    ]
+    response = encoded_json_response(encode_models(users, main.UserResponse), headers={"X-Test": "1"})
+
+    assert response.media_type == "application/json"
+    assert response.headers["x-test"] == "1"
+    assert json.loads(response.body) == [json.loads(user.model_dump_json()) for user in users]
@@ -0,0 +1,102 @@
+"""
+Tests for access-token session bookkeeping
+"""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import main
+from api.session_store import SessionStore
+
+
+@pytest.fixture(autouse=True)
+def users():
+    main.clear_sessions()
+    for user_id, org_id in (("u1", "org-a"), ("u2", "org-a"), ("u3", "org-b")):
+        main.users_db[user_id] = {"id": user_id, "organization_id": org_id}
+    yield
+    main.clear_sessions()
+    for user_id in ("u1", "u2", "u3"):
+        main.users_db.pop(user_id, None)
+
+
+def test_reverse_indexes_follow_token_lifecycle():
+    """Presence lookups reflect issued and revoked tokens"""
+    first = main.create_access_token("u1")
+    main.create_access_token("u1")
+    main.create_access_token("u3")
+
+    assert main.user_has_active_session("u1")
+    assert not main.user_has_active_session("u2")
+    assert main.get_online_user_ids_for_org("org-a") == {"u1"}
+
+    main.revoke_session(first)
+    assert main.user_has_active_session("u1")
+
+    assert main.revoke_user_sessions("u1") == 1
+    assert not main.user_has_active_session("u1")
+    assert main.get_online_user_ids_for_org("org-a") == set()
+    assert main.get_online_user_ids_for_org("org-b") == {"u3"}
+    assert [user_id for _, user_id in main.session_store.items()] == ["u3"]
+
+
+def test_sliding_expiry_and_sweep(clock):
+    """Sessions in use keep living; idle ones are swept and reported"""
+    removed = []
+    store = SessionStore(ttl_seconds=100, refresh_interval=10,
+                         on_removed=lambda digest, user_id: removed.append(user_id), clock=clock)
+    store.create("active", "u1")
+    store.create("idle", "u2")
+
+    for _ in range(5):
+        clock.now += 60
+        assert store.get("active") == "u1"
+    assert store.peek("idle") is None
+    assert store.sweep() == 1
+    assert removed == ["u2"]
+    assert store.stats()["expired"] == 1
+    assert store.stats()["refreshed"] == 5
+
+
+def test_store_is_bounded(clock):
+    """At capacity the session closest to expiry makes room"""
+    store = SessionStore(max_sessions=2, clock=clock)
+    for n, token in enumerate(("t1", "t2", "t3")):
+        clock.now += 1
+        store.create(token, f"u{n}")
+    assert len(store) == 2
+    assert "t1" not in store and "t3" in store
+    assert store.stats()["evicted"] == 1
+
+
+def test_sessions_survive_restart(tmp_path, clock):
+    """Only token digests are written, and expired rows are not restored"""
+    path = str(tmp_path / "sessions.json")
+    store = SessionStore(path, ttl_seconds=100, clock=clock)
+    store.create("keep", "u1")
+    clock.now += 50
+    store.create("later", "u2")
+    store.save()
+    assert "keep" not in open(path).read()
+
+    clock.now += 60
+    restored = SessionStore(path, ttl_seconds=100, clock=clock)
+    assert restored.load() == 1
+    assert restored.get("later") == "u2"
+    assert restored.get("keep") is None
+
+
+def test_expired_session_drops_presence(monkeypatch):
+    """The sweeper keeps the presence indexes in step"""
+    token = main.create_access_token("u2")
+    assert main.get_online_user_ids_for_org("org-a") == {"u2"}
+    later = time.time() + main.session_store.ttl_seconds + 1
+    monkeypatch.setattr(main.session_store, "_clock", lambda: later)
+    assert main.session_store.sweep() == 1
+    assert main.verify_access_token(token) is None
+    assert not main.user_has_active_session("u2")
+    assert main.get_online_user_ids_for_org("org-a") == set()
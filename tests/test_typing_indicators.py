@@ -0,0 +1,98 @@
+"""
+Tests for coalesced typing indicators
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import main
+from api.typing_indicators import TypingAggregator
+
+
+def make_aggregator(clock):
+    events = []
+
+    async def emit(conversation_id, typing_users, changes):
+        events.append((conversation_id, [u['user_id'] for u in typing_users], changes))
+
+    return TypingAggregator(emit, ttl=5, clock=clock), events
+
+
+def test_keystrokes_collapse_into_one_event_per_flush(clock):
+    typing, events = make_aggregator(clock)
+
+    for _ in range(30):
+        typing.update("c1", "u1", True, "Ann")
+    typing.update("c1", "u2", True, "Bob")
+    typing.update("c2", "u1", True, "Ann")
+    assert asyncio.run(typing.flush()) == 2
+    assert sorted((conv, users) for conv, users, _ in events) == [("c1", ["u1", "u2"]), ("c2", ["u1"])]
+
+    # "Still typing" frames only refresh the expiry
+    events.clear()
+    typing.update("c1", "u1", True, "Ann")
+    assert asyncio.run(typing.flush()) == 0
+
+    # A start and stop inside one window cancel out
+    typing.update("c1", "u3", True, "Cy")
+    typing.update("c1", "u3", False)
+    assert asyncio.run(typing.flush()) == 0
+
+    typing.update("c1", "u2", False)
+    asyncio.run(typing.flush())
+    assert events == [("c1", ["u1"], [{'user_id': "u2", 'user_name': "Bob", 'is_typing': False}])]
+    assert typing.stats()["received"] == 36
+
+
+def test_silent_typers_expire(clock):
+    typing, events = make_aggregator(clock)
+    typing.update("c1", "u1", True, "Ann")
+    asyncio.run(typing.flush())
+    events.clear()
+
+    clock.now += 4
+    assert asyncio.run(typing.flush()) == 0
+    clock.now += 2
+    asyncio.run(typing.flush())
+    assert events == [("c1", [], [{'user_id': "u1", 'user_name': "Ann", 'is_typing': False}])]
+    assert typing.typing_users("c1") == []
+    assert typing.stats()["expired"] == 1
+
+
+def test_main_broadcasts_batched_chat_typing(monkeypatch):
+    sent = {}
+
+    async def fake_broadcast(user_ids, message, exclude_websocket=None, organization_id=None):
+        for user_id in user_ids:
+            sent[user_id] = message
+
+    monkeypatch.setattr(main, "broadcast_to_users", fake_broadcast)
+    monkeypatch.setitem(main.conversations_db, "c1", {"id": "c1", "participants": ["u1", "u2", "u3"]})
+    typing = TypingAggregator(main.broadcast_typing_state)
+    typing.update("c1", "u1", True, "Ann")
+    typing.update("c1", "u2", True, "Bob")
+    asyncio.run(typing.flush())
+
+    assert sent["u3"]['type'] == 'chat_typing'
+    assert [u['user_id'] for u in sent["u3"]['typing_users']] == ["u1", "u2"]
+    assert (sent["u3"]['user_id'], sent["u3"]['is_typing']) == ("u2", True)
+    # Each typer only hears about the other one
+    assert [u['user_id'] for u in sent["u1"]['typing_users']] == ["u2"]
+    assert [c['user_id'] for c in sent["u2"]['changes']] == ["u1"]
+
+    # A lone typer who stops is not sent their own change
+    sent.clear()
+    typing.update("c1", "u1", False)
+    asyncio.run(typing.flush())
+    assert set(sent) == {"u2", "u3"}
+
+
+def test_only_participants_can_type_in_a_conversation(monkeypatch):
+    monkeypatch.setitem(main.conversations_db, "c1", {"id": "c1", "participants": ["u1"]})
+    monkeypatch.setitem(main.conversations_db, "team-chat-org-1", {"id": "team-chat-org-1", "participants": ["u1"]})
+    assert main.typing_conversation_id("org-1", "u1", "c1") == "c1"
+    assert main.typing_conversation_id("org-1", "u1", "team-chat") == "team-chat-org-1"
+    assert main.typing_conversation_id("org-1", "u2", "c1") is None
+    assert main.typing_conversation_id("org-1", "u1", "missing") is None